@@ -0,0 +1,189 @@
+"""
+Schema Context Builder
+Token-budgeted, compact schema descriptions for the SQL generation prompt
+"""
+
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.database.search_index import split_identifier
+from app.database.table_stats import format_count
+
+TYPE_ABBREVIATIONS = {
+    'character varying': 'varchar',
+    'character': 'char',
+    'integer': 'int',
+    'bigint': 'int8',
+    'smallint': 'int2',
+    'boolean': 'bool',
+    'double precision': 'float8',
+    'real': 'float4',
+    'timestamp without time zone': 'timestamp',
+    'timestamp with time zone': 'timestamptz',
+    'time without time zone': 'time',
+    'time with time zone': 'timetz',
+    'USER-DEFINED': 'enum',
+    'ARRAY': 'array',
+}
+
+FORMAT_LINE = "Format: table(column type, fk_column type->referenced_table, +N more columns)"
+STATS_FORMAT_LINE = FORMAT_LINE + " ~estimated rows; * marks indexed columns"
+
+# Columns that usually answer questions (Odoo naming conventions)
+_CORE_COLUMN_RE = re.compile(r'^(?:state|active|date\w*|\w+_date|amount\w*|price\w*|\w+_total|\w*qty\w*|quantity)$')
+
+# Odoo bookkeeping columns, rarely needed to answer a question
+_LOW_VALUE_COLUMN_RE = re.compile(
+    r'^(?:create_uid|write_uid|write_date|__last_update|message_\w+|activity_\w+|access_\w+|website_\w+)$'
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for identifiers and types)"""
+    return len(text) // 4 + 1
+
+
+# Question words that say nothing about which columns are needed
+STOP_WORDS = {
+    'a', 'an', 'the', 'of', 'by', 'in', 'on', 'for', 'to', 'and', 'or', 'is', 'are', 'was', 'were',
+    'what', 'which', 'who', 'how', 'many', 'much', 'me', 'show', 'list', 'give', 'find', 'do', 'does',
+    'we', 'our', 'have', 'has', 'with', 'from', 'all', 'each', 'per', 'top', 'this', 'that', 'there',
+}
+
+
+def question_keywords(question: str) -> Set[str]:
+    """Lower-case words of the question plus naive singulars ('orders' -> 'order')"""
+    words = set(re.findall(r'\b\w+\b', question.lower())) - STOP_WORDS
+    return words | {w[:-1] for w in words if len(w) > 3 and w.endswith('s')}
+
+
+class SchemaContextBuilder:
+    """Renders the relevant tables in one line each within a token budget
+
+    Columns are ranked per table (question keywords, then keys and Odoo's core
+    fields, with bookkeeping columns last). Tables are added in relevance order
+    with their top ``min_columns`` while they fit; the rest of the budget is
+    handed out one column per table per round. Foreign keys are shown inline
+    as ``col->table`` when the schema has them. With table statistics, each
+    table gets its estimated row count and indexed columns are marked with ``*``
+    (and ranked higher, so filters on big tables can use them).
+    """
+
+    def __init__(self, token_budget: int = 1500, min_columns: int = 6):
+        self.token_budget = token_budget
+        self.min_columns = min_columns
+
+    @classmethod
+    def from_env(cls) -> 'SchemaContextBuilder':
+        """Budget from PROMPT_TOKEN_BUDGET (0 means unlimited)"""
+        return cls(token_budget=int(os.getenv('PROMPT_TOKEN_BUDGET', '1500')))
+
+    @staticmethod
+    def abbreviate_type(data_type: str) -> str:
+        return TYPE_ABBREVIATIONS.get(data_type, data_type)
+
+    @staticmethod
+    def column_score(name: str, keywords: Set[str], foreign_keys: Dict, indexed: Iterable[str] = ()) -> int:
+        """Higher is more likely to be needed for the question"""
+        score = 0
+        if keywords.intersection(split_identifier(name)) or name in keywords:
+            score += 10
+        if name in ('id', 'name'):
+            score += 5
+        if name in foreign_keys or name.endswith('_id'):
+            score += 3
+        if _CORE_COLUMN_RE.match(name):
+            score += 3
+        if name in indexed:
+            score += 2
+        if _LOW_VALUE_COLUMN_RE.match(name):
+            score -= 5
+        return score
+
+    def _ranked_columns(self, table_info: Dict, keywords: Set[str], indexed: Iterable[str] = ()) -> List[str]:
+        """Column descriptions ('name type', 'name type->table', 'name* type' if indexed), best first"""
+        foreign_keys = {
+            fk['columns'][0]: fk['table']
+            for fk in table_info.get('foreign_keys', ()) if len(fk['columns']) == 1
+        }
+        columns = table_info['columns']
+        order = sorted(
+            range(len(columns)),
+            key=lambda i: -self.column_score(columns[i]['name'], keywords, foreign_keys, indexed)
+        )
+
+        ranked = []
+        for i in order:
+            col = columns[i]
+            marker = "*" if col['name'] in indexed else ""
+            text = f"{col['name']}{marker} {self.abbreviate_type(col['type'])}"
+            if col['name'] in foreign_keys:
+                text += f"->{foreign_keys[col['name']]}"
+            ranked.append(text)
+        return ranked
+
+    def build(self, question: str, schema: Dict, tables: Iterable[str],
+              join_hints: Iterable[Tuple[str, str, str]] = (), table_stats: Optional[Dict] = None) -> str:
+        """Schema context for ``tables`` (most relevant first)
+
+        ``join_hints`` are ``(table, ref_table, condition)`` triples; those between
+        included tables are listed after the tables. ``table_stats`` maps table
+        names to TableStats.
+        """
+        keywords = question_keywords(question)
+        budget = self.token_budget or float('inf')
+        table_stats = table_stats or {}
+        format_line = STATS_FORMAT_LINE if table_stats else FORMAT_LINE
+
+        ranked = {}
+        chosen: Dict[str, List[str]] = {}
+        suffixes = {}
+        used = estimate_tokens(format_line)
+
+        # Every table that fits gets a header and its top columns
+        for table in tables:
+            if table not in schema:
+                continue
+            stats = table_stats.get(table)
+            columns = self._ranked_columns(schema[table], keywords, stats.indexed_columns if stats else ())
+            core = columns[:self.min_columns]
+            suffix = f" ~{format_count(stats.rows)} rows" if stats and stats.rows >= 0 else ""
+            cost = estimate_tokens(table + suffix) + sum(estimate_tokens(c) for c in core) + 2
+            if chosen and used + cost > budget:
+                break
+            ranked[table] = columns
+            chosen[table] = list(core)
+            suffixes[table] = suffix
+            used += cost
+
+        # Join conditions between included tables come before extra columns
+        joins = [condition for table, ref_table, condition in join_hints
+                 if table in chosen and ref_table in chosen]
+        used += sum(estimate_tokens(condition) for condition in joins)
+
+        # Remaining budget: next-best columns round-robin, most relevant table first
+        position = {table: len(cols) for table, cols in chosen.items()}
+        open_tables = [t for t in chosen if position[t] < len(ranked[t])]
+        while open_tables:
+            still_open = []
+            for table in open_tables:
+                text = ranked[table][position[table]]
+                cost = estimate_tokens(text)
+                if used + cost > budget:
+                    continue
+                chosen[table].append(text)
+                used += cost
+                position[table] += 1
+                if position[table] < len(ranked[table]):
+                    still_open.append(table)
+            open_tables = still_open
+
+        lines = [format_line] if chosen else []
+        for table, columns in chosen.items():
+            hidden = len(ranked[table]) - len(columns)
+            more = f", +{hidden} more" if hidden else ""
+            lines.append(f"{table}({', '.join(columns)}{more}){suffixes[table]}")
+        if joins:
+            lines.append(f"Joins: {'; '.join(joins)}")
+        return "\n".join(lines)
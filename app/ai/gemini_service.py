@@ -3,113 +3,71 @@ Gemini AI Service for SQL Generation
 """
 
 import os
-import re
-from datetime import datetime
-from pathlib import Path
-import google.generativeai as genai
-from dotenv import load_dotenv
 
-load_dotenv()
+from app.ai.sql_generator import SQLGenerator
+from app.config import load_env
 
 
-class GeminiSQLGenerator:
+class GeminiSQLGenerator(SQLGenerator):
     """Uses Gemini AI to generate SQL queries from natural language"""
     
-    def __init__(self):
+    source = 'gemini'
+    supports_streaming = True
+    
+    def __init__(self, model_name: str = None):
+        load_env()
+        super().__init__()
         api_key = os.getenv('GOOGLE_API_KEY')
         if not api_key:
             raise ValueError("GOOGLE_API_KEY not found in environment")
+        # Only this backend needs the SDK
+        import google.generativeai as genai
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
-        self.log_file = Path("token_usage.txt")
+        self.model_name = model_name or os.getenv('LLM_MODEL', 'gemini-2.0-flash-exp')
+        self.model = genai.GenerativeModel(self.model_name)
     
-    def log_token_usage(self, question: str, sql: str, usage_info: dict):
-        """Log token usage to a text file"""
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        log_entry = f"""
-{'='*70}
-Timestamp: {timestamp}
-Question: {question}
-Generated SQL: {sql[:200]}...
-Token Usage:
-  - Prompt Tokens: {usage_info.get('prompt_token_count', 'N/A')}
-  - Candidates Tokens: {usage_info.get('candidates_token_count', 'N/A')}
-  - Total Tokens: {usage_info.get('total_token_count', 'N/A')}
-Model: gemini-2.0-flash-exp
-{'='*70}
-
-"""
-        
-        # Append to log file
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(log_entry)
-        
-        # Also print to console
-        print(f"\n[Token Usage] Prompt: {usage_info.get('prompt_token_count', 'N/A')}, "
-              f"Response: {usage_info.get('candidates_token_count', 'N/A')}, "
-              f"Total: {usage_info.get('total_token_count', 'N/A')}")
+    def warm_up(self):
+        """TLS/HTTP handshake through a free token count, so the first question reuses the connection"""
+        self.model.count_tokens("SELECT 1")
     
-    def generate_sql(self, question: str, schema_context: str = ""):
-        """Generate SQL query from natural language question
-        
-        Returns:
-            tuple: (sql_query, usage_info_dict)
-        """
-        print(f"\n[AI] Generating SQL for: \"{question}\"")
-        
-        prompt = f"""
-You are an expert at generating SQL queries for PostgreSQL database.
-
-Database Schema:
-{schema_context}
-
-Generate a SQL query to answer this question: {question}
-
-Requirements:
-1. Return ONLY the SQL query, no explanations
-2. The database is Odoo (ERP), use common Odoo conventions
-3. Use proper JOINs, aggregate functions where needed
-4. Filter out inactive records (active=false) when present
-5. Add a reasonable LIMIT if not specified
-6. Only use SELECT queries (read-only)
-7. Use PostgreSQL syntax
-8. Handle common Odoo fields like 'active', 'state', 'date_order', etc.
-9. When returning currency amounts, use descriptive column names like 'total_sales', 'amount_total', etc.
-10. When querying table sizes using pg_total_relation_size(), always cast table_name to regclass or use proper schema qualification like ('public.' || table_name)::regclass
-11. For table size queries, use the pattern: pg_total_relation_size(('public.' || table_name)::regclass) or pg_total_relation_size(quote_ident(table_schema) || '.' || quote_ident(table_name))::regclass)
-
-SQL Query:
-"""
-        
-        # Generate content
-        response = self.model.generate_content(prompt)
-        
-        # Extract SQL from response
-        sql = response.text.strip()
-        
-        # Clean up SQL (remove markdown code blocks if present)
-        if sql.startswith('```'):
-            sql = re.sub(r'```sql?\s*', '', sql)
-            sql = re.sub(r'```\s*$', '', sql)
-        sql = sql.strip()
-        
-        # Extract usage metadata
-        usage_info = {}
-        
-        # Try to get usage metadata from response
+    @staticmethod
+    def _usage_info(response) -> dict:
+        """Token counts from the response (or the last streamed chunk), empty if missing"""
         try:
-            if hasattr(response, 'usage_metadata'):
-                usage_info = {
+            if getattr(response, 'usage_metadata', None):
+                return {
                     'prompt_token_count': getattr(response.usage_metadata, 'prompt_token_count', 'N/A'),
                     'candidates_token_count': getattr(response.usage_metadata, 'candidates_token_count', 'N/A'),
                     'total_token_count': getattr(response.usage_metadata, 'total_token_count', 'N/A'),
                 }
         except Exception as e:
             print(f"[Warning] Could not extract usage metadata: {e}")
+        return {}
         
-        # Log token usage
-        self.log_token_usage(question, sql, usage_info)
-        
-        return sql, usage_info
+    def _complete(self, prompt: str, question: str):
+        response = self.model.generate_content(prompt)
+        return response.text, self._usage_info(response)
 
+    def _stream(self, prompt: str, question: str, usage_info: dict):
+        response = self.model.generate_content(prompt, stream=True)
+        try:
+            for chunk in response:
+                usage_info.update(self._usage_info(chunk))
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. only a finish reason)
+                    continue
+                yield text
+        finally:
+            # Stop the server-side generation when the SQL was complete early; the
+            # SDK has no public API for this, so cancel the underlying stream if we can
+            stream = getattr(response, '_iterator', None)
+            for method in ('cancel', 'close'):
+                stop = getattr(stream, method, None)
+                if callable(stop):
+                    try:
+                        stop()
+                    except Exception:
+                        pass
+                    break
@@ -0,0 +1,136 @@
+"""
+Offline SQL Generators
+Deterministic backends for benchmarks and tests: canned SQL with simulated model latency,
+replay of recorded answers, and recording of a live backend's answers
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from app.ai.context_builder import estimate_tokens
+from app.ai.sql_generator import SQLGenerator
+from app.cache.query_cache import normalize_question
+
+
+class StubSQLGenerator(SQLGenerator):
+    """Answers from a question -> SQL mapping after ``latency`` seconds
+
+    Questions are matched after normalize_question, so trivial rephrasings hit
+    the same entry; anything else gets ``default_sql`` or raises ValueError.
+    Token counts are estimated from the prompt and response lengths.
+
+    With ``tokens_per_second`` the response is produced at that rate (streamed
+    in token-sized chunks when streaming), and ``trailing_text`` is appended
+    after a fenced SQL block, like a model explaining its query.
+    """
+
+    model_name = 'stub'
+    source = 'stub'
+    supports_streaming = True
+
+    def __init__(self, latency: float = 0.0, sql_by_question: Optional[Dict[str, str]] = None,
+                 default_sql: Optional[str] = None, tokens_per_second: float = 0.0, trailing_text: str = ''):
+        super().__init__()
+        self.latency = latency
+        self.default_sql = default_sql
+        self.tokens_per_second = tokens_per_second
+        self.trailing_text = trailing_text
+        self._answers: Dict[str, Tuple[str, Dict]] = {}
+        for question, sql in (sql_by_question or {}).items():
+            self.add(question, sql)
+
+    def add(self, question: str, sql: str, usage_info: Optional[Dict] = None):
+        self._answers[normalize_question(question)] = (sql, usage_info or {})
+
+    def __len__(self):
+        return len(self._answers)
+
+    def _response(self, prompt: str, question: str) -> Tuple[str, Dict]:
+        sql, usage_info = self._answers.get(normalize_question(question), (self.default_sql, {}))
+        if sql is None:
+            raise ValueError(f"No {self.source} SQL for question: {question}")
+
+        text = f"```sql\n{sql}\n```\n{self.trailing_text}" if self.trailing_text else sql
+        if not usage_info:
+            prompt_tokens, response_tokens = estimate_tokens(prompt), estimate_tokens(text)
+            usage_info = {'prompt_token_count': prompt_tokens, 'candidates_token_count': response_tokens,
+                          'total_token_count': prompt_tokens + response_tokens}
+        return text, usage_info
+
+    def _complete(self, prompt: str, question: str) -> Tuple[str, Dict]:
+        text, usage_info = self._response(prompt, question)
+        delay = self.latency
+        if self.tokens_per_second:
+            delay += estimate_tokens(text) / self.tokens_per_second
+        if delay:
+            time.sleep(delay)
+        return text, usage_info
+
+    def _stream(self, prompt: str, question: str, usage_info: Dict):
+        text, usage = self._response(prompt, question)
+        if self.latency:
+            time.sleep(self.latency)
+        # ~4 characters per token
+        for start in range(0, len(text), 4):
+            if self.tokens_per_second:
+                time.sleep(1 / self.tokens_per_second)
+            yield text[start:start + 4]
+        usage_info.update(usage)
+
+
+class ReplaySQLGenerator(StubSQLGenerator):
+    """Serves SQL recorded in a JSONL fixture ({"question", "sql", "usage"} per line)"""
+
+    model_name = 'replay'
+    source = 'replay'
+
+    def __init__(self, fixture_path: str, latency: float = 0.0, **kwargs):
+        super().__init__(latency=latency, **kwargs)
+        self.fixture_path = Path(fixture_path)
+        with open(self.fixture_path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.add(entry['question'], entry['sql'], entry.get('usage'))
+
+
+class RecordingSQLGenerator(SQLGenerator):
+    """Wraps a live backend and appends each answer to a fixture for ReplaySQLGenerator"""
+
+    def __init__(self, backend: SQLGenerator, fixture_path: str):
+        super().__init__()
+        self.backend = backend
+        self.model_name = backend.model_name
+        self.source = backend.source
+        self.supports_streaming = backend.supports_streaming
+        self.fixture_path = Path(fixture_path)
+        self._lock = threading.Lock()
+
+    def warm_up(self):
+        self.backend.warm_up()
+
+    def _record(self, question: str, text: str, usage_info: Dict):
+        entry = {'question': question, 'sql': self.extract_sql(text), 'usage': usage_info}
+        with self._lock:
+            self.fixture_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.fixture_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, default=str) + '\n')
+
+    def _complete(self, prompt: str, question: str) -> Tuple[str, Dict]:
+        text, usage_info = self.backend._complete(prompt, question)
+        self._record(question, text, usage_info)
+        return text, usage_info
+
+    def _stream(self, prompt: str, question: str, usage_info: Dict):
+        received = []
+        chunks = self.backend._stream(prompt, question, usage_info)
+        try:
+            for chunk in chunks:
+                received.append(chunk)
+                yield chunk
+        finally:
+            chunks.close()
+            self._record(question, ''.join(received), usage_info)
@@ -0,0 +1,214 @@
+"""
+SQL Generator Interface
+Common prompt, response cleanup and usage logging for the LLM backends
+"""
+
+import os
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Iterator, Tuple
+
+from app.ai.context_builder import estimate_tokens
+from app.ai.sql_stream import SQLStreamAssembler
+from app.ai.usage_log import UsageLogger
+from app.config import load_env
+from app.tracing.tracer import tracer
+
+PROMPT_TEMPLATE = """
+You are an expert at generating SQL queries for PostgreSQL database.
+
+Database Schema:
+{schema_context}
+
+Generate a SQL query to answer this question: {question}
+
+Requirements:
+1. Return ONLY the SQL query, no explanations
+2. The database is Odoo (ERP), use common Odoo conventions
+3. Use proper JOINs, aggregate functions where needed
+4. Filter out inactive records (active=false) when present
+5. {limit_rule}
+6. Only use SELECT queries (read-only)
+7. Use PostgreSQL syntax
+8. Handle common Odoo fields like 'active', 'state', 'date_order', etc.
+9. When returning currency amounts, use descriptive column names like 'total_sales', 'amount_total', etc.
+10. When querying table sizes using pg_total_relation_size(), always cast table_name to regclass or use proper schema qualification like ('public.' || table_name)::regclass
+11. For table size queries, use the pattern: pg_total_relation_size(('public.' || table_name)::regclass) or pg_total_relation_size(quote_ident(table_schema) || '.' || quote_ident(table_name))::regclass)
+12. On tables with millions of rows (~rows in the schema), filter and join on indexed columns (marked *) and avoid reading the whole table
+{hint_section}
+SQL Query:
+"""
+
+LIMIT_RULE = "Add a reasonable LIMIT if not specified"
+# Exports and streamed answers want every row; the agent adds the user's --limit itself
+BULK_LIMIT_RULE = "Do not add a LIMIT unless the question asks for a number of rows"
+
+
+def _token_count(value):
+    """Token counts are 'N/A' when the response has no usage metadata"""
+    return value if isinstance(value, int) else None
+
+
+class SQLGenerator(ABC):
+    """Turns a question and schema context into SQL through some model
+
+    Backends implement ``_complete``; prompt building, markdown cleanup, tracing
+    and usage logging are shared. ``source`` is recorded in the usage log.
+
+    Backends that can stream also implement ``_stream``. The response is then
+    read chunk by chunk and generation is abandoned as soon as the statement is
+    complete (closing fence or top-level semicolon), so validation does not wait
+    for the model's trailing explanation.
+    """
+
+    model_name = 'unknown'
+    source = 'llm'
+    supports_streaming = False
+
+    def __init__(self):
+        self.usage_log = UsageLogger.from_env()
+        # Optional callable returning cache hit/miss counters for the usage log
+        self.cache_stats = None
+        # Stream responses when the backend can (LLM_STREAMING=false to wait for the full text)
+        self.streaming = os.getenv('LLM_STREAMING', 'true').lower() not in ('false', '0', 'no')
+
+    @abstractmethod
+    def _complete(self, prompt: str, question: str) -> Tuple[str, Dict]:
+        """Model response text and usage info (prompt/candidates/total_token_count)"""
+
+    def _stream(self, prompt: str, question: str, usage_info: Dict) -> Iterator[str]:
+        """Response text chunks; fills ``usage_info`` as the metadata arrives
+
+        Closing the generator early must stop the generation.
+        """
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Open the connection to the model ahead of the first question (no-op by default)"""
+
+    @staticmethod
+    def build_prompt(question: str, schema_context: str = "", hint: str = "", bulk: bool = False) -> str:
+        hint_section = f"\nNote: {hint}\n" if hint else ""
+        return PROMPT_TEMPLATE.format(schema_context=schema_context, question=question, hint_section=hint_section,
+                                      limit_rule=BULK_LIMIT_RULE if bulk else LIMIT_RULE)
+
+    @staticmethod
+    def extract_sql(text: str) -> str:
+        """The SQL statement of a complete response, without code fences or trailing text"""
+        assembler = SQLStreamAssembler()
+        assembler.feed(text)
+        return assembler.finish()
+
+    def _generate_streaming(self, prompt: str, question: str) -> Tuple[str, Dict]:
+        """SQL from the streamed response, stopping the generation once it is complete"""
+        usage_info: Dict = {}
+        assembler = SQLStreamAssembler()
+        start_time = time.perf_counter()
+        chunks = self._stream(prompt, question, usage_info)
+        try:
+            for i, chunk in enumerate(chunks):
+                if i == 0:
+                    tracer.record('llm.first_chunk', time.perf_counter() - start_time)
+                if assembler.feed(chunk) is not None:
+                    break
+        finally:
+            chunks.close()
+
+        # Usage metadata arrives with the last chunk; estimate it when generation was cut short
+        if not usage_info:
+            prompt_tokens, response_tokens = estimate_tokens(prompt), estimate_tokens(assembler.text)
+            usage_info = {'prompt_token_count': prompt_tokens, 'candidates_token_count': response_tokens,
+                          'total_token_count': prompt_tokens + response_tokens, 'estimated': True}
+        return assembler.finish(), usage_info
+
+    def generate_sql(self, question: str, schema_context: str = "", hint: str = "", bulk: bool = False):
+        """Generate SQL query from natural language question
+
+        ``hint`` carries feedback about a rejected previous attempt. With
+        ``bulk`` (exports, streaming) the model is asked not to add a LIMIT.
+
+        Returns:
+            tuple: (sql_query, usage_info_dict)
+        """
+        print(f"\n[AI] Generating SQL for: \"{question}\"")
+        prompt = self.build_prompt(question, schema_context, hint, bulk=bulk)
+
+        start_time = time.perf_counter()
+        with tracer.span('llm.generate'):
+            if self.streaming and self.supports_streaming:
+                sql, usage_info = self._generate_streaming(prompt, question)
+            else:
+                text, usage_info = self._complete(prompt, question)
+                sql = self.extract_sql(text)
+        latency = time.perf_counter() - start_time
+
+        with tracer.span('llm.log_usage'):
+            self.log_token_usage(question, sql, usage_info, source=self.source, latency=latency)
+
+        return sql, usage_info
+
+    def log_token_usage(self, question: str, sql: str, usage_info: dict, source: str = None,
+                        latency: float = None):
+        """Queue a usage record for the JSONL usage log (written in the background)
+
+        ``latency`` is the model call duration in seconds.
+        """
+        record = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'question': question,
+            'sql': sql,
+            'model': self.model_name,
+            'source': source or self.source,
+            'prompt_tokens': _token_count(usage_info.get('prompt_token_count')),
+            'candidates_tokens': _token_count(usage_info.get('candidates_token_count')),
+            'total_tokens': _token_count(usage_info.get('total_token_count')),
+            'latency_ms': round(latency * 1000, 1) if latency is not None else None,
+        }
+        if usage_info.get('estimated'):
+            # Counted from the text, not reported by the model; usage_report keeps them apart
+            record['estimated'] = True
+        if self.cache_stats:
+            record['cache'] = self.cache_stats()
+        self.usage_log.log(record)
+
+        # Also print to console
+        if source == 'cache':
+            print("\n[Token Usage] Served from cache, no tokens used")
+            return
+        if source == 'template':
+            print("\n[Token Usage] Filled in from a SQL template, no tokens used")
+            return
+        print(f"\n[Token Usage] Prompt: {usage_info.get('prompt_token_count', 'N/A')}, "
+              f"Response: {usage_info.get('candidates_token_count', 'N/A')}, "
+              f"Total: {usage_info.get('total_token_count', 'N/A')}"
+              f"{' (estimated)' if usage_info.get('estimated') else ''}")
+
+
+def create_sql_generator(backend: str = None) -> SQLGenerator:
+    """Backend named by SQL_GENERATOR: gemini (default), replay, record or stub
+
+    - replay: SQL recorded in SQL_FIXTURE_PATH, after LLM_LATENCY seconds
+    - record: Gemini, saving every answer to SQL_FIXTURE_PATH for later replay
+    - stub: SQL_STUB_QUERY for every question, after LLM_LATENCY seconds
+    """
+    load_env()
+    backend = (backend or os.getenv('SQL_GENERATOR', 'gemini')).lower()
+    fixture = os.getenv('SQL_FIXTURE_PATH', 'benchmarks/fixtures/test_guide_sql.jsonl')
+    latency = float(os.getenv('LLM_LATENCY', '0'))
+
+    # Backends are imported on demand so offline runs do not need the Gemini SDK
+    if backend == 'gemini':
+        from app.ai.gemini_service import GeminiSQLGenerator
+        return GeminiSQLGenerator()
+    if backend == 'replay':
+        from app.ai.replay import ReplaySQLGenerator
+        return ReplaySQLGenerator(fixture, latency=latency)
+    if backend == 'record':
+        from app.ai.gemini_service import GeminiSQLGenerator
+        from app.ai.replay import RecordingSQLGenerator
+        return RecordingSQLGenerator(GeminiSQLGenerator(), fixture)
+    if backend == 'stub':
+        from app.ai.replay import StubSQLGenerator
+        return StubSQLGenerator(latency=latency, default_sql=os.getenv('SQL_STUB_QUERY', 'SELECT 1 AS one'))
+    raise ValueError(f"Unknown SQL_GENERATOR '{backend}' (expected gemini, replay, record or stub)")
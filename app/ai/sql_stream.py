@@ -0,0 +1,75 @@
+"""
+SQL Stream Assembler
+Finds the end of the SQL statement in a (possibly still streaming) model response
+"""
+
+from typing import Optional
+
+from app.security.sql_tokenizer import tokenize
+
+FENCE = '```'
+
+
+class SQLStreamAssembler:
+    """Accumulates response text and reports the SQL as soon as it is complete
+
+    The statement is complete at the closing code fence, or at the first
+    semicolon that is outside quotes, comments and parentheses (checked with
+    the validator's tokenizer, so ``';'`` inside a literal does not count).
+    Anything the model writes after that, typically an explanation, is not
+    needed. ``finish()`` returns the best effort SQL once the response ended
+    without either marker.
+    """
+
+    def __init__(self):
+        self.text = ''
+        self.sql: Optional[str] = None
+        self._checked = 0
+
+    def feed(self, chunk: str) -> Optional[str]:
+        """Add response text, returns the SQL once the statement is complete"""
+        if self.sql is None:
+            self.text += chunk
+            self.sql = self._complete_sql()
+        return self.sql
+
+    def finish(self) -> str:
+        """SQL from the whole response (statement end marker or not)"""
+        if self.sql is not None:
+            return self.sql
+        body, _ = self._body()
+        return (body if body is not None else self.text).replace(FENCE, '').strip()
+
+    def _body(self):
+        """Text after the opening fence line (None while that line is incomplete), fenced or not"""
+        text = self.text.lstrip()
+        if not text.startswith(FENCE):
+            return text, False
+        newline = text.find('\n')
+        if newline < 0:
+            return None, True
+        return text[newline + 1:], True
+
+    def _complete_sql(self) -> Optional[str]:
+        body, fenced = self._body()
+        if body is None:
+            return None
+
+        end = body.find(FENCE) if fenced else -1
+        searchable = body if end < 0 else body[:end]
+
+        # Only semicolons that arrived since the last check need tokenizing
+        position = searchable.find(';', min(self._checked, len(searchable)))
+        while position >= 0:
+            try:
+                tokens = tokenize(searchable[:position + 1])
+            except ValueError:
+                tokens = ()
+            if tokens and tokens[-1].value == ';' and tokens[-1].depth == 0:
+                return searchable[:position + 1].strip()
+            position = searchable.find(';', position + 1)
+        self._checked = len(searchable)
+
+        if end >= 0:
+            return searchable.strip()
+        return None
@@ -0,0 +1,174 @@
+"""
+Usage Log
+Structured (JSONL) token-usage records written by a background thread
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+# One writer per file, so rotation is never raced
+_instances: Dict[str, 'UsageLogger'] = {}
+_instances_lock = threading.Lock()
+
+
+class UsageLogger:
+    """Queues usage records and appends them to a JSONL file off the request path
+
+    A daemon thread writes queued records in batches (one write per batch),
+    waiting at most ``flush_interval`` seconds before writing a partial batch.
+    When the file grows past ``max_bytes`` it is rotated to ``.1`` ... ``.N``
+    like logging's RotatingFileHandler. Pending records are flushed at exit.
+    """
+
+    def __init__(self, path: str = 'token_usage.jsonl', batch_size: int = 100,
+                 flush_interval: float = 1.0, max_bytes: int = 10 * 1024 * 1024, backups: int = 5):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+        self.stats = {'written': 0, 'batches': 0, 'rotations': 0, 'errors': 0}
+
+    @classmethod
+    def from_env(cls) -> 'UsageLogger':
+        """Logger for USAGE_LOG_PATH, shared by every generator in the process"""
+        path = os.getenv('USAGE_LOG_PATH', 'token_usage.jsonl')
+        with _instances_lock:
+            logger = _instances.get(path)
+            if logger is None or logger._closed:
+                logger = _instances[path] = cls(
+                    path=path,
+                    flush_interval=float(os.getenv('USAGE_LOG_FLUSH_INTERVAL', '1')),
+                    max_bytes=int(float(os.getenv('USAGE_LOG_MAX_MB', '10')) * 1024 * 1024),
+                    backups=int(os.getenv('USAGE_LOG_BACKUPS', '5')),
+                )
+            return logger
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='usage-log-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def log(self, record: Dict):
+        """Queue one record; never blocks on I/O"""
+        if self._closed:
+            return
+        self._ensure_started()
+        self._queue.put(record)
+
+    def flush(self, timeout: Optional[float] = 5.0):
+        """Block until every record queued so far is written"""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        """Flush pending records and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5.0)
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            # Drain whatever else is queued, up to one batch
+            batch: List[Dict] = []
+            markers = []
+            stop = False
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    markers.append(item)
+                else:
+                    batch.append(item)
+                if stop or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write(batch)
+            for marker in markers:
+                marker.set()
+            if stop:
+                return
+
+    def _write(self, batch: List[Dict]):
+        data = ''.join(json.dumps(record, default=str, ensure_ascii=False) + '\n' for record in batch)
+        try:
+            self._rotate_if_needed(len(data))
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(data)
+            self.stats['written'] += len(batch)
+            self.stats['batches'] += 1
+        except OSError as e:
+            self.stats['errors'] += 1
+            print(f"[Warning] Could not write usage log: {e}")
+
+    def _rotate_if_needed(self, incoming: int):
+        if not self.max_bytes:
+            return
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            return
+        if size + incoming <= self.max_bytes:
+            return
+
+        if self.backups:
+            for i in range(self.backups - 1, 0, -1):
+                older = self.path.with_name(f"{self.path.name}.{i}")
+                if older.exists():
+                    older.replace(self.path.with_name(f"{self.path.name}.{i + 1}"))
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+        self.stats['rotations'] += 1
+
+
+def read_usage_log(path: str) -> List[Dict]:
+    """Records from a usage log and its rotated backups, oldest file first"""
+    base = Path(path)
+    backups = [p for p in base.parent.glob(f"{base.name}.*") if p.suffix[1:].isdigit()]
+    backups.sort(key=lambda p: int(p.suffix[1:]), reverse=True)
+    records = []
+    for file in backups + [base]:
+        if not file.exists():
+            continue
+        with open(file, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A partially written last line after a crash
+                    continue
+    return records
@@ -0,0 +1 @@
+# Cache module for generated SQL and query results
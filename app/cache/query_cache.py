@@ -0,0 +1,283 @@
+"""
+Query Cache
+Two-tier cache: normalized question -> validated SQL, and (opt-in) SQL -> result rows
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from decimal import Decimal
+from typing import Any, Callable, Dict, Optional
+
+from app.database.result_set import ResultSet, typed_column
+from app.security.sql_tokenizer import tokenize
+
+# Filler words that do not change what a question asks for
+_FILLER = re.compile(
+    r'^(?:please |can you |could you |would you |show me |tell me |give me |list |find |get '
+    r'|what is |what are |what s )+'
+)
+_ARTICLES = re.compile(r'\b(?:the|a|an|please)\b')
+_NON_WORD = re.compile(r'[^\w\s%.-]')
+_WHITESPACE = re.compile(r'\s+')
+# Quoted values, delimited like the text slots of SQL templates
+_QUOTED = re.compile(r"""((?<!\w)"[^"]+"(?!\w)|(?<!\w)'[^']+'(?!\w))""")
+
+
+def normalize_question(question: str) -> str:
+    """Normalize trivially rephrased questions to the same key
+
+    Quoted values are kept as written: 'ACME' and 'acme' may match different rows.
+    """
+    parts = _QUOTED.split(question)
+    text = ''.join(part if i % 2 else _ARTICLES.sub(' ', _NON_WORD.sub(' ', part.lower()))
+                   for i, part in enumerate(parts))
+    text = _WHITESPACE.sub(' ', text).strip().rstrip('.')
+    text = _FILLER.sub('', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace between tokens and drop comments and trailing semicolons
+    
+    String literals and quoted identifiers are kept byte for byte, so queries
+    that differ only inside a literal ('a  b' vs 'a b') get different keys.
+    SQL that does not tokenize is returned unchanged.
+    """
+    try:
+        tokens = list(tokenize(sql))
+    except ValueError:
+        return sql
+    while tokens and tokens[-1].value == ';':
+        tokens.pop()
+    return ' '.join(token.value for token in tokens)
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+
+# Result column types JSON has no literal for: type -> (tag, to JSON, from JSON)
+_COLUMN_CODECS = {
+    Decimal: ('decimal', str, Decimal),
+    datetime.datetime: ('datetime', datetime.datetime.isoformat, datetime.datetime.fromisoformat),
+    datetime.date: ('date', datetime.date.isoformat, datetime.date.fromisoformat),
+    datetime.time: ('time', datetime.time.isoformat, datetime.time.fromisoformat),
+    datetime.timedelta: ('interval', lambda v: [v.days, v.seconds, v.microseconds],
+                         lambda v: datetime.timedelta(*v)),
+    uuid.UUID: ('uuid', str, uuid.UUID),
+}
+_COLUMN_DECODERS = {tag: decode for tag, _, decode in _COLUMN_CODECS.values()}
+_JSON_SCALARS = {str, int, float, bool}
+
+
+def encode_result(results: ResultSet) -> Dict:
+    """Columns of a ResultSet as JSON-compatible lists
+
+    Raises TypeError for columns mixing types or holding other objects
+    (arrays, json, bytea); such results are not cached.
+    """
+    columns = []
+    for name in results.columns:
+        values = results.column(name)
+        kinds = set(map(type, values)) - {type(None)}
+        if kinds <= _JSON_SCALARS:
+            columns.append({'values': values})
+        elif len(kinds) == 1 and kinds.issubset(_COLUMN_CODECS):
+            tag, encode, _ = _COLUMN_CODECS[kinds.pop()]
+            columns.append({'type': tag, 'values': [None if v is None else encode(v) for v in values]})
+        else:
+            raise TypeError(f"Column {name} holds {', '.join(sorted(k.__name__ for k in kinds))}")
+    return {'columns': results.columns, 'data': columns}
+
+
+def decode_result(value: Dict) -> ResultSet:
+    data = []
+    for column in value['data']:
+        values = column['values']
+        if 'type' in column:
+            decode = _COLUMN_DECODERS[column['type']]
+            values = [None if v is None else decode(v) for v in values]
+        data.append(typed_column(values))
+    return ResultSet(value['columns'], data)
+
+
+class PersistentLRUCache:
+    """SQLite-backed LRU cache with entry/byte limits and an optional TTL
+
+    Values are stored as JSON, never pickled, since the file may have been
+    written by someone else. ``encode``/``decode`` convert other objects to and
+    from JSON-compatible values; entries that do not decode are misses.
+    """
+
+    def __init__(self, path: str, table: str, max_entries: int = 1000,
+                 max_bytes: Optional[int] = None, ttl: Optional[float] = None,
+                 encode: Optional[Callable[[Any], Any]] = None, decode: Optional[Callable[[Any], Any]] = None):
+        self.table = table
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.encode = encode
+        self.decode = decode
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)")
+
+    def _load(self, blob) -> Optional[Any]:
+        try:
+            value = json.loads(blob)
+            return self.decode(value) if self.decode else value
+        except (ValueError, TypeError, KeyError):
+            # Written by an older version (pickled) or not by this cache at all
+            return None
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        expired = row is not None and self.ttl is not None and now - row[1] > self.ttl
+        value = self._load(row[0]) if row is not None and not expired else None
+
+        with self._lock:
+            if value is None:
+                if row is not None:
+                    self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self.stats['misses'] += 1
+                return None
+
+            self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+            self.stats['hits'] += 1
+        return value
+
+    def set(self, key: str, value: Any):
+        try:
+            blob = json.dumps(self.encode(value) if self.encode else value, separators=(',', ':'))
+        except TypeError:
+            # Values JSON cannot represent are not cached
+            return
+        if self.max_bytes is not None and len(blob) > self.max_bytes:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now, now)
+            )
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until both limits hold (lock held)"""
+        count, total = self._conn.execute(
+            f"SELECT count(*), coalesce(sum(size), 0) FROM {self.table}"
+        ).fetchone()
+
+        excess = max(0, count - self.max_entries)
+        if self.max_bytes is not None and total > self.max_bytes:
+            freed = 0
+            for (size,) in self._conn.execute(
+                    f"SELECT size FROM {self.table} ORDER BY accessed_at LIMIT -1 OFFSET ?", (excess,)):
+                if total - freed <= self.max_bytes:
+                    break
+                freed += size
+                excess += 1
+
+        if excess:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY accessed_at LIMIT ?)", (excess,)
+            )
+            self.stats['evictions'] += excess
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+
+class QueryCache:
+    """Caches generated SQL per question and, with ``cache_results``, result rows per SQL statement
+
+    Result rows are written to ``path`` as they are, so they are only cached
+    when asked for.
+    """
+
+    def __init__(self, path: str = ':memory:', sql_max_entries: int = 1000, cache_results: bool = False,
+                 result_max_entries: int = 200, result_max_bytes: Optional[int] = 64 * 1024 * 1024,
+                 result_ttl: Optional[float] = 300):
+        self.sql_cache = PersistentLRUCache(path, 'sql_cache', max_entries=sql_max_entries)
+        self.result_cache = None if not cache_results else PersistentLRUCache(
+            path, 'result_cache',
+            max_entries=result_max_entries,
+            max_bytes=result_max_bytes,
+            ttl=result_ttl,
+            encode=encode_result,
+            decode=decode_result,
+        )
+
+    @classmethod
+    def from_env(cls) -> Optional['QueryCache']:
+        """Create the cache from QUERY_CACHE_* variables unless QUERY_CACHE_ENABLED=false"""
+        if os.getenv('QUERY_CACHE_ENABLED', 'true').lower() in ('false', '0', 'no'):
+            return None
+        return cls(
+            path=os.getenv('QUERY_CACHE_PATH', '.query_cache.sqlite'),
+            sql_max_entries=int(os.getenv('QUERY_CACHE_SQL_MAX', '1000')),
+            cache_results=os.getenv('QUERY_CACHE_RESULTS', 'false').lower() in ('true', '1', 'yes'),
+            result_max_entries=int(os.getenv('QUERY_CACHE_RESULT_MAX', '200')),
+            result_max_bytes=int(float(os.getenv('QUERY_CACHE_RESULT_MAX_MB', '64')) * 1024 * 1024),
+            result_ttl=float(os.getenv('QUERY_CACHE_RESULT_TTL', '300')),
+        )
+
+    @staticmethod
+    def _sql_key(question: str, schema_context: str, bulk: bool = False) -> str:
+        # Bulk SQL (exports, streaming) is generated without a model-chosen LIMIT
+        parts = [normalize_question(question), _digest(schema_context)]
+        if bulk:
+            parts.append('bulk')
+        return _digest(*parts)
+
+    @staticmethod
+    def _result_key(db_identity: str, sql: str) -> str:
+        return _digest(db_identity, normalize_sql(sql))
+
+    def get_sql(self, question: str, schema_context: str, bulk: bool = False) -> Optional[str]:
+        return self.sql_cache.get(self._sql_key(question, schema_context, bulk))
+
+    def put_sql(self, question: str, schema_context: str, sql: str, bulk: bool = False):
+        self.sql_cache.set(self._sql_key(question, schema_context, bulk), sql)
+
+    def get_result(self, db_identity: str, sql: str):
+        if self.result_cache is None:
+            return None
+        return self.result_cache.get(self._result_key(db_identity, sql))
+
+    def put_result(self, db_identity: str, sql: str, results):
+        if self.result_cache is not None:
+            self.result_cache.set(self._result_key(db_identity, sql), results)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for both tiers"""
+        result_stats = self.result_cache.stats if self.result_cache is not None else {'hits': 0, 'misses': 0}
+        return {
+            'sql_hits': self.sql_cache.stats['hits'],
+            'sql_misses': self.sql_cache.stats['misses'],
+            'result_hits': result_stats['hits'],
+            'result_misses': result_stats['misses'],
+        }
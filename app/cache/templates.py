@@ -0,0 +1,395 @@
+"""
+SQL Templates
+Validated SQL with its literals turned into parameters, reused for questions of the same shape
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.cache.query_cache import PersistentLRUCache, _digest, normalize_question, normalize_sql
+from app.security.sql_tokenizer import tokenize
+
+MONTHS = ('january', 'february', 'march', 'april', 'may', 'june', 'july',
+          'august', 'september', 'october', 'november', 'december')
+
+# Values in a question that usually become SQL literals, most specific first:
+# quoted text, ISO dates, numbers, month names and capitalized names (not the
+# question's first word)
+_SLOT_RE = re.compile(
+    r"""(?<!\w)"(?P<dquoted>[^"]+)"(?!\w)
+      | (?<!\w)'(?P<squoted>[^']+)'(?!\w)
+      | (?P<date>\b\d{4}-\d{2}-\d{2}\b)
+      | (?P<number>(?<![\w.])\d+(?:\.\d+)?(?!\w|\.\d))
+      | (?P<month>\b(?i:""" + '|'.join(MONTHS) + r""")\b)
+      | (?<=\s)(?P<name>[A-Z][\w&-]+(?:\s+[A-Z][\w&-]+)*)""",
+    re.VERBOSE
+)
+_SLOT_KINDS = {'dquoted': 'text', 'squoted': 'text', 'name': 'text', 'date': 'date',
+               'number': 'number', 'month': 'month'}
+
+
+class Slot(NamedTuple):
+    """A value in a question: kind is text, date, number or month"""
+    kind: str
+    value: str
+
+
+class TemplateParam(NamedTuple):
+    """How one SQL literal is rebuilt from a question slot
+
+    The literal is ``prefix + <slot value in form> + suffix`` (e.g. ``'%'`` +
+    name + ``'%'``); ``quoted`` literals are strings, the others numbers.
+    """
+    slot: int
+    form: str
+    prefix: str
+    suffix: str
+    quoted: bool
+
+
+class SQLTemplate(NamedTuple):
+    """SQL for one question shape with its literals replaced by parameters
+
+    ``fixed`` holds, per slot, None for slots that feed a parameter and the
+    lowercased value for slots the SQL does not contain (those must match
+    exactly). ``parts`` is the SQL text around the parameters. A template is
+    only reused once every parameter was seen to change with the question and
+    the model wrote the SQL the template predicted (``verified_slots``).
+    """
+    shape: str
+    fixed: Tuple[Optional[str], ...]
+    parts: Tuple[str, ...]
+    params: Tuple[TemplateParam, ...]
+    seed: Tuple[str, ...]
+    verified_slots: frozenset = frozenset()
+
+    @property
+    def verified(self) -> bool:
+        return all(param.slot in self.verified_slots for param in self.params)
+
+    @property
+    def name(self) -> str:
+        """Prepared statement name, the same on every run for the same SQL"""
+        return 'agent_tpl_' + hashlib.sha256(self.prepared_sql().encode('utf-8')).hexdigest()[:16]
+
+    def matches(self, slots: List[Slot]) -> bool:
+        return len(slots) == len(self.fixed) and all(
+            fixed is None or fixed == slot.value.lower() for fixed, slot in zip(self.fixed, slots)
+        )
+
+    def values(self, slots: List[Slot]) -> List:
+        """Parameter values for a question's slots
+
+        Raises:
+            ValueError: when a slot does not fit its literal (e.g. text for a number)
+        """
+        values = []
+        for param in self.params:
+            text = param.prefix + _render(param.form, slots[param.slot].value) + param.suffix
+            if param.quoted:
+                values.append(text)
+                continue
+            try:
+                values.append(int(text) if text.isdigit() else Decimal(text))
+            except InvalidOperation:
+                raise ValueError(f"'{text}' is not a number")
+        return values
+
+    def render(self, slots: List[Slot]) -> str:
+        """The SQL with the question's values written inline"""
+        out = [self.parts[0]]
+        for param, value, part in zip(self.params, self.values(slots), self.parts[1:]):
+            out.append("'" + value.replace("'", "''") + "'" if param.quoted else str(value))
+            out.append(part)
+        return ''.join(out)
+
+    def prepared_sql(self) -> str:
+        """The SQL with $1, $2, ... placeholders, for PREPARE"""
+        out = [self.parts[0]]
+        for position, part in enumerate(self.parts[1:], 1):
+            out.append(f'${position}')
+            out.append(part)
+        return ''.join(out)
+
+
+def extract_slots(question: str) -> List[Slot]:
+    """Values in the question that may appear as literals in its SQL"""
+    return [Slot(_SLOT_KINDS[m.lastgroup], m.group(m.lastgroup)) for m in _SLOT_RE.finditer(question)]
+
+
+def question_shape(question: str) -> Tuple[str, List[Slot]]:
+    """(normalized question with each value replaced by its kind, slots)"""
+    slots, parts, pos = [], [], 0
+    for m in _SLOT_RE.finditer(question):
+        kind = _SLOT_KINDS[m.lastgroup]
+        slots.append(Slot(kind, m.group(m.lastgroup)))
+        parts.append(question[pos:m.start()])
+        parts.append(f' __{kind}__ ')
+        pos = m.end()
+    parts.append(question[pos:])
+    return normalize_question(''.join(parts)), slots
+
+
+def _render(form: str, value: str) -> str:
+    if not form.startswith('month'):
+        return value
+    month = MONTHS.index(value.lower()) + 1
+    if form == 'month_number':
+        return str(month)
+    if form == 'month_2d':
+        return f'{month:02d}'
+    name = MONTHS[month - 1]
+    return {'month_upper': name.upper(), 'month_title': name.title()}.get(form, name)
+
+
+def _occurrences(slot: Slot, content: str, quoted: bool) -> List[Tuple[str, int, int]]:
+    """(form, start, end) of each place ``slot`` appears in one literal's content"""
+    value = slot.value
+    if not quoted:
+        if slot.kind == 'number' and content == value:
+            return [('number', 0, len(content))]
+        if slot.kind == 'month' and content == str(MONTHS.index(value.lower()) + 1):
+            return [('month_number', 0, len(content))]
+        return []
+
+    if slot.kind == 'text':
+        pattern, flags = r'(?<!\w)' + re.escape(value) + r'(?!\w)', re.IGNORECASE
+    elif slot.kind == 'date':
+        pattern, flags = re.escape(value), 0
+    elif slot.kind == 'number':
+        # Only years inside strings ('2024-01-01'); other numbers are too ambiguous
+        if len(value) != 4 or not value.isdigit():
+            return []
+        pattern, flags = r'(?<!\d)' + value + r'(?!\d)', 0
+    else:
+        found = []
+        for m in re.finditer(r'(?<!\w)' + re.escape(value) + r'(?!\w)', content, re.IGNORECASE):
+            text = m.group()
+            form = 'month_upper' if text.isupper() else 'month_title' if text.istitle() else 'month_lower'
+            found.append((form, m.start(), m.end()))
+        month = MONTHS.index(value.lower()) + 1
+        found += [('month_2d', m.start(), m.end())
+                  for m in re.finditer(rf'(?<=\d-){month:02d}(?=-|$)', content)]
+        return found
+    return [(slot.kind, m.start(), m.end()) for m in re.finditer(pattern, content, flags)]
+
+
+# Typed literals (DATE '2024-01-01', INTERVAL '3 days') keep their keyword, so
+# the string after it cannot become a bare parameter
+_TYPE_KEYWORDS = {'DATE', 'TIME', 'TIMESTAMP', 'TIMESTAMPTZ', 'INTERVAL'}
+
+
+def build_template(question: str, sql: str) -> Optional[SQLTemplate]:
+    """Template for ``sql`` keyed by the shape of ``question``, or None
+
+    A literal becomes a parameter when exactly one question value appears in it
+    exactly once; SQL without such a literal, or with a literal that could come
+    from two values, gets no template.
+    """
+    shape, slots = question_shape(question)
+    if not slots:
+        return None
+    try:
+        tokens = tokenize(sql)
+    except ValueError:
+        return None
+
+    bound = []
+    previous = None
+    for token in tokens:
+        if token.kind == 'number':
+            content, quoted = token.value, False
+        elif token.kind == 'string' and token.value.startswith("'"):
+            content, quoted = token.value[1:-1].replace("''", "'"), True
+        else:
+            previous = token
+            continue
+
+        found = [(i, form, start, end)
+                 for i, slot in enumerate(slots)
+                 for form, start, end in _occurrences(slot, content, quoted)]
+        if len(found) > 1:
+            return None
+        if found:
+            if previous is not None and previous.kind == 'word' and previous.value.upper() in _TYPE_KEYWORDS:
+                return None
+            i, form, start, end = found[0]
+            bound.append((token, TemplateParam(i, form, content[:start], content[end:], quoted)))
+        previous = token
+
+    if not bound:
+        return None
+
+    used = {param.slot for _, param in bound}
+    parts, pos = [], 0
+    for token, _ in bound:
+        parts.append(sql[pos:token.start])
+        pos = token.end
+    parts.append(sql[pos:])
+    return SQLTemplate(
+        shape=shape,
+        fixed=tuple(None if i in used else slot.value.lower() for i, slot in enumerate(slots)),
+        parts=tuple(parts),
+        params=tuple(param for _, param in bound),
+        seed=tuple(slot.value.lower() for slot in slots),
+    )
+
+
+def _encode_templates(templates: List[SQLTemplate]) -> List[Dict]:
+    """A shape's templates as JSON-compatible dicts, for the cache file"""
+    return [{'shape': t.shape, 'fixed': list(t.fixed), 'parts': list(t.parts),
+             'params': [list(param) for param in t.params], 'seed': list(t.seed),
+             'verified_slots': sorted(t.verified_slots)} for t in templates]
+
+
+def _decode_templates(value: List[Dict]) -> List[SQLTemplate]:
+    return [SQLTemplate(shape=t['shape'], fixed=tuple(t['fixed']), parts=tuple(t['parts']),
+                        params=tuple(TemplateParam(*param) for param in t['params']), seed=tuple(t['seed']),
+                        verified_slots=frozenset(t['verified_slots'])) for t in value]
+
+
+class SQLTemplateStore:
+    """Learns SQL templates per question shape and fills them in for new questions
+
+    After the model answers a question, its SQL is stored as a candidate
+    template for the question's shape (the question with its values replaced by
+    their kind). When a later question of the same shape with different values
+    is answered with exactly the SQL the candidate predicts, those parameters
+    are verified; a different answer replaces the candidate. Fully verified
+    templates answer matching questions without the model, and the filled-in
+    SQL runs as a prepared statement.
+    """
+
+    # Templates kept per shape (different fixed values, e.g. 'sales' vs 'purchases')
+    max_per_shape = 8
+
+    def __init__(self, path: str = ':memory:', max_entries: int = 500):
+        self.cache = PersistentLRUCache(path, 'sql_templates', max_entries=max_entries,
+                                        encode=_encode_templates, decode=_decode_templates)
+        self.stats = {'lookups': 0, 'hits': 0, 'candidates': 0, 'verified': 0, 'mismatches': 0,
+                      'discarded': 0, 'llm_calls': 0, 'llm_seconds': 0.0}
+        self._lock = threading.Lock()
+        # Filled-in SQL -> (cache key, template), for prepared execution
+        self._filled: 'OrderedDict[str, Tuple[str, SQLTemplate, List]]' = OrderedDict()
+
+    @classmethod
+    def from_env(cls) -> Optional['SQLTemplateStore']:
+        """Create the store unless QUERY_TEMPLATES_ENABLED or QUERY_CACHE_ENABLED is false"""
+        for name in ('QUERY_CACHE_ENABLED', 'QUERY_TEMPLATES_ENABLED'):
+            if os.getenv(name, 'true').lower() in ('false', '0', 'no'):
+                return None
+        return cls(
+            path=os.getenv('QUERY_CACHE_PATH', '.query_cache.sqlite'),
+            max_entries=int(os.getenv('QUERY_TEMPLATES_MAX', '500')),
+        )
+
+    @staticmethod
+    def _key(shape: str, schema_context: str) -> str:
+        return _digest(shape, _digest(schema_context))
+
+    def lookup(self, question: str, schema_context: str) -> Optional[str]:
+        """SQL for the question from a verified template, or None"""
+        shape, slots = question_shape(question)
+        if not slots:
+            return None
+        key = self._key(shape, schema_context)
+        bucket = self.cache.get(key) or []
+
+        with self._lock:
+            self.stats['lookups'] += 1
+            for template in bucket:
+                if not (template.verified and template.matches(slots)):
+                    continue
+                try:
+                    sql = template.render(slots)
+                    values = template.values(slots)
+                except ValueError:
+                    continue
+                self._filled[sql] = (key, template, values)
+                while len(self._filled) > 256:
+                    self._filled.popitem(last=False)
+                self.stats['hits'] += 1
+                return sql
+        return None
+
+    def learn(self, question: str, schema_context: str, sql: str, llm_seconds: float = 0.0):
+        """Record the model's SQL for a question: add, verify or replace a template"""
+        with self._lock:
+            self.stats['llm_calls'] += 1
+            self.stats['llm_seconds'] += llm_seconds
+
+        template = build_template(question, sql)
+        if template is None:
+            return
+        _, slots = question_shape(question)
+        key = self._key(template.shape, schema_context)
+
+        with self._lock:
+            bucket = self.cache.get(key) or []
+            for i, existing in enumerate(bucket):
+                if not existing.matches(slots):
+                    continue
+                try:
+                    predicted = existing.render(slots)
+                except ValueError:
+                    predicted = None
+                if predicted is not None and normalize_sql(predicted) == normalize_sql(sql):
+                    changed = {p.slot for p in existing.params if slots[p.slot].value.lower() != existing.seed[p.slot]}
+                    if changed - existing.verified_slots:
+                        was_verified = existing.verified
+                        bucket[i] = existing._replace(verified_slots=existing.verified_slots | changed)
+                        if bucket[i].verified and not was_verified:
+                            self.stats['verified'] += 1
+                else:
+                    bucket[i] = template
+                    self.stats['mismatches'] += 1
+                break
+            else:
+                bucket.append(template)
+                self.stats['candidates'] += 1
+            self.cache.set(key, bucket[-self.max_per_shape:])
+
+    def prepared_for(self, sql: str) -> Optional[Tuple[str, str, List]]:
+        """(statement name, $n SQL, parameter values) when ``sql`` was filled in from a template"""
+        with self._lock:
+            filled = self._filled.get(sql)
+        if filled is None:
+            return None
+        _, template, values = filled
+        return template.name, template.prepared_sql(), values
+
+    def discard(self, sql: str):
+        """Forget the template ``sql`` came from (e.g. when it failed to prepare)"""
+        with self._lock:
+            filled = self._filled.pop(sql, None)
+            if filled is None:
+                return
+            key, template, _ = filled
+            bucket = self.cache.get(key) or []
+            self.cache.set(key, [t for t in bucket if t != template])
+            self.stats['discarded'] += 1
+
+    def summary(self) -> Dict:
+        """Hit rate and the model time saved, estimated from the average model call"""
+        with self._lock:
+            stats = dict(self.stats)
+        lookups, hits = stats['lookups'], stats['hits']
+        avg_llm = stats['llm_seconds'] / stats['llm_calls'] if stats['llm_calls'] else 0.0
+        return {
+            'template_lookups': lookups,
+            'template_hits': hits,
+            'template_hit_rate': hits / lookups if lookups else 0.0,
+            'template_saved_seconds': hits * avg_llm,
+            'templates_verified': stats['verified'],
+        }
+
+    def format_summary(self) -> str:
+        summary = self.summary()
+        return (f"{summary['template_hits']}/{summary['template_lookups']} questions answered from SQL templates "
+                f"({summary['template_hit_rate']:.0%}), ~{summary['template_saved_seconds']:.1f}s of model time saved, "
+                f"{summary['templates_verified']} templates verified this session")
@@ -0,0 +1,147 @@
+"""
+Command-Line Helpers
+Arguments and end-of-run reports shared by agent.py and odoo_agent.py
+"""
+
+import argparse
+
+from app.tracing.tracer import tracer, format_summary
+
+
+def add_common_args(parser: argparse.ArgumentParser):
+    """Add the question and the options both entry points accept"""
+    parser.add_argument(
+        'question',
+        nargs='?',
+        help='Natural language question to ask about the database'
+    )
+
+    parser.add_argument(
+        '--interactive', '-i',
+        action='store_true',
+        help='Run in interactive mode'
+    )
+
+    parser.add_argument(
+        '--batch',
+        metavar='FILE',
+        help='Answer questions from a JSONL file (one {"question": ...} per line)'
+    )
+
+    parser.add_argument(
+        '--batch-output',
+        metavar='FILE',
+        help='Where to write batch results as JSONL (default: <FILE>.results.jsonl)'
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=8,
+        help='Number of concurrent workers in batch mode (default: 8)'
+    )
+
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Stream rows through a server-side cursor instead of loading them all'
+    )
+
+    parser.add_argument(
+        '--limit',
+        type=int,
+        help='Row limit for every query, replacing QUERY_MAX_LIMIT (0 disables it)'
+    )
+
+    parser.add_argument(
+        '--output', '-o',
+        metavar='FILE',
+        help='Write all rows of the answer to a .csv, .parquet or .arrow file instead of printing them'
+    )
+
+    parser.add_argument(
+        '--databases',
+        metavar='DB1,DB2',
+        help='Run each query on these databases in parallel and merge the rows (with a _source column)'
+    )
+
+    parser.add_argument(
+        '--profile',
+        nargs='?',
+        const='profiles',
+        metavar='DIR',
+        help='Profile each question and write .prof/.folded files to DIR (default: profiles)'
+    )
+
+    parser.add_argument(
+        '--metrics-file',
+        metavar='PATH',
+        help='Write per-stage latency metrics on exit (JSON, or Prometheus text for *.prom)'
+    )
+
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        metavar='PORT',
+        help='Serve Prometheus metrics on http://127.0.0.1:PORT/metrics while running'
+    )
+
+    parser.add_argument(
+        '--no-warmup',
+        action='store_true',
+        help='Do not connect and load the schema in the background before the first question'
+    )
+
+    parser.add_argument(
+        '--pool-stats',
+        action='store_true',
+        help='Print connection pool statistics before exiting'
+    )
+
+
+def check_common_args(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    """Reject option combinations that would otherwise be silently ignored"""
+    if args.output and not args.question:
+        parser.error('--output needs a question')
+    if args.output and args.databases:
+        parser.error('--output reads from one database, it cannot be combined with --databases')
+    if args.stream and args.batch:
+        parser.error('--stream renders rows to the terminal, it cannot be combined with --batch')
+
+
+def configure_agent(agent, args: argparse.Namespace):
+    """Apply the options that change how the agent answers"""
+    if args.limit is not None:
+        # An explicit limit also replaces the QUERY_MAX_LIMIT cap on LIMITs the model writes
+        agent.row_limit = agent.max_limit = args.limit
+    if args.profile:
+        agent.profile_dir = args.profile
+    if args.databases:
+        agent.fan_out([name.strip() for name in args.databases.split(',') if name.strip()])
+    if args.metrics_port:
+        tracer.serve_prometheus(args.metrics_port)
+        print(f"[+] Serving metrics on http://127.0.0.1:{args.metrics_port}/metrics")
+
+
+def print_reports(agent, args: argparse.Namespace):
+    """Template, latency and pool summaries printed on exit"""
+    # Questions answered from SQL templates and the model time that saved
+    if agent.templates and (args.interactive or args.batch or agent.templates.stats['hits']):
+        print("\n[Templates] " + agent.templates.format_summary())
+
+    if args.profile or args.metrics_file or args.metrics_port:
+        print("\n[Latency] Per-stage timings (ms)")
+        print(format_summary())
+    if args.metrics_file:
+        tracer.write_metrics_file(args.metrics_file)
+        print(f"[+] Metrics written to {args.metrics_file}")
+
+    if args.pool_stats:
+        print("\n[Pool] " + ", ".join(f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}"
+                                     for k, v in agent.db.get_pool_stats().items()))
+        from app.database.router import ConnectionRouter
+        if isinstance(agent.db, ConnectionRouter):
+            for node in agent.db.status():
+                state = 'up' if node['healthy'] else f"down ({node.get('error')})"
+                print(f"[Replicas] {node['node']} {node['role']}: {state}, lag {node['lag']:.1f}s, "
+                      f"{node['queries']} queries")
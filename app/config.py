@@ -0,0 +1,20 @@
+"""
+Environment Configuration
+Loads the .env file once, for the CLIs and for components created from Python
+"""
+
+_loaded = False
+
+
+def load_env():
+    """Load .env into os.environ on first call (variables already set win)
+
+    Called by the entry points after argument parsing and by the components that
+    read their settings from the environment, so importing the package stays cheap.
+    """
+    global _loaded
+    if _loaded:
+        return
+    _loaded = True
+    from dotenv import load_dotenv
+    load_dotenv()
@@ -3,55 +3,373 @@ Core AI Agent
 Orchestrates database operations, AI, validation, and formatting
 """
 
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
+import os
+import threading
 import time
-from tabulate import tabulate
 
+from app.config import load_env
 from app.database.connection import DatabaseConnection
+from app.database.export import export_format, export_query
+from app.database.result_set import ResultSet
+from app.database.router import ConnectionRouter, FanOutConnection
 from app.database.schema import SchemaDiscovery
-from app.ai.gemini_service import GeminiSQLGenerator
+from app.database.schema_refresh import SchemaRefresher
+from app.database.snapshot import SchemaSnapshotCache
+from app.database.table_stats import TableStatsCatalog
+from app.ai.sql_generator import create_sql_generator
+from app.ai.context_builder import SchemaContextBuilder
 from app.security.validator import QueryValidator
+from app.security.cost_guard import CostGuard, QueryCostError
 from app.formatters.currency import CurrencyFormatter
+from app.formatters.stream import render_table_stream
+from app.cache.query_cache import QueryCache
+from app.cache.templates import SQLTemplateStore
+from app.core.warmup import WarmupCoordinator
+from app.tracing.tracer import tracer
+from app.tracing.profiler import profile_call
 
 
 class DatabaseAgent:
     """Main agent class that orchestrates all components"""
     
-    def __init__(self):
-        self.db = DatabaseConnection()
-        self.schema = SchemaDiscovery(self.db)
-        self.ai = GeminiSQLGenerator()
+    # Shown in the execution message, e.g. " on Odoo.sh"
+    target_label = ""
+    
+    def __init__(self, ai=None):
+        load_env()
+        self.db = self._create_connection()
+        # Set by fan_out(): answers run on several databases at once
+        self.fanout = None
+        self.schema = SchemaDiscovery(self.db, SchemaSnapshotCache.from_env(), TableStatsCatalog.from_env(self.db))
+        # Reloads tables altered while the agent runs (started with the schema)
+        self.schema_refresher = SchemaRefresher.from_env(self.schema)
+        # SQLGenerator backend (SQL_GENERATOR: gemini, replay, record or stub)
+        self.ai = ai or create_sql_generator()
+        self.context_builder = SchemaContextBuilder.from_env()
         self.validator = QueryValidator()
         self.formatter = CurrencyFormatter()
+        self.cache = QueryCache.from_env()
+        self.templates = SQLTemplateStore.from_env()
+        self.cost_guard = CostGuard.from_env(self.db)
         self._last_usage_info = {}
+        self._schema_lock = threading.Lock()
+        
+        # LIMIT injected into queries without one (0 disables it)
+        self.row_limit = int(os.getenv('QUERY_ROW_LIMIT', '100'))
+        # Upper bound for LIMITs written by the model (0 disables clamping)
+        self.max_limit = int(os.getenv('QUERY_MAX_LIMIT', '1000'))
+        # Regenerations allowed when a query is over the cost budget
+        self.cost_retries = int(os.getenv('QUERY_COST_RETRIES', '1'))
+        # Rows fetched per round trip by server-side cursors in streaming mode
+        self.stream_itersize = int(os.getenv('QUERY_STREAM_ITERSIZE', '2000'))
+        # Statement timeout in seconds for --output exports (they read every row)
+        self.export_timeout = float(os.getenv('QUERY_EXPORT_TIMEOUT', '600'))
+        # Directory for per-question cProfile/flamegraph dumps (None disables profiling)
+        self.profile_dir = None
+        
+        # Report cache hit/miss counters in the token usage log
+        if self.cache or self.templates:
+            self.ai.cache_stats = self._cache_stats
     
-    def query(self, question: str) -> Tuple[List, str]:
-        """Main method: convert question to SQL, execute, and return results"""
-        try:
-            # Discover schema if needed
-            if not self.schema.schema_cache:
-                self.schema.discover_schema()
-            
-            # Get relevant schema for context
-            schema_context = self.schema.get_relevant_schema(question)
+    def _cache_stats(self) -> Dict:
+        stats = self.cache.stats() if self.cache else {}
+        if self.templates:
+            summary = self.templates.summary()
+            stats['template_hits'] = summary['template_hits']
+            stats['template_misses'] = summary['template_lookups'] - summary['template_hits']
+        return stats
+    
+    def _create_connection(self, database: Optional[str] = None):
+        """Create the database connection used by this agent
+        
+        With POSTGRES_REPLICAS set, queries are spread over the replicas.
+        """
+        return ConnectionRouter.from_env(DatabaseConnection(database=database))
+    
+    def fan_out(self, databases: List[str]):
+        """Run every answer on each of ``databases`` in parallel and merge the rows
+        
+        Rows get a ``_source`` column naming their database. Schema discovery
+        and cost checks stay on the agent's own database, so the databases
+        should share its schema (e.g. one Odoo database per company).
+        """
+        if self.fanout:
+            self.fanout.close()
+        self.fanout = FanOutConnection([self._create_connection(name) for name in databases]) if databases else None
+    
+    def _discover_schema(self):
+        """Load the schema (from snapshot or catalog) on first use"""
+        self.schema.load_schema()
+    
+    def warm_up(self, on_ready=None) -> WarmupCoordinator:
+        """Start connecting, schema discovery and the LLM handshake in the background"""
+        return WarmupCoordinator(self, on_ready=on_ready).start()
+    
+    def ensure_schema(self):
+        """Discover the schema once, even when called from several threads"""
+        if not self.schema.schema_cache:
+            with self._schema_lock:
+                if not self.schema.schema_cache:
+                    self._discover_schema()
+                    if self.schema_refresher:
+                        self.schema_refresher.start()
+    
+    def prepare_sql(self, question: str, timings: Optional[Dict] = None,
+                    row_limit: Optional[int] = None, bulk: bool = False) -> Tuple[str, Dict]:
+        """Turn a question into validated, limited SQL
+        
+        Stage durations (seconds) are recorded into ``timings`` when given.
+        ``row_limit`` overrides the agent's row limit and its QUERY_MAX_LIMIT
+        cap (0 disables both).
+        ``bulk`` is for exports and streaming: rows are written out as they
+        arrive, so the model is asked not to add a LIMIT, SQL templates (which
+        carry the interactive limit) are skipped, the row estimate budget does
+        not apply, and a query over the cost budget fails instead of being
+        regenerated (the new query could add a LIMIT and silently truncate the
+        output).
+        
+        Returns:
+            tuple: (sql_query, usage_info_dict)
+        """
+        timings = {} if timings is None else timings
+        if row_limit is None:
+            row_limit, max_limit = self.row_limit, self.max_limit
+        else:
+            max_limit = row_limit
+        self.ensure_schema()
+        
+        # Get relevant schema for context
+        start_time = time.perf_counter()
+        relevant_tables, definitions = self.schema.get_relevant_definitions(question)
+        with tracer.span('schema.context'):
+            schema_context = self.context_builder.build(
+                question, definitions, relevant_tables,
+                join_hints=self.schema.get_join_hints(relevant_tables),
+                table_stats=self.schema.get_table_stats()
+            )
+        timings['schema_context'] = time.perf_counter() - start_time
+        
+        # Reuse validated SQL for the same (or trivially rephrased) question
+        start_time = time.perf_counter()
+        sql = self.cache.get_sql(question, schema_context, bulk=bulk) if self.cache else None
+        # The cache file outlives the process and the deny-list it was checked against
+        if sql and not self._revalidate(sql, timings):
+            sql = None
+        source = 'cache' if sql else None
+        
+        # Same question with different values: fill in a verified SQL template
+        if not sql and self.templates and not bulk:
+            with tracer.span('template.lookup'):
+                sql = self.templates.lookup(question, schema_context)
+            # Values from the question are spliced into the template's literals
+            if sql and not self._revalidate(sql, timings):
+                sql = None
+            source = 'template' if sql else None
+        
+        if sql:
+            if source == 'cache':
+                print(f"\n[Cache] Reusing SQL for: \"{question}\"")
+            else:
+                print("\n[Template] Filled in the SQL of a known question shape (LLM skipped)")
+            timings['generate'] = time.perf_counter() - start_time
+            usage_info = {'prompt_token_count': 0, 'candidates_token_count': 0, 'total_token_count': 0}
+            self.ai.log_token_usage(question, sql, usage_info, source=source)
+        else:
+            sql, usage_info = self._generate_sql(question, schema_context, timings, bulk=bulk)
+            source = 'llm'
+        
+        # Check the plan estimate, regenerating while it is over budget
+        attempt = 0
+        while True:
+            start_time = time.perf_counter()
+            limited_sql = sql
+            if row_limit:
+                limited_sql = self.validator.add_limit_if_needed(sql, row_limit, max_limit or None)
+            timings['validate'] = timings.get('validate', 0.0) + time.perf_counter() - start_time
             
-            # Generate SQL and get token usage
-            sql, usage_info = self.ai.generate_sql(question, schema_context)
+            if not self.cost_guard:
+                break
+            try:
+                estimate = self._check_cost(limited_sql, timings, check_rows=not bulk)
+                self._warn_large_scans(estimate)
+                break
+            except QueryCostError as e:
+                if bulk or attempt >= self.cost_retries:
+                    raise
+                attempt += 1
+                source = 'llm'
+                print(f"\n[!] {e}, regenerating ({attempt}/{self.cost_retries})...")
+                sql, usage_info = self._generate_sql(question, schema_context, timings, hint=e.hint, bulk=bulk)
+        
+        if self.cache and source != 'cache':
+            self.cache.put_sql(question, schema_context, sql, bulk=bulk)
+        if self.templates and source == 'llm' and not bulk:
+            self.templates.learn(question, schema_context, limited_sql, llm_seconds=timings.get('generate', 0.0))
+        
+        return limited_sql, usage_info
+    
+    def _generate_sql(self, question: str, schema_context: str, timings: Dict, hint: str = "",
+                      bulk: bool = False) -> Tuple[str, Dict]:
+        """Generate SQL and validate it, adding to the generate/validate timings"""
+        start_time = time.perf_counter()
+        sql, usage_info = self.ai.generate_sql(question, schema_context, hint=hint, bulk=bulk)
+        timings['generate'] = timings.get('generate', 0.0) + time.perf_counter() - start_time
+        
+        # Validate
+        start_time = time.perf_counter()
+        with tracer.span('validate'):
+            self.validator.validate_query(sql)
+        timings['validate'] = timings.get('validate', 0.0) + time.perf_counter() - start_time
+        
+        return sql, usage_info
+    
+    def _revalidate(self, sql: str, timings: Dict) -> bool:
+        """Validate reused SQL like freshly generated SQL; False means generate it again"""
+        start_time = time.perf_counter()
+        try:
+            with tracer.span('validate'):
+                self.validator.validate_query(sql)
+            return True
+        except ValueError as e:
+            print(f"\n[Warning] Reused SQL failed validation, generating it again: {e}")
+            return False
+        finally:
+            timings['validate'] = timings.get('validate', 0.0) + time.perf_counter() - start_time
+    
+    def _check_cost(self, sql: str, timings: Dict, check_rows: bool = True) -> Dict:
+        """Return the planner estimate, or raise QueryCostError if it is over budget"""
+        start_time = time.perf_counter()
+        try:
+            return self.cost_guard.check(sql, check_rows=check_rows)
+        finally:
+            timings['cost_check'] = timings.get('cost_check', 0.0) + time.perf_counter() - start_time
+    
+    def _warn_large_scans(self, estimate: Dict):
+        """Warn when the plan reads a large table sequentially"""
+        catalog = self.schema.table_stats
+        if catalog is None:
+            return
+        try:
+            large = [t for t in dict.fromkeys(estimate.get('seq_scans', ())) if catalog.is_large(t)]
+        except Exception:
+            return
+        for table in large:
+            print(f"\n[!] Warning: full scan of {catalog.describe(table)}; this query may be slow")
+    
+    def fetch_results(self, sql: str, timings: Optional[Dict] = None) -> ResultSet:
+        """Execute SQL (or serve it from the result cache) and return the rows"""
+        timings = {} if timings is None else timings
+        target = self.fanout or self.db
+        start_time = time.time()
+        results = self.cache.get_result(target.identity(), sql) if self.cache else None
+        
+        if results is not None:
+            print("\n[Cache] Served result from cache")
+            timings['execute'] = time.time() - start_time
+            return results
+        
+        prepared = self.templates.prepared_for(sql) if self.templates else None
+        if prepared:
+            try:
+                results = target.execute_prepared(*prepared)
+            except TimeoutError:
+                raise
+            except Exception as e:
+                print(f"\n[Warning] Prepared template statement failed, running the SQL directly: {e}")
+                self.templates.discard(sql)
+                results = target.execute_query(sql)
+        else:
+            results = target.execute_query(sql)
+        execution_time = time.time() - start_time
+        timings['execute'] = execution_time
+        
+        print(f"\n[+] Query executed in {execution_time:.2f}s")
+        
+        if self.cache:
+            self.cache.put_result(target.identity(), sql, results)
+        return results
+    
+    def query(self, question: str, stream: bool = False) -> Tuple[List, str]:
+        """Main method: convert question to SQL, execute, and return results
+        
+        With ``stream=True`` rows are fetched through a server-side cursor and
+        rendered as they arrive; the row count is returned instead of the rows.
+        """
+        if self.profile_dir:
+            return profile_call(question, self._query, question, stream, output_dir=self.profile_dir)
+        return self._query(question, stream)
+    
+    def export(self, question: str, path: str, fmt: Optional[str] = None,
+               row_limit: int = 0) -> Tuple[Optional[int], Optional[str]]:
+        """Answer a question into a CSV, Parquet or Arrow file instead of the terminal
+        
+        Every row is written (no automatic LIMIT unless ``row_limit`` is set) and
+        the result cache, currency formatting and table rendering are bypassed.
+        
+        Returns:
+            tuple: (row_count, sql)
+        """
+        with tracer.span('question'):
+            try:
+                # Reject unknown formats before spending tokens on the SQL
+                fmt = export_format(path, fmt)
+                if self.fanout:
+                    raise ValueError("Exports read from one database; run them without --databases")
+                sql, usage_info = self.prepare_sql(question, row_limit=row_limit, bulk=True)
+                self._last_usage_info = usage_info
+                
+                print(f"\n[DB] Exporting query{self.target_label} to {path}:\n{sql}\n")
+                
+                start_time = time.time()
+                row_count = export_query(self.db, sql, path, fmt, timeout=self.export_timeout)
+                elapsed = time.time() - start_time
+                print(f"[+] Exported {row_count} rows to {path} in {elapsed:.2f}s "
+                      f"({row_count / elapsed if elapsed else 0:,.0f} rows/s)\n")
+                return row_count, sql
+                
+            except Exception as e:
+                print(f"\n[!] Error: {e}")
+                return None, None
+    
+    def _query(self, question: str, stream: bool) -> Tuple[List, str]:
+        with tracer.span('question'):
+            return self._answer(question, stream)
+    
+    @staticmethod
+    def _time_first_row(rows, question_start: float):
+        """Pass rows through, recording the time from the question to the first one"""
+        first = True
+        for row in rows:
+            if first:
+                tracer.record('question.first_row', time.perf_counter() - question_start)
+                first = False
+            yield row
+    
+    def _answer(self, question: str, stream: bool) -> Tuple[List, str]:
+        question_start = time.perf_counter()
+        try:
+            sql, usage_info = self.prepare_sql(question, bulk=stream)
             
             # Store usage info for logging
             self._last_usage_info = usage_info
+
+            print(f"\n[DB] Executing query{self.target_label}:\n{sql}\n")
             
-            # Validate and execute
-            self.validator.validate_query(sql)
-            sql = self.validator.add_limit_if_needed(sql)
-            
-            print(f"\n[DB] Executing query:\n{sql}\n")
-            
-            start_time = time.time()
-            results = self.db.execute_query(sql)
-            execution_time = time.time() - start_time
+            if stream:
+                # fetch -> format -> render, one chunk at a time
+                start_time = time.time()
+                rows = (self.fanout or self.db).stream_query(sql, itersize=self.stream_itersize)
+                rows = self._time_first_row(rows, question_start)
+                with tracer.span('render.stream'):
+                    row_count = render_table_stream(self.formatter.iter_format_results(rows))
+                print(f"\n[+] Streamed {row_count} rows in {time.time() - start_time:.2f}s\n")
+                return row_count, sql
+
+            results = self.fetch_results(sql)
+            if results:
+                tracer.record('question.first_row', time.perf_counter() - question_start)
             
-            print(f"\n[+] Query executed in {execution_time:.2f}s")
             print(f"[+] Retrieved {len(results)} rows\n")
             
             if results:
@@ -59,11 +377,13 @@ class DatabaseAgent:
                 formatted_results = self.formatter.format_results(results)
                 
                 # Display results
-                print(tabulate(formatted_results, headers='keys', tablefmt='grid'))
+                with tracer.span('render.tabulate'):
+                    from tabulate import tabulate
+                    # Column-oriented input, no per-row dicts
+                    print(tabulate(formatted_results.column_dict(), headers='keys', tablefmt='grid'))
             
             return results, sql
             
         except Exception as e:
             print(f"\n[!] Error: {e}")
             return None, None
-
@@ -0,0 +1,82 @@
+"""
+Async AI Agent
+Runs the agent pipeline for many concurrent questions without blocking the event loop
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from app.core.agent import DatabaseAgent
+
+
+class AsyncDatabaseAgent:
+    """Asyncio front-end for a DatabaseAgent
+
+    The blocking stages (LLM call, query execution) run on a thread pool, so the
+    event loop stays free. Concurrency is bounded per stage: ``max_llm_concurrency``
+    caps in-flight LLM calls and ``max_db_concurrency`` in-flight queries (by
+    default the size of the agent's connection pool, so queries never wait on it).
+    """
+
+    def __init__(self, agent: Optional[DatabaseAgent] = None, max_concurrency: int = 16,
+                 max_llm_concurrency: Optional[int] = None, max_db_concurrency: Optional[int] = None):
+        self.agent = agent or DatabaseAgent()
+        self.max_concurrency = max_concurrency
+        self.max_llm_concurrency = max_llm_concurrency or max_concurrency
+        self.max_db_concurrency = max_db_concurrency or self.agent.db.max_connections()
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_llm_concurrency + self.max_db_concurrency,
+            thread_name_prefix='agent'
+        )
+        # Created on first use so they bind to the running loop
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._llm_slots: Optional[asyncio.Semaphore] = None
+        self._db_slots: Optional[asyncio.Semaphore] = None
+
+    def _ensure_semaphores(self):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._llm_slots = asyncio.Semaphore(self.max_llm_concurrency)
+            self._db_slots = asyncio.Semaphore(self.max_db_concurrency)
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def query(self, question: str) -> Dict:
+        """Answer one question, returns the SQL, rows and per-stage timings
+
+        Errors are reported in the result (``error`` key) instead of raised, so
+        one bad question does not cancel a batch gathered with ``query_many``.
+        """
+        self._ensure_semaphores()
+        result = {'question': question, 'sql': None, 'rows': None, 'error': None, 'timings': {}}
+
+        async with self._slots:
+            try:
+                async with self._llm_slots:
+                    sql, usage_info = await self._run(self.agent.prepare_sql, question, result['timings'])
+                result['sql'] = sql
+                result['usage'] = usage_info
+
+                async with self._db_slots:
+                    result['rows'] = await self._run(self.agent.fetch_results, sql, result['timings'])
+            except Exception as e:
+                result['error'] = str(e)
+
+        return result
+
+    async def query_many(self, questions: Iterable[str]) -> List[Dict]:
+        """Answer questions concurrently, results are returned in input order"""
+        # Discover the schema once up front instead of racing on the first questions
+        await self._run(self.agent.ensure_schema)
+        return await asyncio.gather(*(self.query(q) for q in questions))
+
+    async def close(self):
+        """Stop the schema refresher, shut down worker threads and close pooled connections"""
+        if self.agent.schema_refresher:
+            self.agent.schema_refresher.stop()
+        await self._run(self.agent.db.close)
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,138 @@
+"""
+Batch Runner
+Answers many questions from a JSONL file over a worker pool
+"""
+
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+def read_questions(path: str) -> List[Dict]:
+    """Read questions from JSONL
+
+    Each line is either a JSON string or an object with a ``question`` field and
+    an optional ``id`` (``request_id`` is accepted as well). Blank lines are skipped.
+    """
+    questions = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{line_no}: invalid JSON: {e}")
+
+            if isinstance(item, str):
+                item = {'question': item}
+            if not isinstance(item, dict) or not item.get('question'):
+                raise ValueError(f"{path}:{line_no}: expected a string or an object with a 'question' field")
+
+            questions.append({
+                'id': item.get('id', item.get('request_id', len(questions) + 1)),
+                'question': item['question'],
+            })
+    return questions
+
+
+class BatchRunner:
+    """Runs questions concurrently through one agent
+
+    All workers share the agent's schema (discovered once before fan-out) and
+    its connection pool, so ``workers`` above the pool size only adds LLM
+    concurrency; queries wait for a free connection.
+    """
+
+    def __init__(self, agent, workers: int = 8):
+        self.agent = agent
+        self.workers = workers
+
+    def _answer(self, item: Dict) -> Dict:
+        timings = {}
+        result = {'id': item['id'], 'question': item['question'], 'sql': None,
+                  'row_count': None, 'rows': None, 'error': None, 'timings': timings}
+        start = time.perf_counter()
+        try:
+            sql, usage_info = self.agent.prepare_sql(item['question'], timings)
+            result['sql'] = sql
+            result['usage'] = usage_info
+
+            rows = self.agent.fetch_results(sql, timings)
+            # Written as JSON, so one dict per row
+            result['rows'] = rows.to_dicts()
+            result['row_count'] = len(rows)
+        except Exception as e:
+            result['error'] = str(e)
+        timings['total'] = time.perf_counter() - start
+        return result
+
+    def run(self, questions: List[Dict], output_path: str) -> Dict:
+        """Answer all questions, write one JSON result per line and return a summary"""
+        start = time.perf_counter()
+        self.agent.ensure_schema()
+
+        results = []
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as out, \
+                ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='batch') as pool:
+            futures = [pool.submit(self._answer, item) for item in questions]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                # Results are written as they complete; ``id`` ties them to the input
+                out.write(json.dumps(result, default=str) + '\n')
+                out.flush()
+
+        elapsed = time.perf_counter() - start
+        return self.summarize(results, elapsed)
+
+    @staticmethod
+    def summarize(results: List[Dict], elapsed: float) -> Dict:
+        """Aggregate throughput and per-stage latency"""
+        succeeded = [r for r in results if not r['error']]
+        stages = {}
+        for result in succeeded:
+            for stage, seconds in result['timings'].items():
+                stages.setdefault(stage, []).append(seconds)
+
+        def p95(values):
+            ordered = sorted(values)
+            return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+        return {
+            'questions': len(results),
+            'succeeded': len(succeeded),
+            'failed': len(results) - len(succeeded),
+            'elapsed': elapsed,
+            'questions_per_sec': len(results) / elapsed if elapsed else 0.0,
+            'stages': {
+                stage: {'mean': statistics.mean(values), 'p95': p95(values)}
+                for stage, values in stages.items()
+            },
+        }
+
+
+def print_summary(summary: Dict):
+    """Print a batch summary in the CLI's style"""
+    print(f"\n[Batch] {summary['questions']} questions in {summary['elapsed']:.2f}s "
+          f"({summary['questions_per_sec']:.2f} questions/s), "
+          f"{summary['succeeded']} succeeded, {summary['failed']} failed")
+    for stage, stats in summary['stages'].items():
+        print(f"[Batch]   {stage:<15} mean {stats['mean'] * 1000:8.1f} ms   p95 {stats['p95'] * 1000:8.1f} ms")
+
+
+def run_batch_file(agent, input_path: str, output_path: Optional[str] = None, workers: int = 8) -> Dict:
+    """Answer every question in ``input_path`` and write JSONL results (CLI entry point)"""
+    questions = read_questions(input_path)
+    output_path = output_path or f"{input_path.rsplit('.', 1)[0]}.results.jsonl"
+
+    print(f"\n[Batch] Running {len(questions)} questions with {workers} workers...")
+    summary = BatchRunner(agent, workers=workers).run(questions, output_path)
+    print_summary(summary)
+    print(f"[Batch] Results written to {output_path}")
+    return summary
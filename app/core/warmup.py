@@ -0,0 +1,92 @@
+"""
+Warm-up Coordinator
+Runs the agent's startup work in the background so the first question does not pay for it
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.tracing.tracer import tracer
+
+
+class WarmupCoordinator:
+    """Starts tunnel/pool fill, schema discovery and the LLM handshake concurrently
+
+    Each task runs on its own daemon thread. Warm-up is speculative: a failed
+    task is reported and left to the normal lazy path, which will retry it (and
+    raise) when a question actually needs it. Work a question needs before a
+    task finished is not duplicated, since the agent serializes schema discovery
+    and the pool/tunnel creation.
+    """
+
+    def __init__(self, agent, on_ready: Optional[Callable[['WarmupCoordinator'], None]] = None):
+        self.agent = agent
+        self.on_ready = on_ready if on_ready is not None else self.report
+        self.durations: Dict[str, float] = {}
+        self.errors: Dict[str, Exception] = {}
+        self.elapsed: Optional[float] = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._start_time = 0.0
+
+    @staticmethod
+    def enabled() -> bool:
+        return os.getenv('WARMUP_ENABLED', 'true').lower() not in ('false', '0', 'no')
+
+    def tasks(self) -> List[Tuple[str, Callable]]:
+        """(name, callable) pairs run concurrently"""
+        agent = self.agent
+        return [
+            # Opens the SSH tunnel first for Odoo.sh, then POOL_MIN connections
+            ('database', agent.db.fill_pool),
+            ('schema', self._warm_schema),
+            ('llm', agent.ai.warm_up),
+        ]
+
+    def _warm_schema(self):
+        self.agent.ensure_schema()
+        # Row estimates and indexes go into the first prompt too
+        self.agent.schema.get_table_stats()
+
+    def start(self) -> 'WarmupCoordinator':
+        tasks = self.tasks()
+        self._pending = len(tasks)
+        self._start_time = time.perf_counter()
+        for name, fn in tasks:
+            threading.Thread(target=self._run, args=(name, fn), name=f"warmup-{name}", daemon=True).start()
+        return self
+
+    def _run(self, name: str, fn: Callable):
+        start_time = time.perf_counter()
+        try:
+            with tracer.span(f'warmup.{name}'):
+                fn()
+        except Exception as e:
+            self.errors[name] = e
+        finally:
+            with self._lock:
+                self.durations[name] = time.perf_counter() - start_time
+                self._pending -= 1
+                done = self._pending == 0
+            if done:
+                self.elapsed = time.perf_counter() - self._start_time
+                self._ready.set()
+                self.on_ready(self)
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until every task finished (successfully or not)"""
+        return self._ready.wait(timeout)
+
+    @staticmethod
+    def report(warmup: 'WarmupCoordinator'):
+        parts = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in warmup.durations.items())
+        print(f"\n[+] Warm-up ready in {warmup.elapsed:.2f}s ({parts})")
+        for name, error in warmup.errors.items():
+            print(f"[Warning] Warm-up of {name} failed: {error}")
@@ -4,18 +4,26 @@ Handles connection, disconnection, and connection pooling
 """
 
 import os
+import atexit
+import uuid
 import psycopg2
 import psycopg2.extras
 from contextlib import contextmanager
-from dotenv import load_dotenv
 
-load_dotenv()
+from app.config import load_env
+from app.database.pool import ConnectionPool
+from app.database.result_set import ResultSet
+from app.tracing.tracer import tracer
 
 
 class DatabaseConnection:
     """Manages PostgreSQL database connections"""
     
-    def __init__(self):
+    def __init__(self, **overrides):
+        """Connect with the POSTGRES_* settings; keyword arguments (e.g. host,
+        port, database, connect_timeout) override them, for replicas and
+        other databases on the same server"""
+        load_env()
         self.config = {
             'host': os.getenv('POSTGRES_HOST', 'localhost'),
             'port': os.getenv('POSTGRES_PORT', '5432'),
@@ -23,46 +31,201 @@ class DatabaseConnection:
             'user': os.getenv('POSTGRES_USER'),
             'password': os.getenv('POSTGRES_PASSWORD'),
         }
+        self.config.update((key, value) for key, value in overrides.items() if value is not None)
+    
+        self._init_pool('POSTGRES')
+    
+    def _init_pool(self, env_prefix: str):
+        """Create the connection pool, sized from <env_prefix>_POOL_* variables"""
+        self.pool = ConnectionPool(
+            self.connect,
+            configure_fn=self._configure_connection,
+            minconn=int(os.getenv(f'{env_prefix}_POOL_MIN', '1')),
+            maxconn=int(os.getenv(f'{env_prefix}_POOL_MAX', '5')),
+            max_idle=float(os.getenv(f'{env_prefix}_POOL_MAX_IDLE', '300')),
+        )
+        
+        # Close pooled connections on exit
+        atexit.register(self.close)
     
     def connect(self):
         """Create and return a database connection"""
         try:
-            conn = psycopg2.connect(**self.config)
+            with tracer.span('db.connect'):
+                conn = psycopg2.connect(**self.config)
             print(f"[+] Connected to database: {self.config['database']}")
             return conn
         except Exception as e:
             raise ConnectionError(f"Failed to connect to database: {e}")
     
+    @staticmethod
+    def _configure_connection(conn):
+        """Apply session settings once per physical connection"""
+        conn.set_session(readonly=True, autocommit=True)
+    
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections"""
-        conn = None
+        """Context manager for pooled database connections"""
+        with tracer.span('db.checkout'):
+            conn = self.pool.getconn()
         try:
-            conn = self.connect()
             yield conn
         finally:
-            if conn:
-                conn.close()
-                print("[+] Disconnected from database")
+            self.pool.putconn(conn)
+    
+    def _set_statement_timeout(self, conn, cursor, timeout):
+        """Set statement_timeout only when it differs from the session's current value"""
+        state = self.pool.state(conn)
+        timeout_ms = int(timeout * 1000)
+        if state.get('statement_timeout') != timeout_ms:
+            cursor.execute(f"SET statement_timeout = {timeout_ms};")
+            state['statement_timeout'] = timeout_ms
     
     def execute_query(self, sql, params=None, timeout=30):
-        """Execute a query and return results"""
+        """Execute a query and return its rows as a columnar ResultSet"""
         with self.get_connection() as conn:
-            conn.set_session(readonly=True, autocommit=True)
-            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+            cursor = conn.cursor()
             
             try:
                 # Set timeout
-                cursor.execute(f"SET statement_timeout = {timeout * 1000};")
-                cursor.execute(sql, params)
-                results = cursor.fetchall()
-                
-                # Convert to list of dicts
-                return [dict(row) for row in results]
+                self._set_statement_timeout(conn, cursor, timeout)
+                with tracer.span('db.execute'):
+                    cursor.execute(sql, params)
+                    # Column names once, values per column (rows are dict-like views)
+                    return ResultSet.from_cursor(cursor)
+            except psycopg2.extensions.QueryCanceledError:
+                raise TimeoutError(f"Query exceeded {timeout}s timeout")
+            except Exception as e:
+                raise RuntimeError(f"Query execution failed: {e}")
+            finally:
+                cursor.close()
+
+    def execute_prepared(self, name, sql, params, timeout=30):
+        """Execute ``sql`` ($1, $2, ... placeholders) as the prepared statement ``name``
+
+        The statement is prepared once per pooled connection and kept for the
+        connection's lifetime, so repeated executions skip parsing and planning
+        setup on the server. Returns a ResultSet like execute_query.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+
+            try:
+                self._set_statement_timeout(conn, cursor, timeout)
+                prepared = self.pool.state(conn).setdefault('prepared', set())
+                if name not in prepared:
+                    with tracer.span('db.prepare'):
+                        cursor.execute(f"PREPARE {name} AS {sql}")
+                    prepared.add(name)
+                with tracer.span('db.execute_prepared'):
+                    if params:
+                        cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+                    else:
+                        cursor.execute(f"EXECUTE {name}")
+                    return ResultSet.from_cursor(cursor)
+            except psycopg2.extensions.QueryCanceledError:
+                raise TimeoutError(f"Query exceeded {timeout}s timeout")
+            except Exception as e:
+                raise RuntimeError(f"Query execution failed: {e}")
+            finally:
+                cursor.close()
+
+    def copy_to(self, sql, file, timeout=30, options='FORMAT csv, HEADER true'):
+        """Run ``COPY (sql) TO STDOUT`` into a file object and return the row count
+        
+        The server formats the rows, so they go to ``file`` without being
+        converted to Python objects. ``sql`` must be a single statement without
+        a trailing semicolon.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            
+            try:
+                self._set_statement_timeout(conn, cursor, timeout)
+                with tracer.span('db.copy'):
+                    cursor.copy_expert(f"COPY (\n{sql}\n) TO STDOUT WITH ({options})", file)
+                return cursor.rowcount
             except psycopg2.extensions.QueryCanceledError:
                 raise TimeoutError(f"Query exceeded {timeout}s timeout")
             except Exception as e:
                 raise RuntimeError(f"Query execution failed: {e}")
             finally:
                 cursor.close()
+    
+    def stream_query(self, sql, params=None, timeout=30, itersize=2000):
+        """Execute a query with a server-side cursor and yield rows as they arrive
+        
+        Rows are fetched ``itersize`` at a time, so memory stays flat regardless
+        of the result size. The connection is held until the generator is exhausted
+        or closed.
+        """
+        with self._server_cursor(sql, params, timeout, itersize, psycopg2.extras.RealDictCursor) as cursor:
+            for row in cursor:
+                yield row
+    
+    def stream_batches(self, sql, params=None, timeout=30, batch_size=10000):
+        """Like stream_query, but yield (cursor description, list of row tuples) per batch
+        
+        At least one batch is yielded, empty for an empty result, so callers
+        always see the columns.
+        """
+        with self._server_cursor(sql, params, timeout, batch_size) as cursor:
+            rows = cursor.fetchmany(batch_size)
+            yield cursor.description, rows
+            while len(rows) == batch_size:
+                rows = cursor.fetchmany(batch_size)
+                if rows:
+                    yield cursor.description, rows
+    
+    @contextmanager
+    def _server_cursor(self, sql, params=None, timeout=30, itersize=2000, cursor_factory=None):
+        """Named (server-side) cursor that has executed ``sql``, on a pooled connection"""
+        with self.get_connection() as conn:
+            # Named cursors only live inside a transaction
+            conn.autocommit = False
+            cursor = conn.cursor(
+                name=f"agent_stream_{uuid.uuid4().hex[:12]}",
+                cursor_factory=cursor_factory
+            )
+            cursor.itersize = itersize
+            
+            try:
+                # Transaction-scoped timeout, leaves the session setting untouched
+                with conn.cursor() as setup:
+                    setup.execute(f"SET LOCAL statement_timeout = {int(timeout * 1000)};")
+                with tracer.span('db.stream_open'):
+                    cursor.execute(sql, params)
+                
+                yield cursor
+            except psycopg2.extensions.QueryCanceledError:
+                raise TimeoutError(f"Query exceeded {timeout}s timeout")
+            except psycopg2.Error as e:
+                raise RuntimeError(f"Query execution failed: {e}")
+            finally:
+                try:
+                    cursor.close()
+                    conn.rollback()
+                    conn.autocommit = True
+                except psycopg2.Error:
+                    # Broken connection, the pool discards it on return
+                    conn.close()
+    
+    def identity(self):
+        """Stable identifier of the target database (used to key local caches)"""
+        return f"{self.config['host']}:{self.config['port']}/{self.config['database']}@{self.config['user']}"
+    
+    def get_pool_stats(self):
+        """Return connection pool statistics (in use, waits, checkout latency)"""
+        return self.pool.stats()
+    
+    def fill_pool(self):
+        """Open the pool's minimum connections ahead of the first query"""
+        self.pool.fill()
+    
+    def max_connections(self):
+        """Queries that can run at once without waiting for a connection"""
+        return self.pool.maxconn
 
+    def close(self):
+        """Close all pooled connections"""
+        self.pool.close()
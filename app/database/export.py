@@ -0,0 +1,165 @@
+"""
+Bulk Export
+Writes query results straight to CSV (COPY TO STDOUT), Parquet or Arrow files
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from app.security.validator import QueryValidator
+from app.tracing.tracer import tracer
+
+EXPORT_FORMATS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+}
+
+# PostgreSQL type OID -> pyarrow type factory, for types psycopg2 returns as
+# directly convertible Python values (bool, int, float, str, date)
+_ARROW_TYPES = {
+    16: 'bool_', 20: 'int64', 21: 'int16', 23: 'int32', 26: 'int64', 700: 'float32', 701: 'float64',
+    18: 'string', 19: 'string', 25: 'string', 1042: 'string', 1043: 'string', 1082: 'date32',
+}
+_BYTEA_OID, _JSON_OID, _JSONB_OID, _NUMERIC_OID = 17, 114, 3802, 1700
+_TIME_OID, _TIMESTAMP_OID, _TIMESTAMPTZ_OID, _INTERVAL_OID = 1083, 1114, 1184, 1186
+
+
+def export_format(path: str, fmt: Optional[str] = None) -> str:
+    """Format named by ``fmt`` or by the file extension: csv, parquet or arrow"""
+    fmt = (fmt or EXPORT_FORMATS.get(Path(path).suffix.lower(), '')).lower()
+    if fmt not in ('csv', 'parquet', 'arrow'):
+        raise ValueError(f"Cannot export to '{path}': use a .csv, .parquet or .arrow file")
+    return fmt
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        return pyarrow
+    except ImportError as e:
+        raise ImportError("Parquet and Arrow export need pyarrow (pip install pyarrow)") from e
+
+
+def _str_or_none(value):
+    return None if value is None else str(value)
+
+
+def _json_or_none(value):
+    # psycopg2 decodes json/jsonb; write it back as JSON text
+    return None if value is None else json.dumps(value, default=str)
+
+
+def _float_or_none(value):
+    return None if value is None else float(value)
+
+
+def _bytes_or_none(value):
+    return None if value is None else bytes(value)
+
+
+def arrow_column(pa, column) -> Tuple[object, Optional[Callable]]:
+    """(Arrow type, per-value converter or None) for a cursor description column
+
+    Types come from the column's type OID rather than from the values, so every
+    batch has the same schema even when a column is NULL throughout a batch.
+    NUMERIC with a declared precision and scale becomes a decimal; unconstrained
+    NUMERIC (e.g. SUM results) is written as float64.
+    """
+    oid = column.type_code
+    if oid in _ARROW_TYPES:
+        return getattr(pa, _ARROW_TYPES[oid])(), None
+    if oid == _NUMERIC_OID:
+        precision, scale = column.precision, column.scale
+        if precision and scale is not None and precision <= 38:
+            return pa.decimal128(precision, scale), None
+        return pa.float64(), _float_or_none
+    if oid == _TIMESTAMP_OID:
+        return pa.timestamp('us'), None
+    if oid == _TIMESTAMPTZ_OID:
+        return pa.timestamp('us', tz='UTC'), None
+    if oid == _TIME_OID:
+        return pa.time64('us'), None
+    if oid == _INTERVAL_OID:
+        return pa.duration('us'), None
+    if oid in (_JSON_OID, _JSONB_OID):
+        return pa.string(), _json_or_none
+    if oid == _BYTEA_OID:
+        return pa.binary(), _bytes_or_none
+    # Arrays, enums, uuid, ... as their text form
+    return pa.string(), _str_or_none
+
+
+def _record_batch(pa, schema, converters: List[Optional[Callable]], rows):
+    columns = list(zip(*rows)) or [()] * len(schema)
+    arrays = []
+    for field, convert, values in zip(schema, converters, columns):
+        if convert is not None:
+            values = [convert(value) for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _write_csv(db, sql: str, tmp_path: Path, timeout: float) -> int:
+    with open(tmp_path, 'wb') as f:
+        return db.copy_to(sql, f, timeout=timeout)
+
+
+def _write_columnar(db, sql: str, tmp_path: Path, fmt: str, timeout: float, batch_size: int) -> int:
+    pa = _import_pyarrow()
+    batches = db.stream_batches(sql, timeout=timeout, batch_size=batch_size)
+    writer = None
+    row_count = 0
+    try:
+        for description, rows in batches:
+            if writer is None:
+                specs = [arrow_column(pa, column) for column in description]
+                schema = pa.schema([(column.name, arrow_type) for column, (arrow_type, _) in zip(description, specs)])
+                converters = [convert for _, convert in specs]
+                if fmt == 'parquet':
+                    import pyarrow.parquet as pq
+                    writer = pq.ParquetWriter(str(tmp_path), schema)
+                else:
+                    writer = pa.ipc.new_file(str(tmp_path), schema)
+            with tracer.span('export.batch'):
+                writer.write_batch(_record_batch(pa, schema, converters, rows))
+            row_count += len(rows)
+    finally:
+        # Releases the server-side cursor and its connection on errors too
+        batches.close()
+        if writer is not None:
+            writer.close()
+    return row_count
+
+
+def export_query(db, sql: str, path: str, fmt: Optional[str] = None, timeout: float = 600,
+                 batch_size: int = 50000) -> int:
+    """Run ``sql`` and write every row to ``path``, returning the row count
+
+    CSV is produced by the server through ``COPY (...) TO STDOUT`` and streamed
+    to disk; Parquet and Arrow are written in record batches of ``batch_size``
+    rows read from a server-side cursor. Values are written as the database
+    returns them (no currency formatting). The file is written under a
+    temporary name and renamed when complete, so a failed export leaves no
+    partial file behind.
+    """
+    fmt = export_format(path, fmt)
+    sql = QueryValidator.statement_body(sql)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.part')
+
+    try:
+        with tracer.span(f'export.{fmt}'):
+            if fmt == 'csv':
+                row_count = _write_csv(db, sql, tmp_path, timeout)
+            else:
+                row_count = _write_columnar(db, sql, tmp_path, fmt, timeout, batch_size)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return row_count
@@ -0,0 +1,181 @@
+"""
+Join Graph
+Foreign-key graph between tables with memoized shortest join paths
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Foreign keys of every user table, one row per constraint with its column lists in order
+FOREIGN_KEY_QUERY = """
+SELECT
+    src_ns.nspname AS table_schema,
+    src.relname AS table_name,
+    dst_ns.nspname AS ref_schema,
+    dst.relname AS ref_table,
+    array_agg(src_att.attname::text ORDER BY k.ord) AS columns,
+    array_agg(dst_att.attname::text ORDER BY k.ord) AS ref_columns
+FROM pg_constraint con
+JOIN pg_class src ON src.oid = con.conrelid
+JOIN pg_namespace src_ns ON src_ns.oid = src.relnamespace
+JOIN pg_class dst ON dst.oid = con.confrelid
+JOIN pg_namespace dst_ns ON dst_ns.oid = dst.relnamespace
+CROSS JOIN LATERAL unnest(con.conkey, con.confkey) WITH ORDINALITY AS k(attnum, ref_attnum, ord)
+JOIN pg_attribute src_att ON src_att.attrelid = con.conrelid AND src_att.attnum = k.attnum
+JOIN pg_attribute dst_att ON dst_att.attrelid = con.confrelid AND dst_att.attnum = k.ref_attnum
+WHERE con.contype = 'f'
+  AND src_ns.nspname NOT IN ('pg_catalog', 'information_schema')
+GROUP BY con.oid, src_ns.nspname, src.relname, dst_ns.nspname, dst.relname
+ORDER BY src_ns.nspname, src.relname, con.conname
+"""
+
+# Audit columns (Odoo's create_uid/write_uid) link every table to res_users and
+# would make it a shortcut between unrelated tables
+IGNORED_COLUMNS = {'create_uid', 'write_uid'}
+
+# (neighbor table, columns on this side, columns on the neighbor side)
+Edge = Tuple[str, Tuple[str, ...], Tuple[str, ...]]
+
+
+class JoinGraph:
+    """Undirected graph of foreign keys, tables as nodes
+
+    Shortest paths are found with BFS on demand and memoized until the graph
+    changes; schemas have a few hundred edges, so this is cheaper than
+    precomputing all pairs. Paths never pass *through* hub tables (more than
+    ``HUB_DEGREE`` foreign keys, e.g. res_company), which would otherwise link
+    any two tables without a meaningful join.
+    """
+
+    HUB_DEGREE = 30
+
+    def __init__(self):
+        self._edges: Dict[str, List[Edge]] = {}
+        self._path_cache: Dict[Tuple[str, str, int], Optional[List[Tuple[str, Edge]]]] = {}
+
+    @classmethod
+    def from_schema(cls, schema: Dict) -> 'JoinGraph':
+        """Build the graph from the ``foreign_keys`` entries of a schema dict"""
+        graph = cls()
+        for table_name, table_info in schema.items():
+            for fk in table_info.get('foreign_keys', ()):
+                if fk['table'] in schema:
+                    graph.add_foreign_key(table_name, fk['columns'], fk['table'], fk['ref_columns'])
+        return graph
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def add_foreign_key(self, table: str, columns: Iterable[str], ref_table: str, ref_columns: Iterable[str]):
+        columns, ref_columns = tuple(columns), tuple(ref_columns)
+        if table == ref_table or IGNORED_COLUMNS.intersection(columns):
+            return
+        self._edges.setdefault(table, []).append((ref_table, columns, ref_columns))
+        self._edges.setdefault(ref_table, []).append((table, ref_columns, columns))
+        self._path_cache.clear()
+
+    def remove_table(self, table: str):
+        """Drop a table and every foreign key to or from it"""
+        for neighbor, _, _ in self._edges.pop(table, []):
+            remaining = [edge for edge in self._edges.get(neighbor, []) if edge[0] != table]
+            if remaining:
+                self._edges[neighbor] = remaining
+            else:
+                self._edges.pop(neighbor, None)
+        self._path_cache.clear()
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def neighbors(self, table: str) -> List[str]:
+        return [edge[0] for edge in self._edges.get(table, [])]
+
+    def shortest_path(self, source: str, target: str, max_hops: int = 3) -> Optional[List[Tuple[str, Edge]]]:
+        """Steps ``(from_table, edge)`` joining source to target, or None if further than max_hops"""
+        key = (source, target, max_hops)
+        if key in self._path_cache:
+            return self._path_cache[key]
+
+        path = None
+        if source == target:
+            path = []
+        else:
+            previous: Dict[str, Optional[Tuple[str, Edge]]] = {source: None}
+            queue = deque([(source, 0)])
+            while queue and path is None:
+                table, hops = queue.popleft()
+                if hops == max_hops or (hops and len(self._edges.get(table, ())) > self.HUB_DEGREE):
+                    continue
+                for edge in self._edges.get(table, []):
+                    neighbor = edge[0]
+                    if neighbor in previous:
+                        continue
+                    previous[neighbor] = (table, edge)
+                    if neighbor == target:
+                        path = []
+                        node = target
+                        while previous[node] is not None:
+                            step = previous[node]
+                            path.append(step)
+                            node = step[0]
+                        path.reverse()
+                        break
+                    queue.append((neighbor, hops + 1))
+
+        self._path_cache[key] = path
+        return path
+
+    @staticmethod
+    def join_condition(from_table: str, edge: Edge) -> str:
+        """SQL join condition for one step, e.g. 'sale_order.partner_id = res_partner.id'"""
+        ref_table, columns, ref_columns = edge
+        return ' AND '.join(
+            f"{from_table}.{col} = {ref_table}.{ref_col}" for col, ref_col in zip(columns, ref_columns)
+        )
+
+    def connect(self, tables: List[str], max_hops: int = 3) -> List[Tuple[str, Edge]]:
+        """Steps linking ``tables`` to the first one (greedy, shortest path from the connected set)"""
+        if not tables:
+            return []
+        connected = [tables[0]]
+        steps = []
+        for table in tables[1:]:
+            if table in connected:
+                continue
+            best = None
+            for anchor in connected:
+                path = self.shortest_path(anchor, table, max_hops)
+                if path is not None and (best is None or len(path) < len(best)):
+                    best = path
+            if best is None:
+                continue
+            for step in best:
+                if step[1][0] not in connected:
+                    connected.append(step[1][0])
+                steps.append(step)
+        return steps
+
+    def bridging_tables(self, tables: List[str], max_hops: int = 3) -> List[str]:
+        """Tables outside ``tables`` that are needed to join them"""
+        bridges = []
+        for _, edge in self.connect(tables, max_hops):
+            if edge[0] not in tables and edge[0] not in bridges:
+                bridges.append(edge[0])
+        return bridges
+
+    def join_hints(self, tables: List[str]) -> List[Tuple[str, str, str]]:
+        """``(table, ref_table, condition)`` for every foreign key between two of ``tables``"""
+        selected = set(tables)
+        hints = []
+        seen = set()
+        for table in tables:
+            for edge in self._edges.get(table, []):
+                ref_table = edge[0]
+                key = frozenset((table, ref_table, edge[1], edge[2]))
+                if ref_table not in selected or key in seen:
+                    continue
+                seen.add(key)
+                hints.append((table, ref_table, self.join_condition(table, edge)))
+        return hints
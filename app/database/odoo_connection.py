@@ -4,26 +4,25 @@ Handles SSH tunnel and database connection to Odoo.sh instances using paramiko
 """
 
 import os
-import socket
 import threading
 import psycopg2
-import psycopg2.extras
-from contextlib import contextmanager
-from dotenv import load_dotenv
-import paramiko
 import atexit
 
-load_dotenv()
+from app.config import load_env
+from app.database.connection import DatabaseConnection
+from app.database.tunnel import TunnelForwarder
+from app.tracing.tracer import tracer
 
 
-class OdooDatabaseConnection:
-    """Manages PostgreSQL connection through SSH tunnel to Odoo.sh"""
+class OdooDatabaseConnection(DatabaseConnection):
+    """Manages pooled PostgreSQL connections through SSH tunnel to Odoo.sh"""
     
-    def __init__(self):
+    def __init__(self, database=None):
         self.tunnel = None
         self.local_port = None
         self.ssh_client = None
-        self.local_socket = None
+        self._tunnel_lock = threading.Lock()
+        load_env()
         
         # SSH Configuration
         ssh_host = os.getenv('ODOO_SSH_HOST')
@@ -44,19 +43,27 @@ class OdooDatabaseConnection:
         
         self.db_config = {
             'host': '127.0.0.1',  # Will be updated after tunnel starts
-            'database': os.getenv('ODOO_DB_NAME'),
+            'database': database or os.getenv('ODOO_DB_NAME'),
             'user': db_user,
             'password': db_password,
         }
+        self.config = self.db_config
         
-        # Start tunnel on init
-        self.start_tunnel()
+        # The tunnel is opened by the first connection (or warm-up), not here, so
+        # constructing the agent does not block on SSH
         
-        # Register cleanup on exit
+        # Register cleanup on exit (pool is closed first, atexit runs in reverse order)
         atexit.register(self.stop_tunnel)
+        
+        # Persistent connections are reused over the tunnel
+        self._init_pool('ODOO')
     
     def start_tunnel(self):
         """Start the SSH tunnel connection using paramiko"""
+        with tracer.span('tunnel.start'):
+            self._start_tunnel()
+    
+    def _start_tunnel(self):
         try:
             ssh_host = self.ssh_config['host']
             ssh_port = self.ssh_config['port']
@@ -65,6 +72,9 @@ class OdooDatabaseConnection:
             
             print(f"[+] Establishing SSH tunnel to {ssh_host}:{ssh_port}...")
             
+            # paramiko (and its crypto backend) is only loaded once a tunnel is needed
+            import paramiko
+            
             # Create SSH client
             self.ssh_client = paramiko.SSHClient()
             self.ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
@@ -90,71 +100,45 @@ class OdooDatabaseConnection:
             
             print(f"[+] SSH connection established")
             
-            # Create local socket that forwards to remote PostgreSQL
-            self.local_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.local_socket.bind(('127.0.0.1', 0))
-            self.local_socket.listen(1)
-            self.local_port = self.local_socket.getsockname()[1]
+            # Keep the transport alive while pooled connections sit idle
+            transport = self.ssh_client.get_transport()
+            transport.set_keepalive(30)
+            
+            # Forward a local port to the remote PostgreSQL over the transport
+            self.tunnel = TunnelForwarder(transport, 'localhost', 5432)
+            self.local_port = self.tunnel.start()
             
             # Update db config with local port
             self.db_config['port'] = self.local_port
             
-            print(f"[+] Starting port forward thread on local port {self.local_port}...")
-            
-            # Start forwarding in a separate thread
-            self.forward_thread = threading.Thread(
-                target=self._forward_connection,
-                daemon=True
-            )
-            self.forward_thread.start()
-            
             print(f"[+] SSH tunnel established on port {self.local_port}")
             
         except Exception as e:
             raise ConnectionError(f"Failed to establish SSH tunnel: {e}")
     
-    def _forward_connection(self):
-        """Forward connections from local socket to remote PostgreSQL"""
-        while True:
-            try:
-                local_conn, _ = self.local_socket.accept()
-                # Create transport channel
-                transport = self.ssh_client.get_transport()
-                
-                # Open channel for forwarding
-                channel = transport.open_channel(
-                    'direct-tcpip',
-                    ('localhost', 5432),  # Remote PostgreSQL
-                    ('127.0.0.1', self.local_port)
-                )
-                
-                # Forward data between sockets
-                def forward_data(src, dst):
-                    try:
-                        while True:
-                            data = src.recv(4096)
-                            if not data:
-                                break
-                            dst.send(data)
-                    except Exception:
-                        pass
-                    finally:
-                        src.close()
-                        dst.close()
+    def _ensure_tunnel(self, timeout=10):
+        """Open the tunnel on first use or restart it if the SSH transport dropped, then wait until it accepts connections"""
+        with self._tunnel_lock:
+            if self.tunnel is None:
+                self.start_tunnel()
+            elif not self.tunnel.is_active:
+                print("[!] SSH tunnel is down, reconnecting...")
+                self.stop_tunnel()
+                self.start_tunnel()
                 
-                # Start forwarding in both directions
-                threading.Thread(target=forward_data, args=(local_conn, channel), daemon=True).start()
-                threading.Thread(target=forward_data, args=(channel, local_conn), daemon=True).start()
-                
-            except Exception:
-                break
+        with tracer.span('tunnel.wait_ready'):
+            ready = self.tunnel.wait_ready(timeout)
+        if not ready:
+            raise ConnectionError(f"SSH tunnel not ready after {timeout}s")
     
     def stop_tunnel(self):
         """Stop the SSH tunnel"""
+        if self.tunnel is None and self.ssh_client is None:
+            return
         try:
-            if self.local_socket:
+            if self.tunnel:
                 print("[+] Closing SSH tunnel...")
-                self.local_socket.close()
+                self.tunnel.stop()
             
             if self.ssh_client:
                 self.ssh_client.close()
@@ -166,58 +150,27 @@ class OdooDatabaseConnection:
     def connect(self):
         """Create and return a database connection through tunnel"""
         try:
-            # Wait a bit for the tunnel to be ready
-            import time
-            time.sleep(0.5)
+            self._ensure_tunnel()
             
-            conn = psycopg2.connect(**self.db_config)
+            with tracer.span('db.connect'):
+                conn = psycopg2.connect(**self.db_config)
             print(f"[+] Connected to database: {self.db_config['database']}")
             return conn
         except Exception as e:
             raise ConnectionError(f"Failed to connect to database: {e}")
     
-    @contextmanager
-    def get_connection(self):
-        """Context manager for database connections"""
-        conn = None
-        try:
-            conn = self.connect()
-            yield conn
-        finally:
-            if conn:
-                conn.close()
-                print("[+] Disconnected from database")
-    
-    def execute_query(self, sql, params=None, timeout=30):
-        """Execute a query and return results"""
-        with self.get_connection() as conn:
-            conn.set_session(readonly=True, autocommit=True)
-            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-            
-            try:
-                # Set timeout
-                cursor.execute(f"SET statement_timeout = {timeout * 1000};")
-                cursor.execute(sql, params)
-                results = cursor.fetchall()
-                
-                # Convert to list of dicts
-                return [dict(row) for row in results]
-            except psycopg2.extensions.QueryCanceledError:
-                raise TimeoutError(f"Query exceeded {timeout}s timeout")
-            except Exception as e:
-                raise RuntimeError(f"Query execution failed: {e}")
-            finally:
-                cursor.close()
+    def identity(self):
+        """Identify the database by SSH host, since the local tunnel port changes every run"""
+        return f"ssh://{self.ssh_config['host']}/{self.db_config['database']}@{self.db_config['user']}"
     
     def test_connection(self):
         """Test the database connection"""
         try:
-            conn = self.connect()
-            cursor = conn.cursor()
-            cursor.execute("SELECT version();")
-            version = cursor.fetchone()
-            cursor.close()
-            conn.close()
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT version();")
+                version = cursor.fetchone()
+                cursor.close()
             print(f"[+] Database connection successful")
             print(f"[+] PostgreSQL version: {version[0]}")
             return True
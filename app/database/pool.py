@@ -0,0 +1,293 @@
+"""
+Connection Pool
+Bounded, thread-safe pool of persistent PostgreSQL connections
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+import psycopg2
+import psycopg2.extensions
+
+
+class PoolExhaustedError(ConnectionError):
+    """Every connection stayed checked out for the whole checkout timeout (the server is fine)"""
+
+
+class ConnectionPool:
+    """Keeps a bounded set of open connections and hands them out to callers
+
+    Connections are created through ``connect_fn`` and configured once through
+    ``configure_fn`` (read-only/autocommit session settings), so checkouts
+    reuse both the TCP/auth handshake and the session setup.
+    """
+
+    def __init__(
+        self,
+        connect_fn: Callable,
+        configure_fn: Optional[Callable] = None,
+        minconn: int = 1,
+        maxconn: int = 5,
+        max_idle: float = 300.0,
+        health_check_after: float = 30.0,
+        checkout_timeout: float = 30.0,
+    ):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError(f"Invalid pool size: min={minconn}, max={maxconn}")
+
+        self.connect_fn = connect_fn
+        self.configure_fn = configure_fn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.max_idle = max_idle
+        self.health_check_after = health_check_after
+        self.checkout_timeout = checkout_timeout
+
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        # Idle connections as (conn, last_used), most recently used last
+        self._idle: List[Tuple[object, float]] = []
+        # Per-connection session state, keyed by id(conn)
+        self._state: Dict[int, Dict] = {}
+        self._size = 0
+        self._closed = False
+
+        self._stats = {
+            'created': 0,
+            'closed': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'health_check_failures': 0,
+            'checkout_time_total': 0.0,
+            'checkout_time_max': 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # Connection lifecycle
+    # ------------------------------------------------------------------
+
+    def _create(self):
+        """Open and configure a new connection (called without the lock held)"""
+        conn = self.connect_fn()
+        try:
+            if self.configure_fn:
+                self.configure_fn(conn)
+        except Exception:
+            conn.close()
+            raise
+
+        with self._lock:
+            self._state[id(conn)] = {'created_at': time.monotonic()}
+            self._stats['created'] += 1
+        return conn
+
+    def _discard(self, conn):
+        """Close a connection and free its slot"""
+        try:
+            if not conn.closed:
+                conn.close()
+        except Exception:
+            pass
+
+        with self._lock:
+            self._state.pop(id(conn), None)
+            self._size -= 1
+            self._stats['closed'] += 1
+            self._available.notify()
+
+    def _is_healthy(self, conn, idle_for: float) -> bool:
+        """Check a connection before handing it out"""
+        if conn.closed:
+            return False
+
+        try:
+            status = conn.get_transaction_status()
+            if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                return False
+            if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+
+            # Only ping connections that sat idle long enough to have been dropped
+            if idle_for >= self.health_check_after:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute("SELECT 1")
+                    cursor.fetchone()
+                finally:
+                    cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _reap_idle(self) -> List:
+        """Remove connections idle for longer than max_idle beyond minconn (lock held)"""
+        now = time.monotonic()
+        reaped = []
+        # Oldest connections are at the front of the idle list
+        while self._idle and self._size - len(reaped) > self.minconn:
+            conn, last_used = self._idle[0]
+            if now - last_used < self.max_idle:
+                break
+            self._idle.pop(0)
+            reaped.append(conn)
+        return reaped
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def getconn(self, timeout: Optional[float] = None):
+        """Check out a connection, waiting up to ``timeout`` seconds for a free slot"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        waited = False
+
+        while True:
+            conn = None
+            idle_for = 0.0
+            create = False
+
+            with self._lock:
+                if self._closed:
+                    raise ConnectionError("Connection pool is closed")
+
+                reaped = self._reap_idle()
+                self._size -= len(reaped)
+                self._stats['closed'] += len(reaped)
+                for old in reaped:
+                    self._state.pop(id(old), None)
+
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    idle_for = time.monotonic() - last_used
+                elif self._size < self.maxconn:
+                    self._size += 1
+                    create = True
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolExhaustedError(
+                            f"Timed out after {timeout}s waiting for a database connection "
+                            f"(pool max size {self.maxconn})"
+                        )
+                    if not waited:
+                        self._stats['waits'] += 1
+                        waited = True
+                    self._available.wait(remaining)
+                    continue
+
+            for old in reaped:
+                try:
+                    old.close()
+                except Exception:
+                    pass
+
+            if create:
+                try:
+                    conn = self._create()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._available.notify()
+                    raise
+            elif not self._is_healthy(conn, idle_for):
+                with self._lock:
+                    self._stats['health_check_failures'] += 1
+                self._discard(conn)
+                continue
+
+            elapsed = time.monotonic() - start
+            with self._lock:
+                self._stats['checkouts'] += 1
+                self._stats['checkout_time_total'] += elapsed
+                self._stats['checkout_time_max'] = max(self._stats['checkout_time_max'], elapsed)
+            return conn
+
+    def putconn(self, conn):
+        """Return a connection to the pool"""
+        if conn.closed:
+            self._discard(conn)
+            return
+
+        try:
+            if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+
+        with self._lock:
+            if self._closed:
+                discard = True
+            else:
+                discard = False
+                self._idle.append((conn, time.monotonic()))
+                self._available.notify()
+
+        if discard:
+            self._discard(conn)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """Context manager that checks a connection out and always returns it"""
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def state(self, conn) -> Dict:
+        """Mutable per-connection session state (e.g. current statement_timeout)"""
+        with self._lock:
+            return self._state.setdefault(id(conn), {})
+
+    def fill(self):
+        """Open connections until the pool holds at least ``minconn``"""
+        while True:
+            with self._lock:
+                if self._closed or self._size >= self.minconn:
+                    return
+                self._size += 1
+            try:
+                conn = self._create()
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                raise
+            self.putconn(conn)
+
+    def close(self):
+        """Close all idle connections and refuse further checkouts"""
+        with self._lock:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle = []
+            self._available.notify_all()
+
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self) -> Dict:
+        """Snapshot of pool usage for sizing decisions"""
+        with self._lock:
+            checkouts = self._stats['checkouts']
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'min_size': self.minconn,
+                'max_size': self.maxconn,
+                'created': self._stats['created'],
+                'closed': self._stats['closed'],
+                'checkouts': checkouts,
+                'waits': self._stats['waits'],
+                'timeouts': self._stats['timeouts'],
+                'health_check_failures': self._stats['health_check_failures'],
+                'avg_checkout_ms': (self._stats['checkout_time_total'] / checkouts * 1000) if checkouts else 0.0,
+                'max_checkout_ms': self._stats['checkout_time_max'] * 1000,
+            }
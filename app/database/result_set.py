@@ -0,0 +1,172 @@
+"""
+Result Set
+Query results stored column by column, with dict-like row views for existing callers
+"""
+
+from array import array
+from collections.abc import Mapping, Sequence
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# numpy is optional: loaded on the first typed column, falling back to array.array
+_numpy = None
+
+
+def _np():
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy or None
+
+
+def typed_column(values: Sequence):
+    """Compact storage for one column's values
+
+    Integer, float and boolean columns without NULLs become numpy arrays (or
+    array.array without numpy); anything else, including numeric columns with
+    NULLs and Decimals, is kept as a tuple of the original objects.
+    """
+    kinds = set(map(type, values))
+    np = _np()
+    try:
+        if kinds == {int}:
+            return np.array(values, dtype=np.int64) if np else array('q', values)
+        if kinds == {float}:
+            return np.array(values, dtype=np.float64) if np else array('d', values)
+        if kinds == {bool} and np:
+            return np.array(values, dtype=np.bool_)
+    except OverflowError:
+        # Integers beyond 64 bits (numeric columns cast to int by the driver)
+        pass
+    return tuple(values)
+
+
+def _python_values(column) -> List:
+    """Column values as plain Python objects"""
+    return column.tolist() if hasattr(column, 'tolist') else list(column)
+
+
+class Row(Mapping):
+    """Read-only view of one row; behaves like the dict rows used to be"""
+
+    __slots__ = ('_result', '_position')
+
+    def __init__(self, result: 'ResultSet', position: int):
+        self._result = result
+        self._position = position
+
+    def __getitem__(self, key):
+        value = self._result._data[self._result._index[key]][self._position]
+        # numpy scalars -> int/float/bool, so rows serialize and compare like before
+        if _numpy and isinstance(value, _numpy.generic):
+            return value.item()
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._result._index)
+
+    def __len__(self) -> int:
+        return len(self._result._index)
+
+    def copy(self) -> Dict:
+        return dict(self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class ResultSet(Sequence):
+    """Rows of a query as column names plus one typed array per column
+
+    Column names are stored once instead of in every row, and numeric columns
+    are packed into arrays, so a large result takes a fraction of the memory of
+    a list of dicts. Indexing and iteration return Row views, which support the
+    dict operations callers used (``row['col']``, ``.get``, ``.keys()``,
+    ``dict(row)``). Duplicate column names keep the last one, like dict rows did.
+    """
+
+    def __init__(self, columns: Sequence[str], data: Sequence):
+        if len(columns) != len(data):
+            raise ValueError(f"{len(columns)} column names for {len(data)} columns")
+        self.columns = list(columns)
+        self._data = list(data)
+        self._index = {name: i for i, name in enumerate(self.columns)}
+        self._length = len(self._data[0]) if self._data else 0
+
+    @classmethod
+    def from_tuples(cls, columns: Sequence[str], rows: Iterable[Sequence]) -> 'ResultSet':
+        values = list(zip(*rows)) or [() for _ in columns]
+        return cls(columns, [typed_column(column) for column in values])
+
+    @classmethod
+    def from_dicts(cls, rows: Sequence[Mapping], columns: Optional[Sequence[str]] = None) -> 'ResultSet':
+        if columns is None:
+            columns = list(rows[0].keys()) if rows else []
+        return cls(columns, [typed_column([row[name] for row in rows]) for name in columns])
+
+    @classmethod
+    def from_cursor(cls, cursor, chunk_size: int = 10000) -> 'ResultSet':
+        """Fetch an executed (tuple) cursor's rows into columns, ``chunk_size`` rows at a time
+
+        Rows are transposed per chunk, so the row tuples never all exist at once.
+        """
+        columns = [d[0] for d in cursor.description]
+        values = [[] for _ in columns]
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for column, chunk in zip(values, zip(*rows)):
+                column.extend(chunk)
+        return cls(columns, [typed_column(column) for column in values])
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return ResultSet(self.columns, [column[position] for column in self._data])
+        if position < 0:
+            position += self._length
+        if not 0 <= position < self._length:
+            raise IndexError('result row index out of range')
+        return Row(self, position)
+
+    def __iter__(self) -> Iterator[Row]:
+        for position in range(self._length):
+            yield Row(self, position)
+
+    def __repr__(self):
+        return f"<ResultSet {self._length} rows x {len(self.columns)} columns>"
+
+    def keys(self) -> List[str]:
+        """Unique column names, in result order"""
+        return list(self._index)
+
+    def array(self, name: str):
+        """The stored column (numpy array, array.array or tuple)"""
+        return self._data[self._index[name]]
+
+    def column(self, name: str) -> List:
+        """A column's values as Python objects"""
+        return _python_values(self.array(name))
+
+    def with_columns(self, replacements: Dict[str, List]) -> 'ResultSet':
+        """Copy with some columns replaced; the other columns are shared, not copied"""
+        data = list(self._data)
+        for name, values in replacements.items():
+            data[self._index[name]] = typed_column(values)
+        return ResultSet(self.columns, data)
+
+    def column_dict(self) -> Dict[str, Sequence]:
+        """{column name: values}, the column-oriented input tabulate accepts"""
+        return {name: self._data[i] for name, i in self._index.items()}
+
+    def to_dicts(self) -> List[Dict]:
+        """The rows as a list of dicts (the previous representation)"""
+        names = list(self._index)
+        columns = [_python_values(self._data[self._index[name]]) for name in names]
+        return [dict(zip(names, values)) for values in zip(*columns)]
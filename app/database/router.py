@@ -0,0 +1,348 @@
+"""
+Connection Router
+Spreads read-only queries over healthy replicas, and fans a query out to several databases
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.database.pool import PoolExhaustedError
+from app.database.result_set import ResultSet, typed_column
+from app.tracing.tracer import tracer
+
+# Replication lag in seconds (0 on a primary, or a replica that has replayed
+# everything it received, so an idle primary does not look like lag)
+HEALTH_QUERY = """
+SELECT pg_is_in_recovery() AS is_replica,
+       CASE
+           WHEN NOT pg_is_in_recovery() THEN 0
+           WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+           ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+       END::float8 AS lag_seconds
+"""
+
+
+def node_label(db) -> str:
+    return f"{db.config['host']}:{db.config.get('port', 5432)}"
+
+
+class ConnectionRouter:
+    """Routes the agent's read-only queries to the least busy healthy replica
+
+    Replicas are checked for reachability and replication lag before the
+    first query (or during warm-up), then every ``check_interval`` seconds by
+    a background thread; those lagging more than ``max_lag`` seconds are
+    skipped until they catch up. A replica that fails to connect is marked
+    down immediately and the query (or stream) moves on to the next one; one
+    without a free pooled connection is only skipped for that query. The
+    primary answers when no replica can.
+
+    Exposes the DatabaseConnection methods the agent uses.
+    """
+
+    def __init__(self, primary, replicas: Sequence, max_lag: float = 30.0, check_interval: float = 10.0):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.config = primary.config
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._monitor_lock = threading.Lock()
+        # Unchecked replicas are assumed healthy
+        self._health: Dict[int, Dict] = {
+            id(replica): {'healthy': True, 'lag': 0.0, 'checked_at': None, 'error': None, 'queries': 0}
+            for replica in self.replicas
+        }
+        self._primary_queries = 0
+        self._turn = 0
+        self._monitor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_env(cls, primary, env_prefix: str = 'POSTGRES'):
+        """Wrap ``primary`` in a router over <env_prefix>_REPLICAS (host[:port],...), or return it unchanged"""
+        hosts = [h.strip() for h in os.getenv(f'{env_prefix}_REPLICAS', '').split(',') if h.strip()]
+        if not hosts:
+            return primary
+
+        replicas = []
+        for host in hosts:
+            host, _, port = host.partition(':')
+            replicas.append(type(primary)(
+                host=host,
+                port=port or primary.config.get('port'),
+                database=primary.config['database'],
+                connect_timeout=int(os.getenv(f'{env_prefix}_REPLICA_CONNECT_TIMEOUT', '5')),
+            ))
+        return cls(
+            primary, replicas,
+            max_lag=float(os.getenv(f'{env_prefix}_REPLICA_MAX_LAG', '30')),
+            check_interval=float(os.getenv(f'{env_prefix}_REPLICA_CHECK_INTERVAL', '10')),
+        )
+
+    def _check(self, replica):
+        start = time.perf_counter()
+        try:
+            with tracer.span('db.health_check'):
+                row = replica.execute_query(HEALTH_QUERY, timeout=5)[0]
+            update = {'healthy': True, 'lag': float(row['lag_seconds'] or 0.0), 'error': None}
+        except Exception as e:
+            update = {'healthy': False, 'error': str(e)}
+        update['checked_at'] = time.time()
+        update['check_ms'] = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._health[id(replica)].update(update)
+
+    def check_health(self):
+        """Check every replica now, in parallel"""
+        threads = [threading.Thread(target=self._check, args=(replica,), daemon=True) for replica in self.replicas]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _run_monitor(self):
+        while not self._stop.wait(self.check_interval):
+            self.check_health()
+
+    def _ensure_monitor(self):
+        """First health check (blocking, so no query reads from a lagging replica), then the monitor"""
+        if self._monitor is None:
+            with self._monitor_lock:
+                if self._monitor is None:
+                    self.check_health()
+                    self._monitor = threading.Thread(target=self._run_monitor, name='replica-health', daemon=True)
+                    self._monitor.start()
+
+    def _mark_down(self, replica, error: Exception):
+        print(f"[!] Replica {node_label(replica)} unavailable, trying the next node: {error}")
+        with self._lock:
+            self._health[id(replica)].update({'healthy': False, 'error': str(error), 'checked_at': time.time()})
+
+    def _candidates(self) -> List:
+        """Usable replicas, least busy (then least lagging) first, rotating between equals"""
+        self._ensure_monitor()
+        with self._lock:
+            usable = [r for r in self.replicas
+                      if self._health[id(r)]['healthy'] and self._health[id(r)]['lag'] <= self.max_lag]
+            self._turn += 1
+            turn = self._turn
+        if not usable:
+            return []
+        usable = usable[turn % len(usable):] + usable[:turn % len(usable)]
+        return sorted(usable, key=lambda r: (r.get_pool_stats()['in_use'], self._health[id(r)]['lag']))
+
+    def _route(self, method: str, *args, **kwargs):
+        for replica in self._candidates():
+            try:
+                result = getattr(replica, method)(*args, **kwargs)
+            except PoolExhaustedError:
+                # Busy, not broken: try the next node without marking it down
+                continue
+            except ConnectionError as e:
+                # Could not connect: the query itself was not run
+                self._mark_down(replica, e)
+                continue
+            with self._lock:
+                self._health[id(replica)]['queries'] += 1
+            return result
+        with self._lock:
+            self._primary_queries += 1
+        return getattr(self.primary, method)(*args, **kwargs)
+
+    def _route_stream(self, method: str, *args):
+        """Like _route for generators; a node is only left before it yielded anything"""
+        for replica in self._candidates():
+            items = getattr(replica, method)(*args)
+            try:
+                # Connecting happens on the first item
+                first = next(items)
+            except StopIteration:
+                with self._lock:
+                    self._health[id(replica)]['queries'] += 1
+                return
+            except PoolExhaustedError:
+                continue
+            except ConnectionError as e:
+                self._mark_down(replica, e)
+                continue
+            with self._lock:
+                self._health[id(replica)]['queries'] += 1
+            try:
+                yield first
+                yield from items
+            finally:
+                items.close()
+            return
+        with self._lock:
+            self._primary_queries += 1
+        yield from getattr(self.primary, method)(*args)
+
+    def execute_query(self, sql, params=None, timeout=30) -> ResultSet:
+        return self._route('execute_query', sql, params, timeout)
+
+    def execute_prepared(self, name, sql, params, timeout=30) -> ResultSet:
+        return self._route('execute_prepared', name, sql, params, timeout)
+
+    def copy_to(self, sql, file, timeout=30, **kwargs):
+        return self._route('copy_to', sql, file, timeout, **kwargs)
+
+    def stream_query(self, sql, params=None, timeout=30, itersize=2000):
+        yield from self._route_stream('stream_query', sql, params, timeout, itersize)
+
+    def stream_batches(self, sql, params=None, timeout=30, batch_size=10000):
+        yield from self._route_stream('stream_batches', sql, params, timeout, batch_size)
+
+    def identity(self):
+        # Replicas serve the primary's data, so they share its cache entries
+        return self.primary.identity()
+
+    def status(self) -> List[Dict]:
+        """Per node: label, role, health, lag and queries routed to it"""
+        with self._lock:
+            nodes = [{'node': node_label(self.primary), 'role': 'primary', 'healthy': True, 'lag': 0.0,
+                      'queries': self._primary_queries}]
+            for replica in self.replicas:
+                health = self._health[id(replica)]
+                nodes.append({'node': node_label(replica), 'role': 'replica', 'healthy': health['healthy'],
+                              'lag': health['lag'], 'queries': health['queries'], 'error': health['error']})
+        return nodes
+
+    def get_pool_stats(self):
+        stats = {}
+        for node in [self.primary] + self.replicas:
+            label = node_label(node)
+            stats.update({f"{label}.{key}": value for key, value in node.get_pool_stats().items()})
+        return stats
+
+    def fill_pool(self):
+        self._ensure_monitor()
+        for replica in self.replicas:
+            try:
+                replica.fill_pool()
+            except ConnectionError as e:
+                self._mark_down(replica, e)
+
+    def max_connections(self):
+        return sum(replica.max_connections() for replica in self.replicas) or self.primary.max_connections()
+
+    def close(self):
+        self._stop.set()
+        for node in [self.primary] + self.replicas:
+            node.close()
+
+
+def merge_results(labelled: Sequence[Tuple[str, ResultSet]], source_column: str = '_source') -> ResultSet:
+    """Concatenate results from several databases, labelling each row with its database
+
+    Columns missing from a database's result (schemas that drifted apart) are
+    filled with None.
+    """
+    columns = [source_column] + list(dict.fromkeys(
+        name for _, result in labelled for name in result.keys() if name != source_column
+    ))
+    values = {name: [] for name in columns}
+    for label, result in labelled:
+        present = set(result.keys())
+        values[source_column].extend([label] * len(result))
+        for name in columns[1:]:
+            values[name].extend(result.column(name) if name in present else [None] * len(result))
+    return ResultSet(columns, [typed_column(values[name]) for name in columns])
+
+
+class FanOutConnection:
+    """Runs each query on several databases in parallel and merges the rows
+
+    Rows get a ``_source`` column with their database name. Databases that fail
+    are reported and left out; the query fails only when every database fails.
+    The time and row count per database are printed with every query and kept
+    in ``last_timings``.
+    """
+
+    source_column = '_source'
+
+    def __init__(self, nodes: Sequence):
+        if not nodes:
+            raise ValueError("Fan-out needs at least one database")
+        self.nodes = list(nodes)
+        self.labels = [node.config['database'] for node in self.nodes]
+        self.config = self.nodes[0].config
+        self.last_timings: List[Dict] = []
+        self._executor = ThreadPoolExecutor(max_workers=len(self.nodes), thread_name_prefix='fanout')
+
+    def _run(self, node, method: str, args) -> Tuple[Optional[ResultSet], Optional[Exception], float]:
+        start = time.perf_counter()
+        try:
+            result = getattr(node, method)(*args)
+            error = None
+        except Exception as e:
+            result, error = None, e
+        elapsed = time.perf_counter() - start
+        tracer.record('db.fanout_node', elapsed)
+        return result, error, elapsed
+
+    def _fan_out(self, method: str, *args) -> ResultSet:
+        start = time.perf_counter()
+        with tracer.span('db.fanout'):
+            futures = [self._executor.submit(self._run, node, method, args) for node in self.nodes]
+            outcomes = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+
+        self.last_timings = [
+            {'database': label, 'rows': len(result) if result is not None else None,
+             'seconds': seconds, 'error': str(error) if error else None}
+            for label, (result, error, seconds) in zip(self.labels, outcomes)
+        ]
+        print(f"\n[Fan-out] {len(self.nodes)} databases in {elapsed:.2f}s")
+        for timing in self.last_timings:
+            if timing['error']:
+                print(f"  [!] {timing['database']}: failed after {timing['seconds']:.2f}s: {timing['error']}")
+            else:
+                print(f"  {timing['database']}: {timing['rows']} rows in {timing['seconds']:.2f}s")
+
+        succeeded = [(label, result) for label, (result, error, _) in zip(self.labels, outcomes) if error is None]
+        if not succeeded:
+            error = outcomes[0][1]
+            if all(isinstance(e, TimeoutError) for _, e, _ in outcomes):
+                raise error
+            raise RuntimeError(f"Query failed on every database: {error}")
+        return merge_results(succeeded, self.source_column)
+
+    def execute_query(self, sql, params=None, timeout=30) -> ResultSet:
+        return self._fan_out('execute_query', sql, params, timeout)
+
+    def execute_prepared(self, name, sql, params, timeout=30) -> ResultSet:
+        return self._fan_out('execute_prepared', name, sql, params, timeout)
+
+    def stream_query(self, sql, params=None, timeout=30, itersize=2000):
+        """Stream each database's rows in turn, labelled like execute_query"""
+        for label, node in zip(self.labels, self.nodes):
+            start = time.perf_counter()
+            for row in node.stream_query(sql, params, timeout, itersize):
+                yield {self.source_column: label, **row}
+            tracer.record('db.fanout_node', time.perf_counter() - start)
+
+    def identity(self):
+        return 'fanout:' + '|'.join(node.identity() for node in self.nodes)
+
+    def get_pool_stats(self):
+        stats = {}
+        for label, node in zip(self.labels, self.nodes):
+            stats.update({f"{label}.{key}": value for key, value in node.get_pool_stats().items()})
+        return stats
+
+    def fill_pool(self):
+        for node in self.nodes:
+            node.fill_pool()
+
+    def max_connections(self):
+        return min(node.max_connections() for node in self.nodes)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        for node in self.nodes:
+            node.close()
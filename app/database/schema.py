@@ -3,36 +3,136 @@ Schema Discovery Module
 Discovers and caches database schema information
 """
 
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 import re
+import threading
+
+from app.database.join_graph import JoinGraph, FOREIGN_KEY_QUERY
+from app.database.search_index import SchemaSearchIndex
+from app.database.snapshot import SchemaSnapshotCache, FINGERPRINT_QUERY, RELATION_FINGERPRINTS_QUERY
+from app.tracing.tracer import tracer
+
+
+# Restricts a catalog query to the (schema, table) pairs passed as two text arrays
+_SELECTED_TABLES = "(table_schema, table_name) IN (SELECT * FROM unnest(%s::text[], %s::text[]))"
+
+_COLUMNS_QUERY = """
+SELECT 
+    table_schema,
+    table_name,
+    column_name,
+    data_type,
+    is_nullable
+FROM information_schema.columns
+WHERE table_schema NOT IN ('pg_catalog', 'information_schema'){tables}
+ORDER BY table_name, ordinal_position
+"""
+COLUMNS_QUERY = _COLUMNS_QUERY.format(tables='')
+TABLE_COLUMNS_QUERY = _COLUMNS_QUERY.format(tables=f"\n  AND {_SELECTED_TABLES}")
+
+
+def full_table_name(schema_name: str, table_name: str) -> str:
+    """Key used in the schema dict: bare name for public tables, schema-qualified otherwise"""
+    return f"{schema_name}.{table_name}" if schema_name != 'public' else table_name
+
+
+def _table_params(tables: Iterable[Tuple[str, str]]) -> Tuple[List[str], List[str]]:
+    tables = list(tables)
+    return [schema_name for schema_name, _ in tables], [table_name for _, table_name in tables]
 
 
 class SchemaDiscovery:
     """Handles database schema discovery and caching"""
     
-    def __init__(self, db_connection):
+    # Most relevant tables that bridging tables are pulled in for
+    JOIN_ANCHORS = 3
+    
+    def __init__(self, db_connection, snapshot_cache: Optional[SchemaSnapshotCache] = None, table_stats=None):
         self.db = db_connection
+        self.snapshot_cache = snapshot_cache
+        # TableStatsCatalog (row estimates, sizes, indexed columns), None to leave them out
+        self.table_stats = table_stats
         self.schema_cache: Optional[Dict] = None
+        self.search_index: Optional[SchemaSearchIndex] = None
+        self.join_graph: Optional[JoinGraph] = None
+        # Catalog fingerprint the schema was loaded at, and per relation once a
+        # refresh has taken them (see refresh_tables)
+        self.fingerprint: Optional[str] = None
+        self.relation_fingerprints: Optional[Dict[str, str]] = None
+        # Guards the search index and join graph, which refreshes update in place
+        self._lock = threading.RLock()
+    
+    def get_catalog_fingerprint(self) -> str:
+        """Cheap hash of the catalog that changes whenever tables or columns change"""
+        with tracer.span('schema.fingerprint'):
+            results = self.db.execute_query(FINGERPRINT_QUERY)
+        return results[0]['fingerprint'] or ''
+    
+    def get_relation_fingerprints(self) -> Dict[str, str]:
+        """{full table name: hash of its columns and foreign keys}"""
+        with tracer.span('schema.relation_fingerprints'):
+            results = self.db.execute_query(RELATION_FINGERPRINTS_QUERY)
+        return {full_table_name(row['table_schema'], row['table_name']): row['fingerprint'] for row in results}
+    
+    def load_schema(self) -> Dict:
+        """Load schema from the local snapshot if the catalog is unchanged, otherwise discover it"""
+        if not self.snapshot_cache:
+            try:
+                # Baseline for SchemaRefresher, taken before discovery like the snapshot's
+                self.fingerprint = self.get_catalog_fingerprint()
+            except Exception:
+                self.fingerprint = None
+            return self.discover_schema()
+        
+        identity = self.db.identity()
+        fingerprint = None
+        try:
+            fingerprint = self.get_catalog_fingerprint()
+            with tracer.span('schema.snapshot_load'):
+                schema = self.snapshot_cache.load(identity, fingerprint)
+            if schema is not None:
+                print(f"[+] Loaded {len(schema)} tables from schema snapshot")
+                self._set_schema(schema)
+                self.fingerprint = fingerprint
+                return schema
+        except Exception as e:
+            print(f"[Warning] Schema snapshot unavailable: {e}")
+        
+        schema = self.discover_schema()
+        
+        # Fingerprint taken before discovery: a concurrent change only causes a rediscovery next time
+        if fingerprint is not None:
+            self.fingerprint = fingerprint
+            self.save_snapshot()
+        return schema
+    
+    def save_snapshot(self):
+        """Store the current schema under its catalog fingerprint"""
+        if not self.snapshot_cache or self.fingerprint is None:
+            return
+        try:
+            self.snapshot_cache.save(self.db.identity(), self.fingerprint, self.schema_cache)
+        except OSError as e:
+            print(f"[Warning] Could not save schema snapshot: {e}")
     
     def discover_schema(self) -> Dict:
         """Discover complete database schema"""
+        with tracer.span('schema.discover'):
+            return self._discover_schema()
+    
+    def _discover_schema(self) -> Dict:
         print("Discovering database schema...")
         
-        query = """
-        SELECT 
-            table_schema,
-            table_name,
-            column_name,
-            data_type,
-            is_nullable
-        FROM information_schema.columns
-        WHERE table_schema NOT IN ('pg_catalog', 'information_schema')
-        ORDER BY table_name, ordinal_position
-        """
-        
-        results = self.db.execute_query(query)
+        schema = self._tables_from_columns(self.db.execute_query(COLUMNS_QUERY))
+        foreign_keys = self._discover_foreign_keys(schema)
         
-        # Organize schema by table
+        print(f"[+] Discovered {len(schema)} tables, {foreign_keys} foreign keys")
+        self._set_schema(schema)
+        return schema
+    
+    @staticmethod
+    def _tables_from_columns(results) -> Dict:
+        """Organize information_schema.columns rows by table"""
         schema = {}
         for row in results:
             schema_name = row['table_schema']
@@ -41,7 +141,7 @@ class SchemaDiscovery:
             col_type = row['data_type']
             nullable = row['is_nullable']
             
-            full_table = f"{schema_name}.{table_name}" if schema_name != 'public' else table_name
+            full_table = full_table_name(schema_name, table_name)
             
             if full_table not in schema:
                 schema[full_table] = {
@@ -55,50 +155,183 @@ class SchemaDiscovery:
                 'type': col_type,
                 'nullable': nullable == 'YES'
             })
-        
-        print(f"[+] Discovered {len(schema)} tables")
-        self.schema_cache = schema
         return schema
     
-    def get_relevant_schema(self, question: str, limit: int = 10) -> str:
-        """Extract relevant tables/columns based on question keywords"""
-        if not self.schema_cache:
-            return ""
+    def _discover_foreign_keys(self, schema: Dict, tables: Optional[List[Tuple[str, str]]] = None) -> int:
+        """Attach foreign keys from pg_constraint to their tables, returns how many were found
         
-        # Extract keywords from question
-        keywords = set(re.findall(r'\b\w+\b', question.lower()))
+        ``tables`` limits the query to the foreign keys of those (schema, table) pairs.
+        """
+        with tracer.span('schema.foreign_keys'):
+            if tables is None:
+                results = self.db.execute_query(FOREIGN_KEY_QUERY)
+            else:
+                results = self.db.execute_query(
+                    f"SELECT * FROM ({FOREIGN_KEY_QUERY}) fk WHERE {_SELECTED_TABLES}", _table_params(tables)
+                )
         
-        relevant_tables = []
+        count = 0
+        for row in results:
+            table = schema.get(full_table_name(row['table_schema'], row['table_name']))
+            if table is None:
+                continue
+            table.setdefault('foreign_keys', []).append({
+                'columns': list(row['columns']),
+                'table': full_table_name(row['ref_schema'], row['ref_table']),
+                'ref_columns': list(row['ref_columns'])
+            })
+            count += 1
+        return count
+    
+    def _set_schema(self, schema: Dict):
+        """Install a schema and rebuild the structures derived from it"""
+        with tracer.span('schema.index_build'):
+            search_index = SchemaSearchIndex.from_schema(schema)
+            join_graph = JoinGraph.from_schema(schema)
+        with self._lock:
+            self.schema_cache = schema
+            self.search_index = search_index
+            self.join_graph = join_graph
+    
+    def refresh_tables(self, changed: Iterable[str], removed: Iterable[str] = ()) -> Dict:
+        """Reload ``changed`` tables (full names, new ones included) and forget ``removed`` ones
         
-        for table_name, table_info in self.schema_cache.items():
-            score = 0
+        Only those tables' columns, their foreign keys and the foreign keys of
+        tables referencing them are read from the catalog. The schema dict is replaced rather than mutated, the
+        search index and join graph are updated in place. Returns the new schema.
+        """
+        with tracer.span('schema.refresh_tables'):
+            old = self.schema_cache or {}
+            tables = [
+                (old[name]['schema'], old[name]['table_name']) if name in old
+                else tuple(name.split('.', 1)) if '.' in name else ('public', name)
+                for name in sorted(set(changed))
+            ]
             
-            # Check table name
-            table_lower = table_name.lower()
-            for keyword in keywords:
-                if keyword in table_lower:
-                    score += 2
-                
-                # Check column names
-                for col in table_info['columns']:
-                    if keyword in col['name'].lower():
-                        score += 1
+            reloaded = {}
+            if tables:
+                reloaded = self._tables_from_columns(
+                    self.db.execute_query(TABLE_COLUMNS_QUERY, _table_params(tables))
+                )
+            # Changed tables without visible columns were dropped in the meantime
+            removed = (set(removed) | set(changed)) - set(reloaded)
+            touched = removed | set(reloaded)
             
-            if score > 0:
-                relevant_tables.append((table_name, score))
+            # Tables referencing a reloaded one read their foreign keys again with it
+            schema = {}
+            referencing = []
+            for name, table in old.items():
+                if name in touched:
+                    continue
+                if any(fk['table'] in touched for fk in table.get('foreign_keys', ())):
+                    table = {key: value for key, value in table.items() if key != 'foreign_keys'}
+                    referencing.append((table['schema'], table['table_name']))
+                schema[name] = table
+            schema.update(reloaded)
+            if tables:
+                self._discover_foreign_keys(schema, tables + referencing)
+        
+            if self.search_index is None or self.join_graph is None:
+                self._set_schema(schema)
+            else:
+                with self._lock:
+                    for name in touched:
+                        self.search_index.remove_table(name)
+                        self.join_graph.remove_table(name)
+                    for name, table in reloaded.items():
+                        self.search_index.add_table(name, [col['name'] for col in table['columns']])
+                    for name, table in schema.items():
+                        for fk in table.get('foreign_keys', ()):
+                            if (name in reloaded or fk['table'] in reloaded) and fk['table'] in schema:
+                                self.join_graph.add_foreign_key(name, fk['columns'], fk['table'], fk['ref_columns'])
+                    self.schema_cache = schema
         
-        # Sort by score and take top N
-        relevant_tables.sort(key=lambda x: x[1], reverse=True)
-        relevant_tables = relevant_tables[:limit]
+        if self.table_stats is not None:
+            self.table_stats.invalidate()
+        return schema
+    
+    def get_relevant_tables(self, question: str, limit: int = 10) -> List[str]:
+        """Names of the tables most relevant to the question, best first"""
+        with tracer.span('schema.relevance'), self._lock:
+            if not self.schema_cache:
+                return []
+            
+            # Build the index if the cache was populated without discover_schema()
+            if self.search_index is None:
+                self._set_schema(self.schema_cache)
+            
+            # Extract keywords from question
+            keywords = set(re.findall(r'\b\w+\b', question.lower()))
+            
+            # Score only tables that share names with the keywords
+            relevant_tables = self.search_index.top_tables(keywords, limit)
+            
+            # Pull in the tables needed to join the best matches
+            if self.join_graph is not None:
+                anchors = relevant_tables[:self.JOIN_ANCHORS]
+                bridges = self.join_graph.bridging_tables(anchors)
+                if bridges:
+                    rest = [t for t in relevant_tables[self.JOIN_ANCHORS:] if t not in bridges]
+                    relevant_tables = (anchors + bridges + rest)[:limit]
+            
+            return relevant_tables
+    
+    def get_relevant_definitions(self, question: str, limit: int = 10) -> Tuple[List[str], Dict]:
+        """Relevant table names and {name: definition} for them, taken together under the lock
+        
+        The background refresher replaces ``schema_cache``, so reading it
+        separately could miss a table dropped after the ranking.
+        """
+        with self._lock:
+            tables = self.get_relevant_tables(question, limit)
+            schema = self.schema_cache or {}
+        tables = [table for table in tables if table in schema]
+        return tables, {table: schema[table] for table in tables}
+    
+    def get_join_hints(self, tables: List[str]) -> List[Tuple[str, str, str]]:
+        """``(table, ref_table, condition)`` for the foreign keys between ``tables``"""
+        with self._lock:
+            if self.join_graph is None:
+                return []
+            return self.join_graph.join_hints(tables)
+    
+    def get_join_path(self, source: str, target: str, max_hops: int = 3) -> Optional[List[str]]:
+        """Join conditions leading from ``source`` to ``target``, None if they are not connected"""
+        with self._lock:
+            if self.join_graph is None:
+                return None
+            path = self.join_graph.shortest_path(source, target, max_hops)
+        if path is None:
+            return None
+        return [JoinGraph.join_condition(from_table, edge) for from_table, edge in path]
+    
+    def get_table_stats(self) -> Dict:
+        """Statistics by table name (refreshed when older than the catalog TTL), empty if unavailable"""
+        if self.table_stats is None:
+            return {}
+        try:
+            return self.table_stats.all()
+        except Exception as e:
+            print(f"[Warning] Table statistics unavailable: {e}")
+            return {}
+    
+    def get_relevant_schema(self, question: str, limit: int = 10) -> str:
+        """Extract relevant tables/columns based on question keywords (every column, one per line)"""
+        relevant_tables, definitions = self.get_relevant_definitions(question, limit)
+        table_stats = self.get_table_stats()
         
         # Build schema description
         schema_text = ""
-        for table_name, _ in relevant_tables:
-            table_info = self.schema_cache[table_name]
-            schema_text += f"\nTable: {table_name}\n"
+        for table_name in relevant_tables:
+            table_info = definitions[table_name]
+            stats = table_stats.get(table_name)
+            indexed = stats.indexed_columns if stats else ()
+            schema_text += f"\nTable: {table_name}"
+            schema_text += f" (~{stats.rows:,} rows)\n" if stats and stats.rows >= 0 else "\n"
             schema_text += "Columns:\n"
             for col in table_info['columns']:
-                schema_text += f"  - {col['name']} ({col['type']})\n"
+                marker = ", indexed" if col['name'] in indexed else ""
+                schema_text += f"  - {col['name']} ({col['type']}{marker})\n"
         
         return schema_text
 
@@ -0,0 +1,129 @@
+"""
+Schema Refresher
+Keeps a long-running agent's schema current by reloading only the tables whose definition changed
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional
+
+from app.tracing.tracer import tracer
+
+# Optionally schema-qualified, unquoted identifier
+_TABLE_NAME_RE = re.compile(r'^[A-Za-z_]\w*(\.[A-Za-z_]\w*)?$')
+
+
+class SchemaRefresher:
+    """Checks the catalog every ``interval`` seconds and refreshes changed tables
+
+    A check costs one single-row query (the catalog fingerprint) while nothing
+    changed. When it differs, the per-relation fingerprints are compared with
+    the previous ones and only the added, altered or dropped tables are
+    reloaded into the schema, search index and join graph. With a DDL log
+    table (filled by an event trigger, see the README) the fingerprint is only
+    computed after a new row was logged.
+    """
+
+    def __init__(self, schema, interval: float = 300.0, ddl_log_table: Optional[str] = None):
+        if ddl_log_table and not _TABLE_NAME_RE.match(ddl_log_table):
+            raise ValueError(f"Invalid DDL log table name: {ddl_log_table}")
+        self.schema = schema
+        self.interval = interval
+        self.ddl_log_table = ddl_log_table
+        self.last_check: Optional[Dict] = None
+        self._ddl_position = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_env(cls, schema) -> Optional['SchemaRefresher']:
+        """Create the refresher unless SCHEMA_REFRESH_INTERVAL=0"""
+        interval = float(os.getenv('SCHEMA_REFRESH_INTERVAL', '300'))
+        if interval <= 0:
+            return None
+        return cls(schema, interval=interval, ddl_log_table=os.getenv('SCHEMA_DDL_LOG_TABLE') or None)
+
+    def _ddl_log_position(self):
+        """Id of the latest DDL log entry (None while the log is empty)"""
+        with tracer.span('schema.ddl_log'):
+            results = self.schema.db.execute_query(f"SELECT max(id) AS position FROM {self.ddl_log_table}")
+        return results[0]['position']
+
+    def check(self) -> Dict:
+        """Compare the catalog with the loaded schema and apply what changed
+
+        Returns {'changed': [...], 'removed': [...], 'full': bool, 'seconds': float}.
+        """
+        with self._lock, tracer.span('schema.refresh'):
+            start = time.perf_counter()
+            result = {'changed': [], 'removed': [], 'full': False}
+            schema = self.schema
+
+            # Only remembered once the refresh succeeded, so a failed one is retried next check
+            ddl_position = self._ddl_position
+            if self.ddl_log_table:
+                try:
+                    ddl_position = self._ddl_log_position()
+                    if (ddl_position is not None and ddl_position == self._ddl_position
+                            and schema.relation_fingerprints is not None):
+                        return self._done(result, start)
+                except RuntimeError as e:
+                    print(f"[Warning] DDL log unavailable, using the catalog fingerprint: {e}")
+                    self.ddl_log_table = None
+
+            fingerprint = schema.get_catalog_fingerprint()
+            if fingerprint == schema.fingerprint and schema.relation_fingerprints is not None:
+                self._ddl_position = ddl_position
+                return self._done(result, start)
+
+            relations = schema.get_relation_fingerprints()
+            previous = schema.relation_fingerprints
+            if fingerprint != schema.fingerprint:
+                if previous is None:
+                    # No per-table baseline for the loaded schema
+                    schema.discover_schema()
+                    result['full'] = True
+                else:
+                    result['changed'] = sorted(name for name, value in relations.items()
+                                               if previous.get(name) != value)
+                    result['removed'] = sorted(set(previous) - set(relations))
+                    schema.refresh_tables(result['changed'], result['removed'])
+
+            schema.fingerprint = fingerprint
+            schema.relation_fingerprints = relations
+            self._ddl_position = ddl_position
+            if result['full'] or result['changed'] or result['removed']:
+                schema.save_snapshot()
+            return self._done(result, start)
+
+    def _done(self, result: Dict, start: float) -> Dict:
+        result['seconds'] = time.perf_counter() - start
+        self.last_check = result
+        if result['full']:
+            print(f"[+] Schema refresh: rediscovered {len(self.schema.schema_cache or {})} tables "
+                  f"in {result['seconds']:.2f}s")
+        elif result['changed'] or result['removed']:
+            print(f"[+] Schema refresh: {len(result['changed'])} tables reloaded, {len(result['removed'])} "
+                  f"removed in {result['seconds']:.2f}s ({', '.join(result['changed'] + result['removed'])})")
+        return result
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                # Keep the current schema, try again next interval
+                print(f"[Warning] Schema refresh failed: {e}")
+
+    def start(self) -> 'SchemaRefresher':
+        """Check in a background thread every ``interval`` seconds (once started, further calls do nothing)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='schema-refresh', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,168 @@
+"""
+Schema Search Index
+Inverted index over table and column names for fast relevance scoring
+"""
+
+import re
+from typing import Dict, Iterable, List, Set
+
+_IDENTIFIER_SPLIT = re.compile(r'[^a-z0-9]+')
+
+
+def split_identifier(name: str) -> List[str]:
+    """Split an identifier into tokens: 'sale_order_line' -> ['sale', 'order', 'line']"""
+    return [token for token in _IDENTIFIER_SPLIT.split(name.lower()) if token]
+
+
+def _ngrams(text: str, n: int) -> Set[str]:
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class SchemaSearchIndex:
+    """Token and n-gram postings over distinct table/column names
+
+    Scoring matches SchemaDiscovery's original rules (keyword substring of the
+    table name: +2, of a column name: +1 per column) but only touches names
+    that share n-grams with the keyword instead of every column of every table.
+    """
+
+    NGRAM_SIZES = (2, 3)
+
+    def __init__(self):
+        # Lower-cased table name -> full table names using it
+        self._table_names: Dict[str, Set[str]] = {}
+        # Lower-cased column name -> {full table name: number of columns with that name}
+        self._column_names: Dict[str, Dict[str, int]] = {}
+        # Postings over the distinct name vocabulary
+        self._tokens: Dict[str, Set[str]] = {}
+        self._grams: Dict[str, Set[str]] = {}
+        # Table order, used to break score ties like the original linear scan
+        self._order: Dict[str, int] = {}
+        self._next_order = 0
+        self._match_cache: Dict[str, Set[str]] = {}
+
+    @classmethod
+    def from_schema(cls, schema: Dict) -> 'SchemaSearchIndex':
+        """Build an index from a SchemaDiscovery schema dict"""
+        index = cls()
+        for table_name, table_info in schema.items():
+            index.add_table(table_name, [col['name'] for col in table_info['columns']])
+        return index
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def _add_name(self, name: str):
+        for token in split_identifier(name):
+            self._tokens.setdefault(token, set()).add(name)
+        for n in self.NGRAM_SIZES:
+            for gram in _ngrams(name, n):
+                self._grams.setdefault(gram, set()).add(name)
+
+    def _drop_name(self, name: str):
+        if name in self._table_names or name in self._column_names:
+            return
+        for token in split_identifier(name):
+            postings = self._tokens.get(token)
+            if postings:
+                postings.discard(name)
+                if not postings:
+                    del self._tokens[token]
+        for n in self.NGRAM_SIZES:
+            for gram in _ngrams(name, n):
+                postings = self._grams.get(gram)
+                if postings:
+                    postings.discard(name)
+                    if not postings:
+                        del self._grams[gram]
+
+    def add_table(self, table_name: str, column_names: Iterable[str]):
+        """Index a table and its columns (replaces any previous entry for the table)"""
+        if table_name in self._order:
+            self.remove_table(table_name, keep_order=True)
+        else:
+            self._order[table_name] = self._next_order
+            self._next_order += 1
+
+        table_lower = table_name.lower()
+        self._table_names.setdefault(table_lower, set()).add(table_name)
+        self._add_name(table_lower)
+
+        for column in column_names:
+            col_lower = column.lower()
+            tables = self._column_names.setdefault(col_lower, {})
+            if not tables:
+                self._add_name(col_lower)
+            tables[table_name] = tables.get(table_name, 0) + 1
+
+        self._match_cache.clear()
+
+    def remove_table(self, table_name: str, keep_order: bool = False):
+        """Remove a table and its columns from the index"""
+        table_lower = table_name.lower()
+        owners = self._table_names.get(table_lower)
+        if owners:
+            owners.discard(table_name)
+            if not owners:
+                del self._table_names[table_lower]
+                self._drop_name(table_lower)
+
+        for col_lower in [c for c, tables in self._column_names.items() if table_name in tables]:
+            tables = self._column_names[col_lower]
+            del tables[table_name]
+            if not tables:
+                del self._column_names[col_lower]
+                self._drop_name(col_lower)
+
+        if not keep_order:
+            self._order.pop(table_name, None)
+        self._match_cache.clear()
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def _names_containing(self, keyword: str) -> Set[str]:
+        """All indexed names that contain ``keyword`` as a substring (memoized)"""
+        cached = self._match_cache.get(keyword)
+        if cached is not None:
+            return cached
+
+        # Names with an identical token match without further checks
+        matches = set(self._tokens.get(keyword, ()))
+
+        n = min(len(keyword), max(self.NGRAM_SIZES))
+        if n < min(self.NGRAM_SIZES):
+            # Single characters: scan the (small) distinct-name vocabulary
+            candidates = set(self._table_names) | set(self._column_names)
+        else:
+            grams = sorted(_ngrams(keyword, n), key=lambda g: len(self._grams.get(g, ())))
+            candidates = set(self._grams.get(grams[0], ()))
+            for gram in grams[1:]:
+                if not candidates:
+                    break
+                candidates &= self._grams.get(gram, set())
+
+        matches.update(name for name in candidates - matches if keyword in name)
+        self._match_cache[keyword] = matches
+        return matches
+
+    def score(self, keywords: Iterable[str]) -> Dict[str, int]:
+        """Relevance score per candidate table for the given lower-case keywords"""
+        scores: Dict[str, int] = {}
+        for keyword in keywords:
+            if not keyword:
+                continue
+            for name in self._names_containing(keyword):
+                for table in self._table_names.get(name, ()):
+                    scores[table] = scores.get(table, 0) + 2
+                for table, count in self._column_names.get(name, {}).items():
+                    scores[table] = scores.get(table, 0) + count
+        return scores
+
+    def top_tables(self, keywords: Iterable[str], limit: int = 10) -> List[str]:
+        """Highest scoring tables, ties broken by discovery order"""
+        scores = self.score(keywords)
+        ranked = sorted(scores, key=lambda t: (-scores[t], self._order.get(t, 0)))
+        return ranked[:limit]
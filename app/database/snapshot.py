@@ -0,0 +1,155 @@
+"""
+Schema Snapshot Cache
+Persists discovered schemas on disk and validates them against a catalog fingerprint
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+# Hash of every user relation, its live columns and the foreign keys. Unlike
+# information_schema.columns this reads pg_class/pg_attribute directly and returns a
+# single row, so it stays cheap over the SSH tunnel. relfilenode is left out on purpose:
+# TRUNCATE/VACUUM FULL change it without changing the schema.
+FINGERPRINT_QUERY = """
+SELECT md5(coalesce(rels.defn, '') || '|' || coalesce(fks.defn, '')) AS fingerprint
+FROM (
+    SELECT string_agg(
+        n.nspname || '.' || c.relname || ':' || c.relkind || ':' || c.relnatts || ':' || cols.defn,
+        ';' ORDER BY n.nspname, c.relname
+    ) AS defn
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    CROSS JOIN LATERAL (
+        SELECT coalesce(string_agg(a.attname || ' ' || a.atttypid || ' ' || a.attnotnull, ',' ORDER BY a.attnum), '') AS defn
+        FROM pg_attribute a
+        WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+    ) cols
+    WHERE c.relkind IN ('r', 'v', 'm', 'f', 'p')
+      AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+      AND n.nspname NOT LIKE 'pg_toast%'
+      AND n.nspname NOT LIKE 'pg_temp%'
+) rels, (
+    SELECT string_agg(
+        con.conrelid || ':' || con.confrelid || ':' || con.conkey::text || ':' || con.confkey::text,
+        ';' ORDER BY con.conrelid, con.conname
+    ) AS defn
+    FROM pg_constraint con
+    WHERE con.contype = 'f'
+) fks
+"""
+
+# The same definitions per relation (its columns and outgoing foreign keys), so
+# an incremental refresh can tell which relations changed. pg_class.xmin is not
+# enough: renaming or retyping a column only touches pg_attribute.
+RELATION_FINGERPRINTS_QUERY = """
+SELECT
+    n.nspname AS table_schema,
+    c.relname AS table_name,
+    md5(c.relkind || ':' || cols.defn || '|' || coalesce(fks.defn, '')) AS fingerprint
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+CROSS JOIN LATERAL (
+    SELECT coalesce(string_agg(a.attname || ' ' || a.atttypid || ' ' || a.attnotnull, ',' ORDER BY a.attnum), '') AS defn
+    FROM pg_attribute a
+    WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+) cols
+LEFT JOIN LATERAL (
+    SELECT string_agg(con.confrelid || ':' || con.conkey::text || ':' || con.confkey::text, ';' ORDER BY con.conname) AS defn
+    FROM pg_constraint con
+    WHERE con.conrelid = c.oid AND con.contype = 'f'
+) fks ON true
+WHERE c.relkind IN ('r', 'v', 'm', 'f', 'p')
+  AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+  AND n.nspname NOT LIKE 'pg_toast%'
+  AND n.nspname NOT LIKE 'pg_temp%'
+"""
+
+
+class SchemaSnapshotCache:
+    """Stores one gzip'd JSON snapshot per database identity"""
+
+    FORMAT_VERSION = 2
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = Path(cache_dir or os.getenv('SCHEMA_CACHE_DIR', '.schema_cache'))
+
+    @classmethod
+    def from_env(cls) -> Optional['SchemaSnapshotCache']:
+        """Create the cache unless SCHEMA_CACHE_ENABLED=false"""
+        if os.getenv('SCHEMA_CACHE_ENABLED', 'true').lower() in ('false', '0', 'no'):
+            return None
+        return cls()
+
+    def _path(self, identity: str) -> Path:
+        key = hashlib.sha256(identity.encode('utf-8')).hexdigest()[:24]
+        return self.cache_dir / f"{key}.json.gz"
+
+    @staticmethod
+    def _pack(schema: Dict) -> Dict:
+        """Compact form: columns as [name, type, nullable], foreign keys as [columns, table, ref_columns]"""
+        return {
+            full_table: [
+                info['schema'],
+                info['table_name'],
+                [[col['name'], col['type'], col['nullable']] for col in info['columns']],
+                [[fk['columns'], fk['table'], fk['ref_columns']] for fk in info.get('foreign_keys', ())],
+            ]
+            for full_table, info in schema.items()
+        }
+
+    @staticmethod
+    def _unpack(packed: Dict) -> Dict:
+        schema = {}
+        for full_table, (schema_name, table_name, columns, foreign_keys) in packed.items():
+            schema[full_table] = {
+                'table_name': table_name,
+                'schema': schema_name,
+                'columns': [
+                    {'name': name, 'type': col_type, 'nullable': nullable}
+                    for name, col_type, nullable in columns
+                ],
+            }
+            if foreign_keys:
+                schema[full_table]['foreign_keys'] = [
+                    {'columns': fk_columns, 'table': ref_table, 'ref_columns': ref_columns}
+                    for fk_columns, ref_table, ref_columns in foreign_keys
+                ]
+        return schema
+
+    def load(self, identity: str, fingerprint: str) -> Optional[Dict]:
+        """Return the cached schema if it was saved for the same catalog fingerprint"""
+        path = self._path(identity)
+        if not path.exists():
+            return None
+
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if (data.get('version') != self.FORMAT_VERSION
+                or data.get('identity') != identity
+                or data.get('fingerprint') != fingerprint):
+            return None
+        return self._unpack(data['tables'])
+
+    def save(self, identity: str, fingerprint: str, schema: Dict):
+        """Write the snapshot atomically"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(identity)
+        tmp_path = path.with_suffix('.tmp')
+
+        data = {
+            'version': self.FORMAT_VERSION,
+            'identity': identity,
+            'fingerprint': fingerprint,
+            'tables': self._pack(schema),
+        }
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
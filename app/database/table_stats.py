@@ -0,0 +1,130 @@
+"""
+Table Statistics
+Planner row estimates, on-disk sizes and indexed columns per table, refreshed on a TTL
+"""
+
+import os
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from app.database.schema import full_table_name
+from app.tracing.tracer import tracer
+
+# One row per user table. reltuples is the planner's estimate (-1 before the first
+# ANALYZE on PostgreSQL 14+, 0 on older versions); only the leading column of each valid index is reported, since
+# that is the column a filter must use for the index to help.
+TABLE_STATS_QUERY = """
+SELECT
+    n.nspname AS table_schema,
+    c.relname AS table_name,
+    c.reltuples::bigint AS row_estimate,
+    pg_total_relation_size(c.oid) AS total_bytes,
+    coalesce(idx.columns, '{}') AS indexed_columns
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+LEFT JOIN LATERAL (
+    SELECT array_agg(DISTINCT a.attname::text) AS columns
+    FROM pg_index i
+    JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+    WHERE i.indrelid = c.oid AND i.indisvalid
+) idx ON true
+WHERE c.relkind IN ('r', 'm', 'p')
+  AND n.nspname NOT IN ('pg_catalog', 'information_schema')
+  AND n.nspname NOT LIKE 'pg_toast%'
+  AND n.nspname NOT LIKE 'pg_temp%'
+"""
+
+
+class TableStats(NamedTuple):
+    rows: int  # -1 if the table has never been analyzed
+    total_bytes: int
+    indexed_columns: Tuple[str, ...]
+
+
+def format_count(n: float) -> str:
+    """Short human-readable count: 950, 12k, 3.4M, 1.2B"""
+    for threshold, suffix in ((1e9, 'B'), (1e6, 'M'), (1e3, 'k')):
+        if n >= threshold:
+            value = n / threshold
+            return f"{value:.1f}{suffix}" if value < 10 else f"{value:.0f}{suffix}"
+    return str(int(n))
+
+
+def format_bytes(n: float) -> str:
+    for unit in ('B', 'kB', 'MB', 'GB'):
+        if n < 1024:
+            return f"{n:.0f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+class TableStatsCatalog:
+    """Lazily loaded statistics for every table, reloaded after ``ttl`` seconds
+
+    All tables are read in one catalog query, so a refresh costs a single round
+    trip. Tables with at least ``large_rows`` estimated rows count as large.
+    """
+
+    def __init__(self, db, ttl: float = 600.0, large_rows: int = 1_000_000):
+        self.db = db
+        self.ttl = ttl
+        self.large_rows = large_rows
+        self._stats: Dict[str, TableStats] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, db) -> Optional['TableStatsCatalog']:
+        """Create the catalog unless TABLE_STATS_ENABLED=false"""
+        if os.getenv('TABLE_STATS_ENABLED', 'true').lower() in ('false', '0', 'no'):
+            return None
+        return cls(
+            db,
+            ttl=float(os.getenv('TABLE_STATS_TTL', '600')),
+            large_rows=int(os.getenv('TABLE_STATS_LARGE_ROWS', '1000000')),
+        )
+
+    def _is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def refresh(self):
+        """Reload the statistics of every table"""
+        with tracer.span('schema.table_stats'):
+            results = self.db.execute_query(TABLE_STATS_QUERY)
+
+        stats = {}
+        for row in results:
+            stats[full_table_name(row['table_schema'], row['table_name'])] = TableStats(
+                rows=int(row['row_estimate']),
+                total_bytes=int(row['total_bytes']),
+                indexed_columns=tuple(sorted(row['indexed_columns'])),
+            )
+        self._stats = stats
+        self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        """Reload on next use, e.g. after tables were added or altered"""
+        self._loaded_at = None
+
+    def all(self) -> Dict[str, TableStats]:
+        """Statistics by table name, refreshed first if older than the TTL"""
+        if self._is_stale():
+            with self._lock:
+                if self._is_stale():
+                    self.refresh()
+        return self._stats
+
+    def get(self, table: str) -> Optional[TableStats]:
+        return self.all().get(table)
+
+    def is_large(self, table: str) -> bool:
+        stats = self.get(table)
+        return stats is not None and stats.rows >= self.large_rows
+
+    def describe(self, table: str) -> str:
+        """e.g. 'account_move_line: ~52M rows, 14 GB'"""
+        stats = self.get(table)
+        if stats is None or stats.rows < 0:
+            return table
+        return f"{table}: ~{format_count(stats.rows)} rows, {format_bytes(stats.total_bytes)}"
@@ -0,0 +1,314 @@
+"""
+SSH Tunnel Forwarder
+Forwards local TCP connections over an SSH transport with a single selector loop
+"""
+
+import selectors
+import socket
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+# Large buffers keep the number of recv/send round trips low for big result sets
+BUFFER_SIZE = 256 * 1024
+# Buffered bytes per endpoint above which reading from its peer pauses
+MAX_PENDING = 4 * BUFFER_SIZE
+# How often writes to SSH channels with a full window are retried (channels
+# have no write readiness the selector could wait for)
+CHANNEL_RETRY_INTERVAL = 0.005
+
+# Nothing can be written (or read) right now
+_WOULD_BLOCK = (BlockingIOError, InterruptedError, socket.timeout)
+
+
+class TunnelForwarder:
+    """Local port forward over a paramiko transport (or anything with ``open_channel``)
+
+    One background thread accepts local connections and pumps data in both
+    directions for every open channel, so the thread count does not grow with
+    the number of connections. Opening a channel waits for an SSH round trip,
+    so it runs on a short-lived helper thread that hands the channel back to
+    the loop. Every endpoint is non-blocking with its own write buffer: a slow
+    client or a full channel window only pauses reading from that endpoint's
+    peer, never the other connections. ``ready`` is set
+    once the local port accepts connections, replacing fixed sleeps before
+    connecting.
+    """
+
+    def __init__(self, transport, remote_host: str = 'localhost', remote_port: int = 5432,
+                 buffer_size: int = BUFFER_SIZE, backlog: int = 16):
+        self.transport = transport
+        self.remote = (remote_host, remote_port)
+        self.buffer_size = buffer_size
+        self.backlog = backlog
+
+        self.local_port: Optional[int] = None
+        self.ready = threading.Event()
+
+        self._listener: Optional[socket.socket] = None
+        self._selector: Optional[selectors.BaseSelector] = None
+        self._wakeup: Optional[Tuple[socket.socket, socket.socket]] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        # Maps each endpoint to its peer
+        self._peers: Dict[object, object] = {}
+        # Bytes received for each endpoint and not written to it yet
+        self._pending: Dict[object, bytearray] = {}
+        # Channels with pending bytes, retried on a timer
+        self._backlogged: Set[object] = set()
+        # Endpoints to close once their pending bytes are written (the peer hit EOF)
+        self._closing: Set[object] = set()
+        # Selector data per endpoint: the direction its received bytes travel
+        self._directions: Dict[object, str] = {}
+        # (local connection, channel or None) from helper threads, registered by the loop
+        self._opened: List[Tuple[socket.socket, object]] = []
+        self._opened_lock = threading.Lock()
+
+        self.stats = {
+            'channels_opened': 0,
+            'channels_open': 0,
+            'bytes_up': 0,
+            'bytes_down': 0,
+        }
+
+    def start(self) -> int:
+        """Bind the local port and start the pump thread, returns the local port"""
+        self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind(('127.0.0.1', 0))
+        self._listener.listen(self.backlog)
+        self._listener.setblocking(False)
+        self.local_port = self._listener.getsockname()[1]
+
+        self._wakeup = socket.socketpair()
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._listener, selectors.EVENT_READ, 'accept')
+        self._selector.register(self._wakeup[0], selectors.EVENT_READ, 'wakeup')
+
+        self._thread = threading.Thread(target=self._run, name='tunnel-forwarder', daemon=True)
+        self._thread.start()
+        return self.local_port
+
+    def wait_ready(self, timeout: float = 10.0) -> bool:
+        """Block until the forwarder is accepting connections"""
+        return self.ready.wait(timeout)
+
+    @property
+    def is_active(self) -> bool:
+        """Whether the forwarder thread and the underlying transport are alive"""
+        transport_active = getattr(self.transport, 'is_active', lambda: True)()
+        return bool(self._thread and self._thread.is_alive() and transport_active)
+
+    def stop(self):
+        """Stop forwarding and close every open channel"""
+        self._stopping = True
+        if self._wakeup:
+            try:
+                self._wakeup[1].send(b'\0')
+            except OSError:
+                pass
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+
+    # ------------------------------------------------------------------
+    # Event loop
+    # ------------------------------------------------------------------
+
+    def _run(self):
+        self.ready.set()
+        try:
+            while not self._stopping:
+                timeout = CHANNEL_RETRY_INTERVAL if self._backlogged else None
+                for key, events in self._selector.select(timeout):
+                    if key.data == 'accept':
+                        self._accept()
+                    elif key.data == 'wakeup':
+                        self._wakeup[0].recv(64)
+                        self._register_opened()
+                    else:
+                        if events & selectors.EVENT_WRITE:
+                            self._flush(key.fileobj)
+                        if events & selectors.EVENT_READ and key.fileobj in self._peers:
+                            self._pump(key.fileobj, key.data)
+                for channel in list(self._backlogged):
+                    self._flush(channel)
+        finally:
+            self._shutdown()
+
+    def _accept(self):
+        try:
+            local_conn, _ = self._listener.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        local_conn.setblocking(False)
+        local_conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # Bytes the client sends meanwhile wait in the socket until the channel is registered
+        threading.Thread(target=self._open_channel, args=(local_conn,),
+                         name='tunnel-open-channel', daemon=True).start()
+
+    def _open_channel(self, local_conn: socket.socket):
+        """Open the SSH channel for ``local_conn`` (helper thread) and hand it to the loop"""
+        try:
+            channel = self.transport.open_channel(
+                'direct-tcpip',
+                self.remote,
+                ('127.0.0.1', self.local_port)
+            )
+            channel.setblocking(False)
+        except Exception:
+            channel = None
+
+        with self._opened_lock:
+            if self._stopping:
+                # The loop is gone (or going); nobody will register the pair
+                for endpoint in (local_conn, channel):
+                    if endpoint is not None:
+                        endpoint.close()
+                return
+            self._opened.append((local_conn, channel))
+        try:
+            self._wakeup[1].send(b'\0')
+        except OSError:
+            pass
+
+    def _register_opened(self):
+        with self._opened_lock:
+            opened, self._opened = self._opened, []
+        for local_conn, channel in opened:
+            if channel is None:
+                local_conn.close()
+                continue
+            self._register_pair(local_conn, channel)
+
+    def _register_pair(self, local_conn: socket.socket, channel):
+        self._peers[local_conn] = channel
+        self._peers[channel] = local_conn
+        self._pending[local_conn] = bytearray()
+        self._pending[channel] = bytearray()
+        self._directions[local_conn] = 'up'
+        self._directions[channel] = 'down'
+        self._selector.register(local_conn, selectors.EVENT_READ, 'up')
+        self._selector.register(channel, selectors.EVENT_READ, 'down')
+        self.stats['channels_opened'] += 1
+        self.stats['channels_open'] += 1
+
+    def _pump(self, src, direction: str):
+        dst = self._peers.get(src)
+        if dst is None:
+            return
+
+        try:
+            data = src.recv(self.buffer_size)
+        except _WOULD_BLOCK:
+            return
+        except Exception:
+            self._close_pair(src, dst)
+            return
+
+        if not data:
+            # EOF: deliver what is still buffered for the peer, then close the pair
+            if self._pending[dst]:
+                self._closing.add(dst)
+                self._update(src)
+            else:
+                self._close_pair(src, dst)
+            return
+
+        self.stats[f'bytes_{direction}'] += len(data)
+        self._pending[dst] += data
+        self._flush(dst)
+
+    def _flush(self, dst):
+        """Write as much of ``dst``'s buffer as it accepts without blocking"""
+        src = self._peers.get(dst)
+        if src is None:
+            self._backlogged.discard(dst)
+            return
+        pending = self._pending[dst]
+        try:
+            while pending:
+                sent = dst.send(pending)
+                if not sent:
+                    break
+                del pending[:sent]
+        except _WOULD_BLOCK:
+            pass
+        except Exception:
+            self._close_pair(dst, src)
+            return
+
+        if not pending and dst in self._closing:
+            self._close_pair(dst, src)
+            return
+        if isinstance(dst, socket.socket):
+            self._backlogged.discard(dst)
+        elif pending:
+            self._backlogged.add(dst)
+        else:
+            self._backlogged.discard(dst)
+        self._update(dst)
+        self._update(src)
+
+    def _update(self, endpoint):
+        """Register the events ``endpoint`` is waiting for
+        
+        Reading pauses while the peer's buffer is full (or the peer is only
+        draining before close); sockets wait for writability while their own
+        buffer is not empty.
+        """
+        peer = self._peers.get(endpoint)
+        if peer is None:
+            return
+        events = 0
+        if len(self._pending[peer]) < MAX_PENDING and peer not in self._closing:
+            events |= selectors.EVENT_READ
+        if self._pending[endpoint] and isinstance(endpoint, socket.socket):
+            events |= selectors.EVENT_WRITE
+        try:
+            key = self._selector.get_key(endpoint)
+        except KeyError:
+            key = None
+        if key is not None and key.events == events:
+            return
+        if not events:
+            if key is not None:
+                self._selector.unregister(endpoint)
+        elif key is None:
+            self._selector.register(endpoint, events, self._directions[endpoint])
+        else:
+            self._selector.modify(endpoint, events, key.data)
+
+    def _close_pair(self, a, b):
+        for endpoint in (a, b):
+            self._peers.pop(endpoint, None)
+            self._pending.pop(endpoint, None)
+            self._backlogged.discard(endpoint)
+            self._closing.discard(endpoint)
+            self._directions.pop(endpoint, None)
+            try:
+                self._selector.unregister(endpoint)
+            except (KeyError, ValueError):
+                pass
+            try:
+                endpoint.close()
+            except Exception:
+                pass
+        self.stats['channels_open'] -= 1
+
+    def _shutdown(self):
+        with self._opened_lock:
+            self._stopping = True
+            opened, self._opened = self._opened, []
+        for pair in opened:
+            for endpoint in pair:
+                if endpoint is not None:
+                    endpoint.close()
+        for endpoint in list(self._peers):
+            if endpoint in self._peers:
+                self._close_pair(endpoint, self._peers[endpoint])
+        for sock in (self._listener, *(self._wakeup or ())):
+            try:
+                sock.close()
+            except Exception:
+                pass
+        self._selector.close()
+        self.ready.clear()
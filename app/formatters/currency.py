@@ -3,7 +3,18 @@ Currency Formatter
 Formats numeric values as currency for display
 """
 
+import re
 from decimal import Decimal
+from functools import lru_cache
+from typing import Iterable, List
+
+from app.database.result_set import ResultSet
+from app.tracing.tracer import tracer
+
+
+def _keyword_pattern(keywords) -> re.Pattern:
+    """Single regex that matches any of the keywords as a substring"""
+    return re.compile('|'.join(re.escape(k) for k in sorted(set(keywords), key=len, reverse=True)))
 
 
 class CurrencyFormatter:
@@ -18,6 +29,15 @@ class CurrencyFormatter:
         'quantity', 'qty', 'count', 'number', 'total_count'
     ]
     
+    # "total"/"sum" columns only count as currency with one of these indicators
+    TOTAL_INDICATORS = ['amount', 'price', 'cost', 'revenue', 'sales', 'income']
+    SUM_INDICATORS = ['amount', 'price', 'cost', 'revenue']
+    
+    _EXCLUDE_RE = _keyword_pattern(EXCLUDE_KEYWORDS)
+    _CURRENCY_RE = _keyword_pattern(CURRENCY_KEYWORDS)
+    _TOTAL_RE = _keyword_pattern(TOTAL_INDICATORS)
+    _SUM_RE = _keyword_pattern(SUM_INDICATORS)
+    
     @staticmethod
     def format_currency_value(value) -> str:
         """Format numeric value as currency"""
@@ -34,49 +54,82 @@ class CurrencyFormatter:
             return str(value)
     
     @staticmethod
+    @lru_cache(maxsize=4096)
     def is_currency_column(col_name: str) -> bool:
-        """Check if column name suggests it contains currency values"""
+        """Check if column name suggests it contains currency values (memoized per name)"""
         col_lower = col_name.lower()
         
         # First check if it's explicitly excluded (quantity counts, etc.)
-        if any(exclude in col_lower for exclude in CurrencyFormatter.EXCLUDE_KEYWORDS):
+        if CurrencyFormatter._EXCLUDE_RE.search(col_lower):
             return False
         
         # Check for currency keywords
-        if any(keyword in col_lower for keyword in CurrencyFormatter.CURRENCY_KEYWORDS):
+        if CurrencyFormatter._CURRENCY_RE.search(col_lower):
             return True
         
         # Check for "total" but only with currency context (amount, price, etc.)
-        if 'total' in col_lower:
-            currency_indicators = ['amount', 'price', 'cost', 'revenue', 'sales', 'revenue', 'income']
-            if any(indicator in col_lower for indicator in currency_indicators):
-                return True
+        if 'total' in col_lower and CurrencyFormatter._TOTAL_RE.search(col_lower):
+            return True
         
         # Check for "sum" but only with currency context
-        if 'sum' in col_lower:
-            currency_indicators = ['amount', 'price', 'cost', 'revenue']
-            if any(indicator in col_lower for indicator in currency_indicators):
-                return True
+        if 'sum' in col_lower and CurrencyFormatter._SUM_RE.search(col_lower):
+            return True
         
         return False
     
     @staticmethod
-    def format_results(results: list) -> list:
-        """Format currency columns in query results"""
+    def currency_columns(columns: Iterable[str]) -> List[str]:
+        """Classify a result set's columns once, from its column names"""
+        return [col for col in columns if CurrencyFormatter.is_currency_column(col)]
+    
+    @staticmethod
+    def format_results(results: list, columns: Iterable[str] = None) -> list:
+        """Format currency columns in query results
+        
+        Columns are classified once per result set (from ``columns``, e.g. the
+        cursor description, or the first row's keys) and then formatted column by column.
+        A ResultSet comes back as a ResultSet in which only the currency columns
+        are new; the other columns are shared with the input.
+        """
         if not results:
             return results
         
-        formatted_results = []
+        if isinstance(results, ResultSet):
+            with tracer.span('format.currency'):
+                format_value = CurrencyFormatter.format_currency_value
+                return results.with_columns({
+                    key: [format_value(value) if value is not None else None for value in results.column(key)]
+                    for key in CurrencyFormatter.currency_columns(columns if columns is not None else results.keys())
+                })
         
-        for row in results:
-            formatted_row = row.copy() if isinstance(row, dict) else dict(row)
-            
-            # Format currency columns
-            for key, value in formatted_row.items():
-                if CurrencyFormatter.is_currency_column(key) and value is not None:
-                    formatted_row[key] = CurrencyFormatter.format_currency_value(value)
-            
-            formatted_results.append(formatted_row)
+        with tracer.span('format.currency'):
+            formatted_results = [row.copy() if isinstance(row, dict) else dict(row) for row in results]
+        
+            if columns is None:
+                columns = formatted_results[0].keys()
+        
+            format_value = CurrencyFormatter.format_currency_value
+            for key in CurrencyFormatter.currency_columns(columns):
+                for row in formatted_results:
+                    value = row.get(key)
+                    if value is not None:
+                        row[key] = format_value(value)
         
         return formatted_results
 
+    @staticmethod
+    def iter_format_results(rows):
+        """Format currency columns lazily for a stream of rows"""
+        currency_columns = None
+
+        for row in rows:
+            # Classify columns once, from the first row
+            if currency_columns is None:
+                currency_columns = CurrencyFormatter.currency_columns(row.keys())
+            
+            formatted_row = dict(row)
+            for key in currency_columns:
+                if formatted_row[key] is not None:
+                    formatted_row[key] = CurrencyFormatter.format_currency_value(formatted_row[key])
+            
+            yield formatted_row
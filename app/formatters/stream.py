@@ -0,0 +1,24 @@
+"""
+Streaming Table Renderer
+Renders row streams in fixed-size chunks so output never holds the full result
+"""
+
+from itertools import islice
+from typing import Iterable
+
+
+def render_table_stream(rows: Iterable[dict], chunk_size: int = 500, out=None) -> int:
+    """Print rows as a sequence of grid tables of ``chunk_size`` rows, returns the row count"""
+    from tabulate import tabulate
+
+    rows = iter(rows)
+    total = 0
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        print(tabulate(chunk, headers='keys', tablefmt='grid'), file=out)
+        total += len(chunk)
+
+    return total
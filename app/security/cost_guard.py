@@ -0,0 +1,143 @@
+"""
+Cost Guard - Rejects queries whose estimated plan is over budget before they run
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app.cache.query_cache import normalize_sql
+from app.tracing.tracer import tracer
+
+
+class QueryCostError(ValueError):
+    """Raised when the planner estimate of a query exceeds the configured budget"""
+
+    def __init__(self, message: str, estimate: Dict):
+        super().__init__(message)
+        self.estimate = estimate
+
+    @property
+    def hint(self) -> str:
+        """Feedback for regenerating the query"""
+        return (f"The previous query was rejected before running: {self}. "
+                "Write a cheaper query: avoid cross joins and joins without conditions, "
+                "filter with selective WHERE clauses before joining, and aggregate in SQL.")
+
+
+def seq_scanned_relations(node: Dict) -> List[str]:
+    """Relations read by Seq Scan nodes anywhere in an EXPLAIN (VERBOSE, FORMAT JSON) plan
+
+    Only VERBOSE plans name each relation's schema.
+    """
+    relations = []
+    if node.get('Node Type') == 'Seq Scan' and 'Relation Name' in node:
+        schema = node.get('Schema', 'public')
+        name = node['Relation Name']
+        relations.append(name if schema == 'public' else f"{schema}.{name}")
+    for child in node.get('Plans', ()):
+        relations.extend(seq_scanned_relations(child))
+    return relations
+
+
+class CostGuard:
+    """Runs EXPLAIN (VERBOSE, FORMAT JSON) and checks total cost and row estimates
+
+    Plan estimates are cached per normalized SQL for ``plan_cache_ttl`` seconds,
+    so repeated queries skip the EXPLAIN round trip. Budgets are checked on every
+    call, so they can be changed without clearing the cache. A budget of 0
+    disables that check.
+    """
+
+    def __init__(self, db, max_cost: float = 1_000_000, max_rows: int = 1_000_000,
+                 plan_cache_size: int = 512, plan_cache_ttl: float = 600.0):
+        self.db = db
+        self.max_cost = max_cost
+        self.max_rows = max_rows
+        self.plan_cache_size = plan_cache_size
+        self.plan_cache_ttl = plan_cache_ttl
+        self._plans: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'explains': 0, 'plan_hits': 0, 'rejected': 0}
+
+    @classmethod
+    def from_env(cls, db) -> Optional['CostGuard']:
+        """Create the guard unless QUERY_COST_GUARD_ENABLED=false"""
+        if os.getenv('QUERY_COST_GUARD_ENABLED', 'true').lower() in ('false', '0', 'no'):
+            return None
+        return cls(
+            db,
+            max_cost=float(os.getenv('QUERY_MAX_COST', '1000000')),
+            max_rows=int(os.getenv('QUERY_MAX_ROWS', '1000000')),
+            plan_cache_size=int(os.getenv('QUERY_PLAN_CACHE_SIZE', '512')),
+            plan_cache_ttl=float(os.getenv('QUERY_PLAN_CACHE_TTL', '600')),
+        )
+
+    def _cached(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._plans.get(key)
+            if entry is None:
+                return None
+            created, estimate = entry
+            if self.plan_cache_ttl and time.monotonic() - created > self.plan_cache_ttl:
+                del self._plans[key]
+                return None
+            self._plans.move_to_end(key)
+            self.stats['plan_hits'] += 1
+            return estimate
+
+    def _store(self, key: str, estimate: Dict):
+        with self._lock:
+            self._plans[key] = (time.monotonic(), estimate)
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.plan_cache_size:
+                self._plans.popitem(last=False)
+
+    def explain(self, sql: str) -> Dict:
+        """Planner estimate for ``sql``: total_cost, plan_rows, the top node type and seq-scanned relations"""
+        key = normalize_sql(sql)
+        estimate = self._cached(key)
+        if estimate is not None:
+            return estimate
+
+        with tracer.span('db.explain'):
+            results = self.db.execute_query(f"EXPLAIN (VERBOSE, FORMAT JSON) {sql}")
+        plan = results[0]['QUERY PLAN']
+        # psycopg2 decodes json columns, but not every driver/cursor does
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        root = plan[0]['Plan']
+
+        estimate = {
+            'total_cost': float(root['Total Cost']),
+            'plan_rows': int(root['Plan Rows']),
+            'node_type': root['Node Type'],
+            'seq_scans': seq_scanned_relations(root),
+        }
+        with self._lock:
+            self.stats['explains'] += 1
+        self._store(key, estimate)
+        return estimate
+
+    def check(self, sql: str, check_rows: bool = True) -> Dict:
+        """Return the estimate, or raise QueryCostError if it is over budget
+
+        ``check_rows=False`` skips the row budget, for results written out as
+        they arrive rather than held in memory.
+        """
+        estimate = self.explain(sql)
+
+        problems = []
+        if self.max_cost and estimate['total_cost'] > self.max_cost:
+            problems.append(f"estimated cost {estimate['total_cost']:,.0f} exceeds {self.max_cost:,.0f}")
+        if check_rows and self.max_rows and estimate['plan_rows'] > self.max_rows:
+            problems.append(f"estimated rows {estimate['plan_rows']:,} exceed {self.max_rows:,}")
+
+        if problems:
+            with self._lock:
+                self.stats['rejected'] += 1
+            raise QueryCostError("Query over budget: " + ", ".join(problems), estimate)
+        return estimate
@@ -0,0 +1,132 @@
+"""
+SQL Tokenizer - Single-pass lexer for PostgreSQL queries
+"""
+
+import re
+from typing import List, NamedTuple, Tuple
+
+
+class Token(NamedTuple):
+    """A lexical token with its source span and parenthesis depth"""
+    kind: str      # word, ident, string, number, param, op, punct
+    value: str
+    start: int
+    end: int
+    depth: int
+
+    @property
+    def upper(self) -> str:
+        return self.value.upper()
+
+
+# Leading whitespace is folded into each match and alternatives are ordered by
+# frequency; string/identifier bodies use unrolled loops to avoid per-character
+# backtracking.
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+    (?P<word>(?![EeBbXxNnUu]&?'|[Uu]&")[A-Za-z_\x80-\uffff][A-Za-z0-9_$\x80-\uffff]*)
+  | (?P<op>::|<>|!=|<=|>=|\|\||(?!--|/\*|\.\d)[+\-*/<>=~!@#%^&|`?.:])
+  | (?P<punct>[(),;\[\]])
+  | (?P<number>(?:\d+(?:\.\d*)?|\.\d+)(?:[Ee][+-]?\d+)?)
+  | (?P<string>[Ee]'[^'\\]*(?:(?:\\.|'')[^'\\]*)*'|(?:[BbXxNn]|[Uu]&)?'[^']*(?:''[^']*)*')
+  | (?P<ident>(?:[Uu]&)?"[^"]*(?:""[^"]*)*")
+  | (?P<line_comment>--[^\n]*)
+  | (?P<block_comment>/\*)
+  | (?P<dollar>\$(?:[A-Za-z_][A-Za-z0-9_]*)?\$)
+  | (?P<param>\$\d+)
+    )
+""", re.VERBOSE)
+
+_QUOTE_START_RE = re.compile(r"""(?:[EeBbXxNn]|[Uu]&)?['"]""")
+
+
+def _skip_block_comment(sql: str, pos: int) -> int:
+    """Return the offset after the block comment opened at ``pos`` (they nest in Postgres)"""
+    depth = 0
+    while pos < len(sql):
+        if sql.startswith('/*', pos):
+            depth += 1
+            pos += 2
+        elif sql.startswith('*/', pos):
+            depth -= 1
+            pos += 2
+            if depth == 0:
+                return pos
+        else:
+            pos += 1
+    raise ValueError("Unterminated block comment")
+
+
+def tokenize(sql: str) -> Tuple[Token, ...]:
+    """Split SQL into tokens, dropping whitespace and comments
+
+    String literals (including E'' and $tag$ quoting) and quoted identifiers are
+    single tokens, so keywords inside them are never mistaken for SQL.
+
+    Raises:
+        ValueError: on unterminated literals/comments or unbalanced parentheses
+    """
+    tokens: List[Token] = []
+    depth = 0
+    pos = 0
+    length = len(sql)
+
+    match_token = _TOKEN_RE.match
+
+    while pos < length:
+        match = match_token(sql, pos)
+        if match is None:
+            rest = sql[pos:]
+            if rest.isspace():
+                break
+            pos += len(rest) - len(rest.lstrip())
+            if _QUOTE_START_RE.match(sql, pos):
+                raise ValueError(f"Unterminated quoted text at position {pos}")
+            raise ValueError(f"Unexpected character {sql[pos]!r} at position {pos}")
+
+        kind = match.lastgroup
+        pos = match.start(kind)
+        end = match.end()
+
+        if kind == 'line_comment':
+            pos = end
+            continue
+        if kind == 'block_comment':
+            pos = _skip_block_comment(sql, pos)
+            continue
+        if kind == 'dollar':
+            tag = match.group('dollar')
+            close = sql.find(tag, end)
+            if close < 0:
+                raise ValueError(f"Unterminated dollar-quoted string at position {pos}")
+            kind, end = 'string', close + len(tag)
+
+        value = sql[pos:end]
+        if kind == 'punct' and value == ')':
+            depth -= 1
+            if depth < 0:
+                raise ValueError(f"Unbalanced ')' at position {pos}")
+        tokens.append(Token(kind, value, pos, end, depth))
+        if kind == 'punct' and value == '(':
+            depth += 1
+        pos = end
+
+    if depth:
+        raise ValueError("Unbalanced parentheses")
+    return tuple(tokens)
+
+
+def split_statements(tokens: Tuple[Token, ...]) -> List[Tuple[Token, ...]]:
+    """Group tokens into statements separated by top-level semicolons (empty ones dropped)"""
+    statements = []
+    current: List[Token] = []
+    for token in tokens:
+        if token.kind == 'punct' and token.value == ';' and token.depth == 0:
+            if current:
+                statements.append(tuple(current))
+            current = []
+        else:
+            current.append(token)
+    if current:
+        statements.append(tuple(current))
+    return statements
@@ -2,53 +2,156 @@
 Query Validator - Ensures SQL queries are safe to execute
 """
 
+import re
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from app.security.sql_tokenizer import Token, tokenize, split_statements
+
+
+_UNICODE_ESCAPE_RE = re.compile(r'\\(?:\+([0-9A-Fa-f]{6})|([0-9A-Fa-f]{4})|(\\))')
+
+
+def _function_name(token: Token) -> Optional[str]:
+    """Name a word or quoted identifier token refers to when called, None for other tokens
+    
+    Bare words fold to lower case; quoted identifiers keep their case, like in Postgres.
+    """
+    if token.kind == 'word':
+        return token.value.lower()
+    if token.kind != 'ident':
+        return None
+    value = token.value
+    unicode = value[0] in 'Uu'
+    name = value[3 if unicode else 1:-1].replace('""', '"')
+    if unicode:
+        name = _UNICODE_ESCAPE_RE.sub(lambda m: m.group(3) or chr(int(m.group(1) or m.group(2), 16)), name)
+    return name
+
+
 class QueryValidator:
-    """Validates that SQL queries are safe (SELECT only, no dangerous operations)"""
+    """Validates that SQL queries are safe (SELECT only, no dangerous operations)
+    
+    Queries are tokenized once, so keywords are only matched as whole words
+    outside string literals, quoted identifiers and comments (``updated_at`` and
+    ``'DROP'`` are fine).
+    """
     
     DANGEROUS_KEYWORDS = [
         'DROP', 'DELETE', 'TRUNCATE', 'UPDATE', 'INSERT',
-        'ALTER', 'CREATE', 'GRANT', 'REVOKE', 'EXECUTE'
+        'ALTER', 'CREATE', 'GRANT', 'REVOKE', 'EXECUTE', 'MERGE'
     ]
     
+    # Functions with side effects that still run inside a read-only transaction
+    FORBIDDEN_FUNCTIONS = [
+        'pg_terminate_backend', 'pg_cancel_backend', 'pg_reload_conf', 'pg_rotate_logfile',
+        'set_config', 'pg_sleep', 'pg_read_file', 'pg_read_binary_file', 'pg_ls_dir',
+        'lo_import', 'lo_export', 'lo_unlink', 'dblink', 'dblink_exec', 'dblink_connect',
+        'pg_notify'
+    ]
+    
+    # Whole families: pg_sleep_for/_until, dblink_connect_u, pg_try_advisory_lock_shared,
+    # pg_advisory_unlock_all... (session advisory locks would outlive the query on a pooled connection)
+    FORBIDDEN_FUNCTION_PREFIXES = re.compile(r'pg_sleep|dblink|pg_\w*advisory')
+    
+    ROW_LOCK_WORDS = ('UPDATE', 'SHARE', 'NO', 'KEY')
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _statement(sql: str) -> Tuple[Token, ...]:
+        """Tokens of the single statement in ``sql``"""
+        statements = split_statements(tokenize(sql))
+        if not statements:
+            raise ValueError("Query is empty")
+        if len(statements) > 1:
+            raise ValueError("Only a single statement is allowed")
+        return statements[0]
+    
     @staticmethod
     def validate_query(sql: str) -> bool:
         """Validate that query is safe to execute (SELECT only)"""
-        sql_upper = sql.upper().strip()
+        tokens = QueryValidator._statement(sql)
         
-        # Check for dangerous operations
-        for keyword in QueryValidator.DANGEROUS_KEYWORDS:
-            if keyword in sql_upper:
-                raise ValueError(f"Query contains forbidden operation: {keyword}")
-        
-        # Must start with SELECT or WITH
-        if not (sql_upper.startswith('SELECT') or sql_upper.startswith('WITH')):
+        # Must start with SELECT or WITH (optionally parenthesized)
+        first = next((t for t in tokens if t.value != '('), None)
+        if first is None or first.kind != 'word' or first.upper not in ('SELECT', 'WITH'):
             raise ValueError("Only SELECT queries are allowed")
         
+        forbidden_functions = QueryValidator.FORBIDDEN_FUNCTIONS
+        for i, token in enumerate(tokens):
+            following = tokens[i + 1] if i + 1 < len(tokens) else None
+            if following is not None and following.value == '(':
+                # "pg_sleep"(1) calls the same function as pg_sleep(1)
+                name = _function_name(token)
+                if name in forbidden_functions or (
+                        name and QueryValidator.FORBIDDEN_FUNCTION_PREFIXES.match(name)):
+                    raise ValueError(f"Query calls forbidden function: {name}")
+            
+            if token.kind != 'word':
+                continue
+            
+            # Qualified names (alias.update) are columns, not keywords
+            if i and tokens[i - 1].value == '.':
+                continue
+            
+            word = token.upper
+            if word == 'FOR' and following is not None and following.upper in QueryValidator.ROW_LOCK_WORDS:
+                raise ValueError("Row locking clauses (FOR UPDATE/SHARE) are not allowed")
+            if word in QueryValidator.DANGEROUS_KEYWORDS:
+                raise ValueError(f"Query contains forbidden operation: {word}")
+            if word == 'INTO':
+                raise ValueError("SELECT INTO is not allowed")
+            if word == 'UESCAPE':
+                # Custom escape characters would hide names from the checks above
+                raise ValueError("UESCAPE is not allowed")
+        
         return True
     
     @staticmethod
-    def add_limit_if_needed(sql: str, default_limit: int = 100) -> str:
-        """Add LIMIT clause if query doesn't have one"""
-        sql_upper = sql.upper()
+    def statement_body(sql: str) -> str:
+        """The statement without its trailing semicolon or comments, for embedding as a subquery"""
+        tokens = QueryValidator._statement(sql)
+        return sql[tokens[0].start:tokens[-1].end]
+    
+    @staticmethod
+    def add_limit_if_needed(sql: str, default_limit: int = 100, max_limit: Optional[int] = None) -> str:
+        """Add LIMIT clause if query doesn't have one
         
-        if 'LIMIT' not in sql_upper:
-            # Remove trailing semicolon if present
-            has_semicolon = sql.rstrip().endswith(';')
-            sql = sql.rstrip().rstrip(';')
+        Only the outermost query counts: a LIMIT inside a subquery or CTE does not
+        bound the result. With ``max_limit`` an existing outer LIMIT (or FETCH FIRST)
+        above it is clamped down.
+        """
+        try:
+            tokens = QueryValidator._statement(sql)
+        except ValueError:
+            return sql
             
-            # Add appropriate LIMIT
-            if 'GROUP BY' in sql_upper or 'ORDER BY' in sql_upper:
-                sql += f"\nLIMIT {default_limit}"
-            elif 'WHERE' in sql_upper or 'JOIN' in sql_upper:
-                sql += f"\nLIMIT {default_limit}"
-            else:
-                sql += f"\nLIMIT {default_limit}"
+        top = [t for t in tokens if t.depth == 0]
+        for i, token in enumerate(top):
+            if token.kind != 'word' or token.upper not in ('LIMIT', 'FETCH'):
+                continue
             
-            # Add semicolon back if it was there
-            if has_semicolon:
-                sql += ';'
-            else:
-                sql += ';'
+            # FETCH FIRST|NEXT [n] ROW|ROWS ONLY
+            offset = 1 if token.upper == 'LIMIT' else 2
+            value = top[i + offset] if i + offset < len(top) else None
+            after = top[i + offset + 1] if i + offset + 1 < len(top) else None
+
+            if not max_limit or value is None:
+                return sql
+            if value.kind == 'number' and value.value.isdigit() and (after is None or after.kind != 'op'):
+                if int(value.value) <= max_limit:
+                    return sql
+                return sql[:value.start] + str(max_limit) + sql[value.end:]
+            if value.upper == 'ALL':
+                return sql[:value.start] + str(max_limit) + sql[value.end:]
+            if token.upper == 'FETCH' and value.upper in ('ROW', 'ROWS'):
+                # No count means one row
+                return sql
         
-        return sql
+            # Parameter or expression: bound the whole query instead
+            body = QueryValidator.statement_body(sql)
+            return f"SELECT * FROM (\n{body}\n) AS limited\nLIMIT {max_limit};"
 
+        # Append after the last token so trailing comments cannot swallow it
+        limit = min(default_limit, max_limit) if max_limit else default_limit
+        return sql[:tokens[-1].end] + f"\nLIMIT {limit};"
@@ -0,0 +1 @@
+# Tracing module for latency instrumentation and profiling
@@ -0,0 +1,64 @@
+"""
+Question Profiler
+Per-question cProfile dumps plus flamegraph-ready folded stacks from tracer spans
+"""
+
+import cProfile
+import io
+import itertools
+import pstats
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from app.tracing.tracer import tracer
+
+# Batch workers profile concurrently; keeps dumps from the same microsecond apart
+_dump_counter = itertools.count(1)
+
+
+def _fold_spans(spans: List[Tuple[tuple, float]]) -> Dict[tuple, float]:
+    """Self time per span path (total minus direct children)"""
+    totals: Dict[tuple, float] = {}
+    for path, seconds in spans:
+        totals[path] = totals.get(path, 0.0) + seconds
+
+    self_times = dict(totals)
+    for path, seconds in totals.items():
+        parent = path[:-1]
+        if parent in self_times:
+            self_times[parent] -= seconds
+    return self_times
+
+
+def profile_call(label: str, fn, *args, output_dir: str = 'profiles', top: int = 15, **kwargs):
+    """Run ``fn`` under cProfile and write <output_dir>/<timestamp>-<n>-<label>.{prof,folded}
+
+    The .prof file opens in snakeviz/pstats; the .folded file (span stacks with
+    self time in microseconds) feeds flamegraph.pl or speedscope directly.
+    """
+    profiler = cProfile.Profile()
+    with tracer.trace() as spans:
+        profiler.enable()
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+
+    out_dir = Path(output_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    slug = re.sub(r'[^a-z0-9]+', '-', label.lower()).strip('-')[:40] or 'question'
+    base = out_dir / f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{next(_dump_counter)}-{slug}"
+
+    profiler.dump_stats(f"{base}.prof")
+    with open(f"{base}.folded", 'w', encoding='utf-8') as f:
+        for path, seconds in _fold_spans(spans).items():
+            f.write(f"{';'.join(path)} {max(0, int(seconds * 1_000_000))}\n")
+
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(top)
+    print(f"\n[Profile] Top {top} functions by cumulative time:")
+    print(stream.getvalue().strip())
+    print(f"[Profile] Written {base}.prof and {base}.folded")
+    return result
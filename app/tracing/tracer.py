@@ -0,0 +1,171 @@
+"""
+Tracer
+Lightweight spans and latency histograms for the agent pipeline
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+class Histogram:
+    """Latency samples for one span name (bounded window for percentiles)"""
+
+    def __init__(self, window: int = 10000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def summary(self) -> Dict:
+        ordered = sorted(self.samples)
+
+        def pick(q):
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': pick(0.50),
+            'p95': pick(0.95),
+            'p99': pick(0.99),
+            'max': self.max,
+        }
+
+
+class Tracer:
+    """Records spans into per-name histograms
+
+    Spans nest per thread. While a trace is active on a thread (see ``trace``),
+    finished spans are also collected with their parent path, which is what
+    the ``--profile`` report turns into flamegraph input.
+    """
+
+    def __init__(self):
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self) -> List[str]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def record(self, name: str, seconds: float):
+        """Record a duration measured elsewhere"""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def span(self, name: str):
+        """Time a block of code under ``name``"""
+        stack = self._stack()
+        stack.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            path = tuple(stack)
+            stack.pop()
+            self.record(name, elapsed)
+
+            spans = getattr(self._local, 'spans', None)
+            if spans is not None:
+                spans.append((path, elapsed))
+
+    @contextmanager
+    def trace(self):
+        """Collect the spans finished on this thread, yields the list of (path, seconds)"""
+        previous = getattr(self._local, 'spans', None)
+        spans = self._local.spans = []
+        try:
+            yield spans
+        finally:
+            self._local.spans = previous
+
+    def summary(self) -> Dict[str, Dict]:
+        """count/mean/p50/p95/p99/max per span name, in seconds"""
+        with self._lock:
+            return {name: h.summary() for name, h in sorted(self._histograms.items())}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+
+    def prometheus_text(self) -> str:
+        """Span latencies in the Prometheus text exposition format (as summaries)"""
+        lines = [
+            '# HELP agent_span_seconds Latency of agent pipeline stages',
+            '# TYPE agent_span_seconds summary',
+        ]
+        for name, stats in self.summary().items():
+            for label, key in (('0.5', 'p50'), ('0.95', 'p95'), ('0.99', 'p99')):
+                lines.append(f'agent_span_seconds{{span="{name}",quantile="{label}"}} {stats[key]:.6f}')
+            lines.append(f'agent_span_seconds_sum{{span="{name}"}} {stats["mean"] * stats["count"]:.6f}')
+            lines.append(f'agent_span_seconds_count{{span="{name}"}} {stats["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def write_metrics_file(self, path: str):
+        """Write the summary as JSON, or Prometheus text if the path ends in .prom"""
+        with open(path, 'w', encoding='utf-8') as f:
+            if path.endswith('.prom'):
+                f.write(self.prometheus_text())
+            else:
+                json.dump({'generated_at': time.time(), 'spans': self.summary()}, f, indent=2)
+
+    def serve_prometheus(self, port: int, host: str = '127.0.0.1'):
+        """Serve /metrics on a background thread, returns the HTTP server"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        tracer = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') != '/metrics':
+                    self.send_error(404)
+                    return
+                body = tracer.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+        return server
+
+
+# Shared tracer used by all modules
+tracer = Tracer()
+
+
+def format_summary(summary: Optional[Dict] = None) -> str:
+    """Human-readable latency table (milliseconds)"""
+    summary = tracer.summary() if summary is None else summary
+    lines = [f"{'span':<24}{'count':>7}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}"]
+    for name, s in summary.items():
+        lines.append(f"{name:<24}{s['count']:>7}{s['mean'] * 1000:>10.1f}{s['p50'] * 1000:>10.1f}"
+                     f"{s['p95'] * 1000:>10.1f}{s['p99'] * 1000:>10.1f}")
+    return '\n'.join(lines)
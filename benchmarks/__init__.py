@@ -0,0 +1 @@
+# Benchmarks module (run with: python -m benchmarks.<name>)
@@ -0,0 +1,75 @@
+"""
+Async Load Test
+Measures questions/sec through AsyncDatabaseAgent with a stubbed LLM and a local
+PostgreSQL (the docker-compose test database, configured through POSTGRES_*).
+
+Usage: python -m benchmarks.bench_async_load [--questions 200] [--llm-latency 0.3]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import time
+
+# Measure the pipeline, not the caches
+os.environ.setdefault('QUERY_CACHE_ENABLED', 'false')
+os.environ.setdefault('USAGE_LOG_PATH', os.devnull)
+
+from app.ai.replay import StubSQLGenerator
+from app.core.agent import DatabaseAgent
+from app.core.async_agent import AsyncDatabaseAgent
+
+WORKLOAD = [
+    ("How many customers do we have?",
+     "SELECT COUNT(*) AS customer_count FROM res_partner WHERE active = TRUE"),
+    ("What is the total sales amount?",
+     "SELECT SUM(amount_total) AS total_sales FROM sale_order WHERE state NOT IN ('draft', 'cancel')"),
+    ("Top 10 customers by revenue",
+     "SELECT p.name, SUM(o.amount_total) AS revenue FROM sale_order o "
+     "JOIN res_partner p ON p.id = o.partner_id GROUP BY p.name ORDER BY revenue DESC LIMIT 10"),
+    ("Which products sell the most?",
+     "SELECT product_id, SUM(product_uom_qty) AS qty FROM sale_order_line "
+     "GROUP BY product_id ORDER BY qty DESC LIMIT 10"),
+]
+
+
+async def run(agent: AsyncDatabaseAgent, questions):
+    start = time.perf_counter()
+    results = await agent.query_many(questions)
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the async agent pipeline')
+    parser.add_argument('--questions', type=int, default=200)
+    parser.add_argument('--llm-latency', type=float, default=0.3, help='Stub LLM delay in seconds')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    args = parser.parse_args()
+
+    questions = [WORKLOAD[i % len(WORKLOAD)][0] for i in range(args.questions)]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        agent = DatabaseAgent(ai=StubSQLGenerator(args.llm_latency, dict(WORKLOAD)))
+
+    for concurrency in args.concurrency:
+        async_agent = AsyncDatabaseAgent(agent, max_concurrency=concurrency)
+        with contextlib.redirect_stdout(io.StringIO()):
+            results, elapsed = asyncio.run(run(async_agent, questions))
+
+        errors = [r for r in results if r['error']]
+        latencies = [sum(r['timings'].values()) for r in results if not r['error']]
+        print(f"concurrency={concurrency:<4} {len(questions) / elapsed:8.1f} questions/s  "
+              f"p50={statistics.median(latencies) * 1000 if latencies else 0:7.1f} ms  "
+              f"errors={len(errors)}")
+        if errors:
+            print(f"  first error: {errors[0]['error']}")
+
+    print(f"\nPool: {agent.db.get_pool_stats()}")
+    agent.db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+CLI Startup Benchmark
+Runs `python -X importtime <entry> --help` for each entry point and checks that
+startup stays under an import-time budget and never loads the heavy dependencies
+(database driver, SSH, LLM SDK, table renderer), which only the code paths that
+use them should import. Exits with status 1 on a regression.
+
+Usage: python -m benchmarks.bench_cli_startup [--entry agent.py odoo_agent.py]
+       [--budget-ms 100] [--runs 5] [--top 8]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+# Top-level packages that must not be imported just to parse arguments
+HEAVY_MODULES = ('google', 'psycopg2', 'paramiko', 'tabulate', 'dotenv', 'cryptography', 'http.server')
+
+
+def parse_importtime(stderr):
+    """{module: (self_us, cumulative_us)} from -X importtime output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def run_once(entry, args):
+    """(total import seconds, wall seconds, modules) for one startup"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', entry] + args, cwd=ROOT,
+                            capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"{entry} {' '.join(args)} exited with {result.returncode}:\n{result.stderr[-2000:]}")
+    modules = parse_importtime(result.stderr)
+    return sum(s for s, _ in modules.values()) / 1e6, wall, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check CLI startup import time against a budget')
+    parser.add_argument('--entry', nargs='+', default=['agent.py', 'odoo_agent.py'])
+    parser.add_argument('--budget-ms', type=float, default=100.0, help='Median import time allowed per entry point')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=8, help='Slowest modules to list (by cumulative time)')
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'entry':<16}{'imports':>10}{'wall':>10}{'budget':>10}")
+    for entry in args.entry:
+        samples = [run_once(entry, ['--help']) for _ in range(args.runs)]
+        imports = statistics.median(s[0] for s in samples)
+        wall = statistics.median(s[1] for s in samples)
+        over = imports * 1000 > args.budget_ms
+        print(f"{entry:<16}{imports * 1000:>8.1f}ms{wall * 1000:>8.1f}ms{args.budget_ms:>8.0f}ms"
+              f"{'  OVER BUDGET' if over else ''}")
+
+        modules = samples[-1][2]
+        heavy = sorted(name for name in modules
+                       if any(name == m or name.startswith(m + '.') for m in HEAVY_MODULES))
+        if heavy:
+            print(f"  [!] Heavy modules imported: {', '.join(heavy)}")
+        for name, (_, cumulative) in sorted(modules.items(), key=lambda m: -m[1][1])[:args.top]:
+            print(f"  {cumulative / 1000:>8.1f}ms  {name}")
+        failed = failed or over or bool(heavy)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Cold Start Benchmark
+Starts an entry point in interactive mode as a fresh process, "types" for --think-time
+seconds and asks one question, then reports how long the answer took after the
+question was submitted and from process start, with and without background warm-up.
+
+The LLM is the replay backend (with LLM_LATENCY as the simulated model delay) so
+only the database side needs to be reachable: the local test database for agent.py,
+the Odoo.sh SSH tunnel for odoo_agent.py. The schema snapshot is disabled so every
+run discovers the schema.
+
+Usage: python -m benchmarks.bench_cold_start [--entry agent.py odoo_agent.py] [--runs 3]
+       [--think-time 2.0] [--llm-latency 0.5]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+QUESTION = "How many customers do we have?"
+# Lines printed once the answer (or an error) is on screen
+DONE_MARKERS = ('Retrieved', 'Error')
+
+
+def run_once(entry, warmup, think_time, llm_latency):
+    """(seconds from submitting the question, seconds from process start) to the answer"""
+    env = dict(os.environ, SQL_GENERATOR='replay', LLM_LATENCY=str(llm_latency),
+               SCHEMA_CACHE_ENABLED='false', QUERY_CACHE_ENABLED='false',
+               USAGE_LOG_PATH=os.devnull, PYTHONUNBUFFERED='1', PYTHONIOENCODING='utf-8')
+    command = [sys.executable, entry, '--interactive'] + ([] if warmup else ['--no-warmup'])
+
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT, text=True, encoding='utf-8')
+    asked, answered = threading.Event(), threading.Event()
+    output = []
+
+    def read():
+        for line in process.stdout:
+            output.append(line)
+            if any(marker in line for marker in DONE_MARKERS) and asked.is_set():
+                answered.set()
+
+    reader = threading.Thread(target=read, daemon=True)
+    reader.start()
+
+    time.sleep(think_time)
+    asked.set()
+    asked_at = time.perf_counter()
+    process.stdin.write(QUESTION + "\n")
+    process.stdin.flush()
+    finished = answered.wait(120)
+    answered_at = time.perf_counter()
+
+    process.stdin.write("exit\n")
+    process.stdin.flush()
+    process.wait(30)
+    if not finished:
+        raise RuntimeError(f"No answer from {entry}:\n{''.join(output[-20:])}")
+    return answered_at - asked_at, answered_at - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure first-question latency of a cold process')
+    parser.add_argument('--entry', nargs='+', default=['agent.py'], help='Entry points (agent.py, odoo_agent.py)')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--think-time', type=float, default=2.0, help='Seconds before the question is typed')
+    parser.add_argument('--llm-latency', type=float, default=0.5, help='Simulated model delay in seconds')
+    args = parser.parse_args()
+
+    print(f"Think time: {args.think_time:.1f}s, simulated LLM latency: {args.llm_latency * 1000:.0f} ms, "
+          f"runs: {args.runs}")
+    print(f"{'entry':<16}{'warm-up':<10}{'after question':>16}{'from start':>12}")
+    for entry in args.entry:
+        for warmup in (False, True):
+            samples = [run_once(entry, warmup, args.think_time, args.llm_latency) for _ in range(args.runs)]
+            after_question = statistics.median(s[0] for s in samples)
+            from_start = statistics.median(s[1] for s in samples)
+            print(f"{entry:<16}{'on' if warmup else 'off':<10}{after_question:>15.2f}s{from_start:>11.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Currency Formatter Benchmark
+Compares column-wise formatting with precompiled, memoized classification against
+the previous per-cell classification on a large result set.
+
+Usage: python -m benchmarks.bench_currency_formatter [--rows 100000]
+"""
+
+import argparse
+import time
+from decimal import Decimal
+
+from app.formatters.currency import CurrencyFormatter
+
+COLUMNS = ['id', 'name', 'date_order', 'state', 'amount_total', 'amount_tax',
+           'product_uom_qty', 'price_unit', 'total_sales', 'partner_id']
+
+
+def legacy_is_currency_column(col_name):
+    col_lower = col_name.lower()
+    if any(exclude in col_lower for exclude in CurrencyFormatter.EXCLUDE_KEYWORDS):
+        return False
+    if any(keyword in col_lower for keyword in CurrencyFormatter.CURRENCY_KEYWORDS):
+        return True
+    if 'total' in col_lower:
+        if any(i in col_lower for i in ['amount', 'price', 'cost', 'revenue', 'sales', 'revenue', 'income']):
+            return True
+    if 'sum' in col_lower:
+        if any(i in col_lower for i in ['amount', 'price', 'cost', 'revenue']):
+            return True
+    return False
+
+
+def legacy_format_results(results):
+    """The previous implementation: classify every cell of every row"""
+    formatted_results = []
+    for row in results:
+        formatted_row = row.copy() if isinstance(row, dict) else dict(row)
+        for key, value in formatted_row.items():
+            if legacy_is_currency_column(key) and value is not None:
+                formatted_row[key] = CurrencyFormatter.format_currency_value(value)
+        formatted_results.append(formatted_row)
+    return formatted_results
+
+
+def build_rows(count):
+    return [
+        {
+            'id': i,
+            'name': f'SO{i:06d}',
+            'date_order': '2024-01-01',
+            'state': 'sale',
+            'amount_total': Decimal(i % 5000) / 4,
+            'amount_tax': None if i % 3 else Decimal(i % 700) / 8,
+            'product_uom_qty': i % 17,
+            'price_unit': float(i % 300) * 1.5,
+            'total_sales': i * 3,
+            'partner_id': i % 900,
+        }
+        for i in range(count)
+    ]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark currency formatting')
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    rows = build_rows(args.rows)
+
+    legacy, legacy_time = timed(legacy_format_results, rows)
+    current, current_time = timed(CurrencyFormatter.format_results, rows)
+
+    print(f"Rows: {args.rows}, columns: {len(COLUMNS)}")
+    print(f"Outputs identical: {legacy == current}")
+    print(f"Per-cell classification: {legacy_time * 1000:8.1f} ms")
+    print(f"Column-wise:             {current_time * 1000:8.1f} ms")
+    print(f"Speedup:                 {legacy_time / current_time:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
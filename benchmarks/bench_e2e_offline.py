@@ -0,0 +1,80 @@
+"""
+End-to-End Offline Benchmark
+Runs DatabaseAgent.query over the recorded TEST-GUIDE questions with the replay LLM
+backend (no network or API key), against the local test database configured through
+POSTGRES_* (docker-compose). A simulated model latency can be added so the numbers
+reflect real round trips; the per-stage breakdown comes from the tracer.
+
+Record a fixture from the live model with SQL_GENERATOR=record, then replay it here.
+
+Usage: python -m benchmarks.bench_e2e_offline [--rounds 5] [--llm-latency 0.0] [--cache]
+       [--fixture benchmarks/fixtures/test_guide_sql.jsonl]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+
+# Do not write benchmark calls into the real usage log
+os.environ.setdefault('USAGE_LOG_PATH', os.devnull)
+
+from app.ai.replay import ReplaySQLGenerator
+from app.core.agent import DatabaseAgent
+from app.tracing.tracer import tracer, format_summary
+
+FIXTURE = Path(__file__).resolve().parent / 'fixtures' / 'test_guide_sql.jsonl'
+
+
+def load_questions(path):
+    """Questions in fixture order"""
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line)['question'] for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark DatabaseAgent.query without a live LLM')
+    parser.add_argument('--fixture', default=str(FIXTURE))
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='Simulated model delay in seconds')
+    parser.add_argument('--cache', action='store_true', help='Keep the query cache enabled')
+    args = parser.parse_args()
+
+    if not args.cache:
+        os.environ['QUERY_CACHE_ENABLED'] = 'false'
+
+    ai = ReplaySQLGenerator(args.fixture, latency=args.llm_latency)
+    with contextlib.redirect_stdout(io.StringIO()):
+        agent = DatabaseAgent(ai=ai)
+        agent.ensure_schema()
+    questions = load_questions(args.fixture)
+
+    tracer.reset()
+    latencies, errors = [], 0
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        for question in questions:
+            question_start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                results, sql = agent.query(question)
+            latencies.append(time.perf_counter() - question_start)
+            errors += sql is None
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"Questions: {len(questions)} x {args.rounds} rounds, simulated LLM latency: {args.llm_latency * 1000:.0f} ms, "
+          f"cache: {'on' if args.cache else 'off'}")
+    print(f"Throughput: {len(latencies) / elapsed:.1f} questions/s, errors: {errors}")
+    print(f"Latency: p50 {statistics.median(latencies) * 1000:.1f} ms, "
+          f"p95 {latencies[int(0.95 * (len(latencies) - 1))] * 1000:.1f} ms")
+    print()
+    print(format_summary())
+    agent.db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Bulk Export Benchmark
+Compares export throughput of COPY-to-CSV and record-batch Parquet/Arrow writing
+with the display path (fetch all rows, format currency, render with tabulate) on
+the docker init-db dataset, scaled up by repeating the order lines --scale times.
+
+Requires the docker-compose test database (POSTGRES_* variables); Parquet and
+Arrow need pyarrow and are skipped without it.
+
+Usage: python -m benchmarks.bench_export [--scale 200] [--out-dir /tmp/agent-export]
+"""
+
+import argparse
+import importlib.util
+import os
+import time
+import tracemalloc
+from pathlib import Path
+
+from app.database.connection import DatabaseConnection
+from app.database.export import export_query
+from app.formatters.currency import CurrencyFormatter
+
+# Order lines with their order, repeated ``scale`` times
+QUERY = """
+SELECT sol.id, sol.order_id, so.name AS order_name, so.date_order, so.state,
+       sol.name, sol.product_uom_qty, sol.price_unit, sol.price_subtotal, s.copy
+FROM sale_order_line sol
+JOIN sale_order so ON so.id = sol.order_id
+CROSS JOIN generate_series(1, {scale}) AS s(copy)
+"""
+
+
+def display_path(db, sql, path):
+    """The terminal path, written to a file: fetch everything, format, tabulate"""
+    from tabulate import tabulate
+
+    results = db.execute_query(sql, timeout=600)
+    formatted = CurrencyFormatter.format_results(results)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(tabulate(formatted.column_dict(), headers='keys', tablefmt='grid'))
+    return len(results)
+
+
+def measure(fn):
+    """(rows, seconds, peak Python memory in bytes)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark bulk export against the display path')
+    parser.add_argument('--scale', type=int, default=200, help='Copies of the order lines')
+    parser.add_argument('--out-dir', default='/tmp/agent-export')
+    parser.add_argument('--skip-display', action='store_true', help='Only run the export formats')
+    args = parser.parse_args()
+
+    db = DatabaseConnection()
+    sql = QUERY.format(scale=int(args.scale))
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    formats = ['csv', 'parquet', 'arrow']
+    if importlib.util.find_spec('pyarrow') is None:
+        print("[Warning] pyarrow is not installed, only CSV is exported")
+        formats = ['csv']
+
+    runs = [] if args.skip_display else [('display', out_dir / 'display.txt',
+                                          lambda path: display_path(db, sql, path))]
+    runs += [(fmt, out_dir / f'export.{fmt}', lambda path: export_query(db, sql, str(path))) for fmt in formats]
+
+    print(f"Scale: {args.scale}x order lines")
+    print(f"{'path':<10}{'rows':>10}{'time':>10}{'rows/s':>12}{'file':>10}{'peak mem':>10}")
+    for name, path, run in runs:
+        rows, elapsed, peak = measure(lambda: run(path))
+        size = os.path.getsize(path)
+        print(f"{name:<10}{rows:>10}{elapsed:>9.2f}s{rows / elapsed:>12,.0f}{size / 1024 / 1024:>8.1f}MB"
+              f"{peak / 1024 / 1024:>8.1f}MB")
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Replica Routing and Fan-out Benchmark
+Fan-out: one query on N databases, run one after another vs in parallel through
+FanOutConnection. Routing: concurrent queries through ConnectionRouter over
+replicas with different latencies, one of them lagging and one down, showing
+where the queries went and the resulting latency.
+
+Offline the nodes are simulated (a sleep per query). With --database the fan-out
+runs on the docker-compose test database (POSTGRES_*), listed --nodes times.
+
+Usage: python -m benchmarks.bench_fanout [--nodes 8] [--latency 0.05] [--queries 200] [--database]
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.database.result_set import ResultSet
+from app.database.router import ConnectionRouter, FanOutConnection
+
+QUERY = """
+SELECT so.state, COUNT(*) AS orders, SUM(so.amount_total) AS amount_total
+FROM sale_order so GROUP BY so.state
+"""
+
+
+class SimulatedNode:
+    """Answers every query after ``latency`` seconds, like a database at that distance"""
+
+    def __init__(self, host, database='odoo', latency=0.05, lag=0.0, down=False, max_connections=5):
+        self.config = {'host': host, 'port': 5432, 'database': database}
+        self.latency = latency
+        self.lag = lag
+        self.down = down
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._max_connections = max_connections
+        self._in_use = 0
+
+    def execute_query(self, sql, params=None, timeout=30):
+        if self.down:
+            raise ConnectionError(f"Failed to connect to database: {self.config['host']} is down")
+        with self._slots:
+            self._in_use += 1
+            try:
+                time.sleep(self.latency)
+            finally:
+                self._in_use -= 1
+        if 'pg_is_in_recovery' in sql:
+            return ResultSet.from_tuples(['is_replica', 'lag_seconds'], [(True, self.lag)])
+        return ResultSet.from_tuples(['state', 'orders'], [('sale', 10), ('draft', 3)])
+
+    def get_pool_stats(self):
+        return {'in_use': self._in_use}
+
+    def identity(self):
+        return f"{self.config['host']}/{self.config['database']}"
+
+    def max_connections(self):
+        return self._max_connections
+
+    def fill_pool(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def bench_fanout(nodes, repeat=5):
+    fanout = FanOutConnection(nodes)
+    sequential, parallel = [], []
+    for _ in range(repeat):
+        _, seconds = timed(lambda: [node.execute_query(QUERY) for node in nodes])
+        sequential.append(seconds)
+        with contextlib.redirect_stdout(io.StringIO()):
+            merged, seconds = timed(lambda: fanout.execute_query(QUERY))
+        parallel.append(seconds)
+    print(f"Fan-out over {len(nodes)} databases ({len(merged)} merged rows, median of {repeat}):")
+    print(f"  sequential {statistics.median(sequential) * 1000:8.1f} ms")
+    print(f"  parallel   {statistics.median(parallel) * 1000:8.1f} ms")
+    print("  per node: " + ", ".join(f"{t['database']} {t['seconds'] * 1000:.0f} ms" for t in fanout.last_timings))
+    fanout.close()
+
+
+def bench_routing(latency, queries, concurrency):
+    replicas = [
+        SimulatedNode('replica-a', latency=latency),
+        SimulatedNode('replica-b', latency=latency * 2),
+        SimulatedNode('replica-lagging', latency=latency / 2, lag=120),
+        SimulatedNode('replica-down', down=True),
+    ]
+    primary = SimulatedNode('primary', latency=latency)
+    router = ConnectionRouter(primary, replicas, max_lag=30, check_interval=60)
+
+    def one(_):
+        return timed(lambda: router.execute_query(QUERY))[1]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        router.check_health()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = sorted(pool.map(one, range(queries)))
+
+    print(f"\nRouting {queries} queries, {concurrency} at a time (replica latency {latency * 1000:.0f}-"
+          f"{latency * 2000:.0f} ms):")
+    print(f"  p50 {statistics.median(latencies) * 1000:.1f} ms, p95 {latencies[int(0.95 * (len(latencies) - 1))] * 1000:.1f} ms")
+    for node in router.status():
+        state = 'up' if node['healthy'] else 'down'
+        print(f"  {node['node']:<22}{node['role']:<9}{state:<6}lag {node['lag']:>5.0f}s {node['queries']:>6} queries")
+    router.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark replica routing and multi-database fan-out')
+    parser.add_argument('--nodes', type=int, default=8, help='Databases to fan out to')
+    parser.add_argument('--latency', type=float, default=0.05, help='Simulated per-query latency in seconds')
+    parser.add_argument('--queries', type=int, default=200, help='Queries for the routing run')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--database', action='store_true', help='Fan out on the test database instead (needs a database)')
+    args = parser.parse_args()
+
+    if args.database:
+        from app.database.connection import DatabaseConnection
+
+        # The same database N times, each with its own pool
+        bench_fanout([DatabaseConnection() for _ in range(args.nodes)])
+    else:
+        bench_fanout([SimulatedNode('db', f'company_{i}', latency=args.latency * (1 + i % 3))
+                      for i in range(args.nodes)])
+        bench_routing(args.latency, args.queries, args.concurrency)
+
+
+if __name__ == '__main__':
+    main()
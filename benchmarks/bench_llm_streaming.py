@@ -0,0 +1,124 @@
+"""
+LLM Streaming Benchmark
+Compares streamed generation (SQL taken as soon as the statement is complete, the
+rest of the response abandoned) with waiting for the full response.
+
+Offline, a stub model replays the TEST-GUIDE SQL wrapped in a code fence and
+followed by an explanation, at a fixed time-to-first-token and token rate. With
+--database every question also runs through DatabaseAgent.query and the
+time-to-first-row is reported; --live uses Gemini instead of the stub.
+
+Usage: python -m benchmarks.bench_llm_streaming [--ttft 0.4] [--tokens-per-second 80]
+       [--rounds 3] [--database] [--live]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+
+os.environ.setdefault('USAGE_LOG_PATH', os.devnull)
+os.environ.setdefault('QUERY_CACHE_ENABLED', 'false')
+
+from app.ai.replay import ReplaySQLGenerator
+from app.tracing.tracer import tracer
+
+FIXTURE = Path(__file__).resolve().parent / 'fixtures' / 'test_guide_sql.jsonl'
+
+# What models tend to add after the query despite being asked not to
+EXPLANATION = (
+    "This query counts the matching records. It filters on the relevant state and active "
+    "flags so that cancelled and archived records are excluded, joins the related tables "
+    "on their foreign keys, and orders the result so the most relevant rows come first. "
+    "You can adjust the date range or the LIMIT clause to widen or narrow the result."
+)
+
+
+def load_fixture(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def make_generator(args, streaming):
+    if args.live:
+        from app.ai.gemini_service import GeminiSQLGenerator
+        generator = GeminiSQLGenerator()
+    else:
+        generator = ReplaySQLGenerator(args.fixture, latency=args.ttft,
+                                       tokens_per_second=args.tokens_per_second, trailing_text=EXPLANATION)
+    generator.streaming = streaming
+    return generator
+
+
+def time_generation(generator, entries, rounds):
+    """Seconds per generate_sql call, and the extracted SQL per question"""
+    durations, answers = [], {}
+    for _ in range(rounds):
+        for entry in entries:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                sql, _ = generator.generate_sql(entry['question'])
+            durations.append(time.perf_counter() - start)
+            answers[entry['question']] = sql
+    return durations, answers
+
+
+def time_first_row(generator, entries, rounds):
+    """question.first_row samples through DatabaseAgent.query"""
+    from app.core.agent import DatabaseAgent
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        agent = DatabaseAgent(ai=generator)
+        agent.ensure_schema()
+    tracer.reset()
+    for _ in range(rounds):
+        for entry in entries:
+            with contextlib.redirect_stdout(io.StringIO()):
+                agent.query(entry['question'])
+    agent.db.close()
+    return tracer.summary().get('question.first_row')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare streamed and full-response SQL generation')
+    parser.add_argument('--fixture', default=str(FIXTURE))
+    parser.add_argument('--ttft', type=float, default=0.4, help='Stub time to first token in seconds')
+    parser.add_argument('--tokens-per-second', type=float, default=80)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--database', action='store_true', help='Also measure time-to-first-row (needs a database)')
+    parser.add_argument('--live', action='store_true', help='Use Gemini instead of the stub (needs an API key)')
+    args = parser.parse_args()
+
+    entries = load_fixture(args.fixture)
+    model = 'Gemini' if args.live else f"stub (ttft {args.ttft * 1000:.0f} ms, {args.tokens_per_second:.0f} tokens/s)"
+    print(f"Questions: {len(entries)} x {args.rounds} rounds, model: {model}")
+    print(f"{'mode':<10}{'mean':>10}{'p50':>10}{'p95':>10}   (time until the SQL is extracted)")
+
+    results = {}
+    for mode, streaming in (('full', False), ('streaming', True)):
+        durations, answers = time_generation(make_generator(args, streaming), entries, args.rounds)
+        results[mode] = (durations, answers)
+        durations = sorted(durations)
+        print(f"{mode:<10}{statistics.mean(durations) * 1000:>8.0f}ms{statistics.median(durations) * 1000:>8.0f}ms"
+              f"{durations[int(0.95 * (len(durations) - 1))] * 1000:>8.0f}ms")
+
+    full, streamed = (statistics.mean(results[m][0]) for m in ('full', 'streaming'))
+    print(f"Saved per question: {(full - streamed) * 1000:.0f} ms ({1 - streamed / full:.0%})")
+    if not args.live:
+        mismatches = [q for q, sql in results['full'][1].items() if results['streaming'][1][q] != sql]
+        print(f"SQL identical in both modes: {len(entries) - len(mismatches)}/{len(entries)}")
+
+    if args.database:
+        print(f"\n{'mode':<10}{'p50':>10}{'p95':>10}   (time to first row)")
+        for mode, streaming in (('full', False), ('streaming', True)):
+            summary = time_first_row(make_generator(args, streaming), entries, args.rounds)
+            if summary:
+                print(f"{mode:<10}{summary['p50'] * 1000:>8.0f}ms{summary['p95'] * 1000:>8.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
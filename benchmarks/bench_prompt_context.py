@@ -0,0 +1,206 @@
+"""
+Prompt Context Benchmark
+Compares the token-budgeted SchemaContextBuilder with the previous one-column-per-line
+context over the recorded TEST-GUIDE questions, on the test database schema with
+Odoo-width tables (100+ columns on the main models).
+
+Offline it reports estimated context tokens and schema recall: the share of the
+tables/columns used by each question's verification SQL that are present in the
+context (a column the model never sees cannot be queried correctly). With --live
+both contexts are sent to Gemini and each generated query's result is compared
+with the verification SQL's result on the configured database.
+
+Usage: python -m benchmarks.bench_prompt_context [--budget 1500] [--live]
+"""
+
+import argparse
+import re
+import statistics
+from pathlib import Path
+
+from app.ai.context_builder import SchemaContextBuilder, estimate_tokens
+from app.database.schema import SchemaDiscovery
+from app.database.search_index import SchemaSearchIndex
+from app.security.sql_tokenizer import tokenize
+
+ROOT = Path(__file__).resolve().parent.parent
+
+TYPE_NAMES = {
+    'SERIAL': 'integer', 'INTEGER': 'integer', 'VARCHAR': 'character varying', 'DECIMAL': 'numeric',
+    'NUMERIC': 'numeric', 'BOOLEAN': 'boolean', 'TIMESTAMP': 'timestamp without time zone',
+    'DATE': 'date', 'TEXT': 'text', 'FLOAT': 'double precision',
+}
+
+# Columns real Odoo models carry besides their business fields
+ODOO_COLUMNS = [
+    ('create_uid', 'integer'), ('write_uid', 'integer'), ('write_date', 'timestamp without time zone'),
+    ('message_main_attachment_id', 'integer'), ('message_follower_ids', 'integer'),
+    ('message_is_follower', 'boolean'), ('message_needaction', 'boolean'), ('message_has_error', 'boolean'),
+    ('activity_state', 'character varying'), ('activity_date_deadline', 'date'),
+    ('activity_user_id', 'integer'), ('activity_type_id', 'integer'), ('access_token', 'character varying'),
+    ('access_url', 'character varying'), ('website_id', 'integer'), ('company_id', 'integer'),
+    ('currency_id', 'integer'), ('team_id', 'integer'), ('note', 'text'), ('origin', 'character varying'),
+    ('reference', 'character varying'),
+    ('fiscal_position_id', 'integer'), ('payment_term_id', 'integer'), ('pricelist_id', 'integer'),
+    ('analytic_account_id', 'integer'), ('campaign_id', 'integer'), ('source_id', 'integer'),
+    ('medium_id', 'integer'), ('signature', 'text'),
+    ('signed_on', 'timestamp without time zone'), ('validity_date', 'date'), ('commitment_date', 'date'),
+    ('require_signature', 'boolean'), ('require_payment', 'boolean'), ('invoice_status', 'character varying'),
+    ('amount_untaxed', 'numeric'), ('amount_tax', 'numeric'), ('currency_rate', 'numeric'),
+    ('color', 'integer'), ('sequence', 'integer'), ('display_name', 'character varying'),
+    ('ref', 'character varying'), ('lang', 'character varying'), ('tz', 'character varying'),
+    ('vat', 'character varying'), ('website', 'character varying'), ('comment', 'text'),
+    ('street', 'character varying'), ('street2', 'character varying'), ('zip', 'character varying'),
+    ('state_id', 'integer'), ('country_id', 'integer'), ('mobile', 'character varying'),
+    ('is_company', 'boolean'), ('industry_id', 'integer'), ('credit_limit', 'double precision'),
+    ('commercial_partner_id', 'integer'), ('supplier_rank', 'integer'), ('barcode', 'character varying'),
+]
+
+
+def load_schema(path: Path, widen_to: int):
+    """Tables from the test database DDL, widened with Odoo-style columns"""
+    schema = {}
+    ddl = path.read_text(encoding='utf-8')
+    for table, body in re.findall(r'CREATE TABLE IF NOT EXISTS (\w+) \((.*?)\n\);', ddl, re.S):
+        columns, foreign_keys = [], []
+        for line in body.strip().splitlines():
+            match = re.match(r'\s*(\w+)\s+([A-Z]+)', line)
+            if not match or match.group(1).upper() in ('PRIMARY', 'UNIQUE', 'FOREIGN', 'CONSTRAINT'):
+                continue
+            name, sql_type = match.groups()
+            columns.append({'name': name, 'type': TYPE_NAMES.get(sql_type, sql_type.lower()), 'nullable': True})
+            reference = re.search(r'REFERENCES (\w+)\((\w+)\)', line)
+            if reference:
+                foreign_keys.append({'columns': [name], 'table': reference.group(1),
+                                     'ref_columns': [reference.group(2)]})
+
+        existing = {c['name'] for c in columns}
+        fillers = [c for c in ODOO_COLUMNS if c[0] not in existing]
+        i = 0
+        while len(columns) < widen_to and fillers:
+            name, col_type = fillers[i % len(fillers)]
+            if i >= len(fillers):
+                name = f"x_studio_{name}_{i // len(fillers)}"
+            columns.append({'name': name, 'type': col_type, 'nullable': True})
+            i += 1
+
+        schema[table] = {'table_name': table, 'schema': 'public', 'columns': columns,
+                         'foreign_keys': foreign_keys}
+    return schema
+
+
+def load_questions(path: Path):
+    """(question, verification SQL) pairs from TEST-GUIDE.txt"""
+    text = path.read_text(encoding='utf-8')
+    pattern = r'Question:\s*"(.+?)"\s*Verification SQL:\s*(.+?;)'
+    return re.findall(pattern, text, re.S)
+
+
+def legacy_context(schema, tables):
+    """The previous get_relevant_schema output"""
+    schema_text = ""
+    for table_name in tables:
+        schema_text += f"\nTable: {table_name}\n"
+        schema_text += "Columns:\n"
+        for col in schema[table_name]['columns']:
+            schema_text += f"  - {col['name']} ({col['type']})\n"
+    return schema_text
+
+
+def referenced(schema, sql):
+    """Tables and (table, column) pairs the verification SQL uses"""
+    words = {t.value.lower() for t in tokenize(sql) if t.kind == 'word'}
+    tables = {t for t in schema if t in words}
+    columns = {(t, c['name']) for t in tables for c in schema[t]['columns'] if c['name'] in words}
+    return tables, columns
+
+
+def recall(context, tables, columns, legacy):
+    """Share of required tables/columns visible in the context"""
+    if legacy:
+        present = set(re.findall(r'^Table: (\w+)$', context, re.M))
+        visible = {(t, c) for t, c in columns if t in present}
+    else:
+        lines = {line.split('(', 1)[0]: line for line in context.splitlines()[1:] if not line.startswith('Joins:')}
+        present = set(lines)
+        visible = {(t, c) for t, c in columns
+                   if t in lines and re.search(rf'[(,] ?{c}\*? ', lines[t])}
+    needed = len(tables) + len(columns)
+    found = len(tables & present) + len(visible)
+    return found / needed if needed else 1.0
+
+
+def run_live(questions, contexts):
+    """Generate SQL with each context and compare results with the verification SQL"""
+    from app.ai.gemini_service import GeminiSQLGenerator
+    from app.database.connection import DatabaseConnection
+    from app.security.validator import QueryValidator
+
+    ai = GeminiSQLGenerator()
+    db = DatabaseConnection()
+
+    def rows(sql):
+        return sorted(tuple(str(v) for v in row.values()) for row in db.execute_query(sql))
+
+    correct = {name: 0 for name in contexts}
+    for i, (question, reference_sql) in enumerate(questions):
+        expected = rows(reference_sql)
+        for name, context_list in contexts.items():
+            try:
+                sql, _ = ai.generate_sql(question, context_list[i])
+                QueryValidator.validate_query(sql)
+                correct[name] += rows(sql) == expected
+            except Exception as e:
+                print(f"  [{name}] {question}: {e}")
+    db.close()
+    return correct
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare prompt schema contexts')
+    parser.add_argument('--budget', type=int, default=1500)
+    parser.add_argument('--width', type=int, default=120, help='Columns per table after widening')
+    parser.add_argument('--live', action='store_true', help='Also generate and run SQL (needs API key and database)')
+    args = parser.parse_args()
+
+    schema = load_schema(ROOT / 'init-db' / '01-init.sql', args.width)
+    questions = load_questions(ROOT / 'TEST-GUIDE.txt')
+    index = SchemaSearchIndex.from_schema(schema)
+    builder = SchemaContextBuilder(token_budget=args.budget)
+    discovery = SchemaDiscovery(db_connection=None)
+    discovery.schema_cache = schema
+
+    contexts = {'legacy': [], 'budgeted': []}
+    stats = {'legacy': ([], []), 'budgeted': ([], [])}
+    for question, reference_sql in questions:
+        # Previous relevance (keyword matches only) vs. matches plus bridging tables and join hints
+        keywords = set(re.findall(r'\b\w+\b', question.lower()))
+        legacy_tables = index.top_tables(keywords, 10)
+        tables = discovery.get_relevant_tables(question)
+        budgeted = builder.build(question, schema, tables, join_hints=discovery.get_join_hints(tables))
+        needed_tables, needed_columns = referenced(schema, reference_sql)
+
+        for name, context in (('legacy', legacy_context(schema, legacy_tables)), ('budgeted', budgeted)):
+            contexts[name].append(context)
+            stats[name][0].append(estimate_tokens(context))
+            stats[name][1].append(recall(context, needed_tables, needed_columns, name == 'legacy'))
+
+    print(f"Questions: {len(questions)}, tables: {len(schema)}, columns per table: {args.width}, "
+          f"budget: {args.budget} tokens")
+    print(f"{'context':<10}{'mean tokens':>13}{'max tokens':>12}{'recall':>9}{'full recall':>13}")
+    for name, (tokens, recalls) in stats.items():
+        full = sum(1 for r in recalls if r == 1.0)
+        print(f"{name:<10}{statistics.mean(tokens):>13.0f}{max(tokens):>12}"
+              f"{statistics.mean(recalls):>9.1%}{full:>8}/{len(recalls)}")
+
+    legacy_tokens, budgeted_tokens = statistics.mean(stats['legacy'][0]), statistics.mean(stats['budgeted'][0])
+    print(f"Context tokens saved: {1 - budgeted_tokens / legacy_tokens:.0%}")
+
+    if args.live:
+        correct = run_live(questions, contexts)
+        for name, count in correct.items():
+            print(f"Live correct results ({name}): {count}/{len(questions)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+Result Set Benchmark
+Compares the columnar ResultSet with the previous list-of-dicts rows: memory held
+by the result, peak memory and time while building it, and currency formatting.
+
+Offline, rows shaped like sale orders are produced by an in-memory cursor (fresh
+tuples per fetch, like a driver). With --database the same comparison runs on a
+generate_series query through a RealDictCursor and DatabaseConnection.execute_query.
+numpy is used for numeric columns when installed (array.array otherwise).
+
+Usage: python -m benchmarks.bench_result_set [--rows 100000] [--database]
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from app.database.result_set import ResultSet, _np
+from app.formatters.currency import CurrencyFormatter
+
+COLUMNS = ['id', 'name', 'date_order', 'state', 'amount_total', 'amount_tax',
+           'product_uom_qty', 'price_unit', 'total_sales', 'partner_id']
+
+QUERY = """
+SELECT g AS id,
+       'SO' || lpad(g::text, 6, '0') AS name,
+       now() - (g || ' minutes')::interval AS date_order,
+       'sale' AS state,
+       (g % 5000) / 4.0 AS amount_total,
+       g % 17 AS product_uom_qty,
+       (g % 300) * 1.5::float8 AS price_unit,
+       g % 900 AS partner_id
+FROM generate_series(1, %s) AS g
+"""
+
+
+class GeneratedCursor:
+    """DB-API cursor over generated sale-order rows"""
+
+    def __init__(self, count):
+        self.description = [(name,) for name in COLUMNS]
+        self._rows = self._generate(count)
+
+    @staticmethod
+    def _generate(count):
+        start = datetime(2024, 1, 1)
+        for i in range(count):
+            yield (i, f'SO{i:06d}', start + timedelta(minutes=i), 'sale', Decimal(i % 5000) / 4,
+                   None if i % 3 else Decimal(i % 700) / 8, float(i % 17), float(i % 300) * 1.5,
+                   Decimal(i * 3), i % 900)
+
+    def fetchmany(self, size):
+        return [row for _, row in zip(range(size), self._rows)]
+
+    def fetchall(self):
+        return list(self._rows)
+
+
+def legacy_rows(cursor):
+    """The previous execute_query: a dict per row (RealDictCursor rows copied into dicts)"""
+    names = [d[0] for d in cursor.description]
+    return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+
+def measure(build):
+    """(result, build seconds, retained bytes, peak bytes)"""
+    gc.collect()
+    start = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, retained, peak
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def report(label, builders):
+    print(f"\n{label}")
+    print(f"{'representation':<16}{'build':>10}{'held':>12}{'peak':>12}{'format':>10}")
+    results = {}
+    for name, build in builders:
+        result, elapsed, retained, peak = measure(build)
+        _, format_time = timed(CurrencyFormatter.format_results, result)
+        results[name] = (result, retained)
+        print(f"{name:<16}{elapsed * 1000:>8.0f}ms{retained / 1024 / 1024:>10.1f}MB{peak / 1024 / 1024:>10.1f}MB"
+              f"{format_time * 1000:>8.0f}ms")
+
+    (legacy, legacy_bytes), (columnar, columnar_bytes) = results['list of dicts'], results['ResultSet']
+    print(f"Rows identical: {legacy == columnar.to_dicts()}, memory held: {columnar_bytes / legacy_bytes:.0%} "
+          f"of list of dicts")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark columnar results against a list of dicts')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--database', action='store_true', help='Also run on a generated query (needs a database)')
+    args = parser.parse_args()
+
+    print(f"Rows: {args.rows}, numeric columns stored with {'numpy' if _np() else 'array.array'}")
+    report(f"Offline ({len(COLUMNS)} columns)", [
+        ('list of dicts', lambda: legacy_rows(GeneratedCursor(args.rows))),
+        ('ResultSet', lambda: ResultSet.from_cursor(GeneratedCursor(args.rows))),
+    ])
+
+    if args.database:
+        import psycopg2.extras
+
+        from app.database.connection import DatabaseConnection
+
+        db = DatabaseConnection()
+
+        def realdict():
+            with db.get_connection() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                cursor.execute(QUERY, (args.rows,))
+                return [dict(row) for row in cursor.fetchall()]
+
+        report("Database (generate_series)", [
+            ('list of dicts', realdict),
+            ('ResultSet', lambda: db.execute_query(QUERY, (args.rows,))),
+        ])
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
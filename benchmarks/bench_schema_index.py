@@ -0,0 +1,128 @@
+"""
+Schema Relevance Benchmark
+Compares the inverted SchemaSearchIndex with the previous linear keyword scan
+on a synthetic Odoo-sized schema.
+
+Usage: python -m benchmarks.bench_schema_index [--tables 800] [--columns 25]
+"""
+
+import argparse
+import random
+import re
+import time
+
+from app.database.schema import SchemaDiscovery
+from app.database.search_index import SchemaSearchIndex
+
+MODULES = ['sale', 'purchase', 'account', 'stock', 'mrp', 'hr', 'crm', 'res', 'product',
+           'mail', 'project', 'website', 'pos', 'fleet', 'maintenance', 'quality']
+OBJECTS = ['order', 'move', 'line', 'partner', 'picking', 'location', 'template', 'category',
+           'payment', 'invoice', 'lead', 'employee', 'message', 'tax', 'journal', 'report',
+           'rule', 'config', 'settings', 'wizard', 'attribute', 'value', 'tag', 'stage']
+COLUMN_WORDS = ['name', 'date', 'state', 'amount', 'total', 'price', 'unit', 'qty', 'partner',
+                'product', 'company', 'currency', 'user', 'create', 'write', 'active', 'note',
+                'description', 'sequence', 'type', 'code', 'ref', 'origin', 'tax', 'discount',
+                'weight', 'volume', 'location', 'dest', 'src', 'uom', 'planned', 'done']
+QUESTIONS = [
+    "How many customers do we have?",
+    "What is the total sales amount from all orders?",
+    "Show me top 10 customers by revenue this year",
+    "Which products are out of stock?",
+    "List purchase order lines with unit price above 100",
+    "How many invoices were paid last month?",
+    "Show employees by department and company",
+    "What is the average discount on sale order lines?",
+    "Which stock locations have the most quantity?",
+    "Show CRM leads in the won stage",
+]
+
+
+def build_schema(tables: int, columns: int, seed: int = 42):
+    rng = random.Random(seed)
+    schema = {}
+    while len(schema) < tables:
+        parts = [rng.choice(MODULES)] + rng.sample(OBJECTS, rng.randint(1, 3))
+        table_name = '_'.join(parts)
+        if table_name in schema:
+            continue
+        cols = ['id', 'create_uid', 'create_date', 'write_uid', 'write_date']
+        while len(cols) < columns:
+            col = '_'.join(rng.sample(COLUMN_WORDS, rng.randint(1, 3)))
+            if rng.random() < 0.3:
+                col += '_id'
+            if col not in cols:
+                cols.append(col)
+        schema[table_name] = {
+            'table_name': table_name,
+            'schema': 'public',
+            'columns': [{'name': c, 'type': 'integer', 'nullable': True} for c in cols],
+        }
+    return schema
+
+
+def linear_top_tables(schema, question, limit=10):
+    """The previous get_relevant_schema scoring loop"""
+    keywords = set(re.findall(r'\b\w+\b', question.lower()))
+    relevant_tables = []
+    for table_name, table_info in schema.items():
+        score = 0
+        table_lower = table_name.lower()
+        for keyword in keywords:
+            if keyword in table_lower:
+                score += 2
+            for col in table_info['columns']:
+                if keyword in col['name'].lower():
+                    score += 1
+        if score > 0:
+            relevant_tables.append((table_name, score))
+    relevant_tables.sort(key=lambda x: x[1], reverse=True)
+    return [name for name, _ in relevant_tables[:limit]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark schema relevance scoring')
+    parser.add_argument('--tables', type=int, default=800)
+    parser.add_argument('--columns', type=int, default=25)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    schema = build_schema(args.tables, args.columns)
+    total_columns = sum(len(t['columns']) for t in schema.values())
+    print(f"Synthetic schema: {len(schema)} tables, {total_columns} columns")
+
+    start = time.perf_counter()
+    index = SchemaSearchIndex.from_schema(schema)
+    print(f"Index build: {(time.perf_counter() - start) * 1000:.1f} ms (once per discovery)")
+
+    discovery = SchemaDiscovery(db_connection=None)
+    discovery.schema_cache = schema
+    discovery.search_index = index
+
+    mismatches = 0
+    for question in QUESTIONS:
+        keywords = set(re.findall(r'\b\w+\b', question.lower()))
+        if linear_top_tables(schema, question) != index.top_tables(keywords):
+            mismatches += 1
+    print(f"Ranking mismatches vs linear scan: {mismatches}/{len(QUESTIONS)}")
+
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        for question in QUESTIONS:
+            linear_top_tables(schema, question)
+    linear_ms = (time.perf_counter() - start) / (args.rounds * len(QUESTIONS)) * 1000
+
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        for question in QUESTIONS:
+            # Fresh index state per round so the keyword memo does not hide lookup cost
+            index._match_cache.clear()
+            discovery.get_relevant_schema(question)
+    indexed_ms = (time.perf_counter() - start) / (args.rounds * len(QUESTIONS)) * 1000
+
+    print(f"Linear scan:   {linear_ms:8.2f} ms/question")
+    print(f"Indexed:       {indexed_ms:8.2f} ms/question (including schema text)")
+    print(f"Speedup:       {linear_ms / indexed_ms:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
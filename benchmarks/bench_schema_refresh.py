@@ -0,0 +1,246 @@
+"""
+Incremental Schema Refresh Benchmark
+Alters a few tables of a large schema, then compares a full rediscovery with
+SchemaRefresher's incremental refresh: catalog rows read, round trips and time,
+and checks that both end up with the same schema, search results and join paths.
+
+Offline the catalog is simulated (--tables tables of --columns columns, with a
+per-round-trip and per-row delay). With --database the no-change check and the
+full discovery are timed on the docker-compose test database (POSTGRES_*).
+
+Usage: python -m benchmarks.bench_schema_refresh [--tables 2000] [--columns 20] [--altered 5] [--database]
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import random
+import statistics
+import time
+
+from app.database.join_graph import FOREIGN_KEY_QUERY
+from app.database.result_set import ResultSet
+from app.database.schema import COLUMNS_QUERY, TABLE_COLUMNS_QUERY, SchemaDiscovery
+from app.database.schema_refresh import SchemaRefresher
+from app.database.snapshot import FINGERPRINT_QUERY, RELATION_FINGERPRINTS_QUERY
+
+TYPES = ['integer', 'character varying', 'numeric', 'boolean', 'timestamp without time zone', 'date']
+WORDS = ['sale', 'order', 'account', 'move', 'line', 'stock', 'picking', 'product', 'partner', 'invoice',
+         'purchase', 'project', 'task', 'hr', 'employee', 'mrp', 'production', 'res', 'company', 'journal']
+
+
+class SimulatedCatalog:
+    """Answers the catalog queries SchemaDiscovery sends, from an in-memory schema
+
+    Each query costs ``round_trip`` seconds plus ``per_row`` per returned row,
+    roughly an SSH tunnel to a remote database.
+    """
+
+    def __init__(self, tables, round_trip=0.02, per_row=0.00002):
+        self.config = {'host': 'simulated', 'port': 5432, 'database': 'odoo'}
+        # (schema, table) -> {'columns': [(name, type, nullable)], 'fks': [(columns, ref, ref_columns)]}
+        self.tables = tables
+        self.round_trip = round_trip
+        self.per_row = per_row
+        self.queries = 0
+        self.rows = 0
+        self._fingerprint = None
+
+    def changed(self):
+        """Call after altering ``tables``"""
+        self._fingerprint = None
+
+    def _definition(self, key):
+        return repr(self.tables[key])
+
+    def _answer(self, sql, params):
+        if sql == FINGERPRINT_QUERY:
+            # Postgres computes this server-side; keep the simulation's own cost out of the timings
+            if self._fingerprint is None:
+                digest = hashlib.md5(''.join(self._definition(key) for key in sorted(self.tables)).encode())
+                self._fingerprint = digest.hexdigest()
+            return ['fingerprint'], [(self._fingerprint,)]
+        if sql == RELATION_FINGERPRINTS_QUERY:
+            return ['table_schema', 'table_name', 'fingerprint'], [
+                (schema, table, hashlib.md5(self._definition((schema, table)).encode()).hexdigest())
+                for schema, table in self.tables
+            ]
+        if sql in (COLUMNS_QUERY, TABLE_COLUMNS_QUERY):
+            selected = set(zip(*params)) if params else self.tables
+            return ['table_schema', 'table_name', 'column_name', 'data_type', 'is_nullable'], [
+                (schema, table, name, data_type, nullable)
+                for schema, table in sorted(self.tables, key=lambda key: key[1]) if (schema, table) in selected
+                for name, data_type, nullable in self.tables[(schema, table)]['columns']
+            ]
+        if FOREIGN_KEY_QUERY in sql:
+            selected = set(zip(*params)) if params else None
+            rows = []
+            for (schema, table), info in sorted(self.tables.items()):
+                for columns, ref, ref_columns in info['fks']:
+                    if ref not in self.tables:
+                        continue
+                    if selected is None or (schema, table) in selected:
+                        rows.append((schema, table, ref[0], ref[1], columns, ref_columns))
+            return ['table_schema', 'table_name', 'ref_schema', 'ref_table', 'columns', 'ref_columns'], rows
+        raise RuntimeError(f"Unexpected catalog query: {sql[:60]}")
+
+    def execute_query(self, sql, params=None, timeout=30):
+        columns, rows = self._answer(sql, params)
+        self.queries += 1
+        self.rows += len(rows)
+        time.sleep(self.round_trip + self.per_row * len(rows))
+        return ResultSet.from_tuples(columns, rows)
+
+    def identity(self):
+        return 'simulated/odoo'
+
+
+def build_catalog(table_count, column_count, seed=3):
+    r = random.Random(seed)
+    keys = []
+    for i in range(table_count):
+        name = '_'.join(r.sample(WORDS, 2)) + f'_{i}'
+        keys.append(('public' if i % 10 else 'report', name))
+    tables = {}
+    for key in keys:
+        columns = [('id', 'integer', 'NO')] + [
+            (f"{r.choice(WORDS)}_{c}", r.choice(TYPES), r.choice(['YES', 'NO'])) for c in range(column_count - 1)
+        ]
+        fks = []
+        for ref in r.sample(keys, 2):
+            if ref != key:
+                fks.append(([f"{ref[1]}_id"], ref, ['id']))
+                columns.append((f"{ref[1]}_id", 'integer', 'YES'))
+        tables[key] = {'columns': columns, 'fks': fks}
+    return tables
+
+
+def alter(tables, count, seed=5):
+    """Apply ``count`` DDL changes: add/rename/retype columns, drop a table, create one"""
+    r = random.Random(seed)
+    keys = sorted(tables)
+    described = []
+    for i, key in enumerate(r.sample(keys, count)):
+        columns = tables[key]['columns']
+        if i % 4 == 0:
+            columns.append((f'x_studio_field_{i}', 'character varying', 'YES'))
+            described.append(f"add column to {key[1]}")
+        elif i % 4 == 1:
+            name, data_type, nullable = columns[1]
+            columns[1] = (name + '_renamed', data_type, nullable)
+            described.append(f"rename column of {key[1]}")
+        elif i % 4 == 2:
+            name, _, nullable = columns[2]
+            columns[2] = (name, 'text', nullable)
+            described.append(f"retype column of {key[1]}")
+        else:
+            # Drops the table and (like CASCADE) the foreign keys to it
+            del tables[key]
+            for info in tables.values():
+                info['fks'] = [fk for fk in info['fks'] if fk[1] != key]
+            described.append(f"drop {key[1]}")
+    tables[('public', 'x_new_report')] = {
+        'columns': [('id', 'integer', 'NO'), ('partner_id', 'integer', 'YES')],
+        'fks': [(['partner_id'], keys[0], ['id'])],
+    }
+    described.append("create x_new_report")
+    return described
+
+
+def measured(db, fn):
+    """(result, seconds, queries, rows) of fn() against db"""
+    queries, rows = db.queries, db.rows
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn()
+    return result, time.perf_counter() - start, db.queries - queries, db.rows - rows
+
+
+def edges(graph):
+    return {table: sorted(edge) for table, edge in graph._edges.items()}
+
+
+def bench_simulated(args):
+    tables = build_catalog(args.tables, args.columns)
+    db = SimulatedCatalog(tables, args.round_trip, args.per_row)
+    schema = SchemaDiscovery(db)
+    refresher = SchemaRefresher(schema, interval=60)
+
+    _, full_seconds, full_queries, full_rows = measured(db, schema.load_schema)
+    _, baseline_seconds, _, _ = measured(db, refresher.check)
+    idle = [measured(db, refresher.check) for _ in range(5)]
+    changes = alter(tables, args.altered)
+    db.changed()
+    result, refresh_seconds, refresh_queries, refresh_rows = measured(db, refresher.check)
+
+    fresh = SchemaDiscovery(db)
+    _, rediscover_seconds, rediscover_queries, rediscover_rows = measured(db, fresh.discover_schema)
+
+    print(f"Schema: {args.tables} tables x ~{args.columns} columns, simulated round trip "
+          f"{args.round_trip * 1000:.0f} ms + {args.per_row * 1e6:.0f} us/row")
+    print(f"Changes: {', '.join(changes)}")
+    print(f"{'':<26}{'time':>10}{'queries':>9}{'rows':>10}")
+    print(f"{'initial discovery':<26}{full_seconds * 1000:>8.0f}ms{full_queries:>9}{full_rows:>10}")
+    print(f"{'per-table baseline':<26}{baseline_seconds * 1000:>8.0f}ms")
+    print(f"{'check, nothing changed':<26}{statistics.median(s for _, s, _, _ in idle) * 1000:>8.1f}ms"
+          f"{idle[0][2]:>9}{idle[0][3]:>10}")
+    print(f"{'full rediscovery':<26}{rediscover_seconds * 1000:>8.0f}ms{rediscover_queries:>9}{rediscover_rows:>10}")
+    print(f"{'incremental refresh':<26}{refresh_seconds * 1000:>8.0f}ms{refresh_queries:>9}{refresh_rows:>10}"
+          f"   ({len(result['changed'])} reloaded, {len(result['removed'])} removed)")
+
+    keywords = {'sale', 'order', 'partner', 'renamed', 'x', 'studio', 'report'}
+    problems = []
+    if schema.schema_cache != fresh.schema_cache:
+        problems.append('schema')
+    if schema.search_index.top_tables(keywords, 20) != fresh.search_index.top_tables(keywords, 20):
+        problems.append('search results')
+    if edges(schema.join_graph) != edges(fresh.join_graph):
+        problems.append('join graph')
+    print("Incremental result matches full rediscovery" if not problems
+          else f"[!] Incremental result differs from full rediscovery: {', '.join(problems)}")
+
+
+def bench_database(repeat):
+    from app.database.connection import DatabaseConnection
+
+    db = DatabaseConnection()
+    schema = SchemaDiscovery(db)
+    refresher = SchemaRefresher(schema, interval=60)
+    with contextlib.redirect_stdout(io.StringIO()):
+        schema.load_schema()
+        refresher.check()
+
+    def timed(fn):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        return time.perf_counter() - start
+
+    checks = [timed(refresher.check) for _ in range(repeat)]
+    discoveries = [timed(schema.discover_schema) for _ in range(repeat)]
+    print(f"Test database, {len(schema.schema_cache)} tables (median of {repeat}):")
+    print(f"  check, nothing changed {statistics.median(checks) * 1000:8.1f} ms")
+    print(f"  full rediscovery       {statistics.median(discoveries) * 1000:8.1f} ms")
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark incremental schema refresh against full rediscovery')
+    parser.add_argument('--tables', type=int, default=2000)
+    parser.add_argument('--columns', type=int, default=20, help='Columns per table')
+    parser.add_argument('--altered', type=int, default=5, help='Tables changed between the checks')
+    parser.add_argument('--round-trip', type=float, default=0.02, help='Simulated seconds per catalog query')
+    parser.add_argument('--per-row', type=float, default=0.00002, help='Simulated seconds per catalog row')
+    parser.add_argument('--database', action='store_true', help='Time the test database instead (needs a database)')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.database:
+        bench_database(args.repeat)
+    else:
+        bench_simulated(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+SQL Template Benchmark
+Runs families of questions that differ only in a value (a customer, city, year,
+top-N) through DatabaseAgent.prepare_sql with SQL templates off and on, using a
+stub LLM with a simulated latency, and reports model calls, template hit rate
+and question-to-SQL latency. Runs offline on a schema shaped like the docker
+init-db tables; the exact-question SQL cache stays on in both runs.
+
+With --database the questions are also executed against the docker-compose test
+database (POSTGRES_*), and the SQL filled in from templates is timed as a
+prepared statement against the same SQL sent inline.
+
+Usage: python -m benchmarks.bench_sql_templates [--questions 200] [--llm-latency 0.8] [--database]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import tempfile
+import time
+
+# Do not write benchmark calls into the real usage log, snapshot or caches
+os.environ.setdefault('USAGE_LOG_PATH', os.devnull)
+os.environ['SCHEMA_CACHE_ENABLED'] = 'false'
+os.environ['TABLE_STATS_ENABLED'] = 'false'
+os.environ['QUERY_CACHE_ENABLED'] = 'true'
+os.environ['QUERY_CACHE_RESULT_TTL'] = '0'
+
+from app.ai.replay import StubSQLGenerator
+from app.cache.query_cache import normalize_sql
+from app.core.agent import DatabaseAgent
+
+CUSTOMERS = ['Ashish Bhandari', 'Madhavi Dadi', 'Anuradha Phalke', 'Swaroopa Pulivarthi', 'Devendra Parkhi',
+             'Surya Chittineni', 'Amit Kohli', 'Suchit Sharma', 'Santhosh Nair', 'Rajesh Patel']
+CITIES = ['New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix', 'Philadelphia', 'San Antonio',
+          'San Diego', 'Dallas', 'Mumbai', 'Delhi', 'Bangalore', 'Hyderabad', 'Chennai']
+COUNTRIES = ['USA', 'India', 'Canada', 'UK', 'Australia', 'Germany', 'France']
+YEARS = [2021, 2022, 2023, 2024, 2025]
+
+# The init-db tables the questions use
+SCHEMA = {
+    'public.res_partner': ['id integer', 'name character varying', 'email character varying',
+                           'city character varying', 'country character varying', 'customer_rank integer',
+                           'active boolean'],
+    'public.sale_order': ['id integer', 'name character varying', 'partner_id integer',
+                          'date_order timestamp without time zone', 'state character varying',
+                          'amount_total numeric', 'active boolean'],
+}
+
+
+def orders_for_customer(r):
+    customer = r.choice(CUSTOMERS)
+    return (f"Show sales orders for customer '{customer}'",
+            "SELECT so.name, so.date_order, so.state, so.amount_total FROM sale_order so "
+            f"JOIN res_partner p ON p.id = so.partner_id WHERE p.name ILIKE '%{customer}%' "
+            "ORDER BY so.date_order DESC LIMIT 100")
+
+
+def orders_in_city(r):
+    city, year = r.choice(CITIES), r.choice(YEARS)
+    return (f"How many orders did customers in {city} place in {year}?",
+            "SELECT COUNT(*) AS order_count FROM sale_order so JOIN res_partner p ON p.id = so.partner_id "
+            f"WHERE p.city = '{city}' AND EXTRACT(YEAR FROM so.date_order) = {year} LIMIT 100")
+
+
+def top_customers(r):
+    count, country = r.randint(3, 20), r.choice(COUNTRIES)
+    return (f"Top {count} customers by revenue in {country}",
+            "SELECT p.name, SUM(so.amount_total) AS revenue FROM sale_order so "
+            f"JOIN res_partner p ON p.id = so.partner_id WHERE p.country = '{country}' "
+            f"AND so.state NOT IN ('draft', 'cancel') GROUP BY p.name ORDER BY revenue DESC LIMIT {count}")
+
+
+FAMILIES = [orders_for_customer, orders_in_city, top_customers]
+
+
+def workload(count, seed=7):
+    r = random.Random(seed)
+    return [r.choice(FAMILIES)(r) for _ in range(count)]
+
+
+def schema_cache():
+    return {
+        table: {'columns': [{'name': c.split(' ', 1)[0], 'type': c.split(' ', 1)[1], 'nullable': 'YES'}
+                            for c in columns]}
+        for table, columns in SCHEMA.items()
+    }
+
+
+def run(questions, llm_latency, templates, database):
+    """(per-question seconds, model calls, template summary or None, errors, SQL differing from the model's)"""
+    os.environ['QUERY_TEMPLATES_ENABLED'] = 'true' if templates else 'false'
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['QUERY_CACHE_PATH'] = os.path.join(tmp, 'cache.sqlite')
+        ai = StubSQLGenerator(llm_latency, dict(questions))
+        calls = []
+        generate = ai.generate_sql
+        ai.generate_sql = lambda *a, **kw: calls.append(1) or generate(*a, **kw)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            agent = DatabaseAgent(ai=ai)
+            if not database:
+                agent.schema.schema_cache = schema_cache()
+                agent.cost_guard = None
+
+        latencies, errors, wrong = [], 0, 0
+        for question, expected in questions:
+            start = time.perf_counter()
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    sql, _ = agent.prepare_sql(question)
+                    if database:
+                        agent.fetch_results(sql)
+                wrong += normalize_sql(sql) != normalize_sql(expected)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+        summary = agent.templates.summary() if agent.templates else None
+        agent.db.close()
+    return latencies, len(calls), summary, errors, wrong
+
+
+def compare_execution(questions, repeat):
+    """Mean seconds per execution of template-filled SQL: (inline, prepared)"""
+    os.environ['QUERY_TEMPLATES_ENABLED'] = 'true'
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['QUERY_CACHE_PATH'] = os.path.join(tmp, 'cache.sqlite')
+        with contextlib.redirect_stdout(io.StringIO()):
+            agent = DatabaseAgent(ai=StubSQLGenerator(0.0, dict(questions)))
+            filled = []
+            for question, _ in questions:
+                sql, _ = agent.prepare_sql(question)
+                prepared = agent.templates.prepared_for(sql)
+                if prepared:
+                    filled.append((sql, prepared))
+
+        inline, prepared_times = [], []
+        for _ in range(repeat):
+            for sql, prepared in filled:
+                start = time.perf_counter()
+                agent.db.execute_query(sql)
+                inline.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                agent.db.execute_prepared(*prepared)
+                prepared_times.append(time.perf_counter() - start)
+        agent.db.close()
+    if not filled:
+        return None
+    return statistics.mean(inline), statistics.mean(prepared_times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark SQL templates for recurring question shapes')
+    parser.add_argument('--questions', type=int, default=200)
+    parser.add_argument('--llm-latency', type=float, default=0.8, help='Stub LLM delay in seconds')
+    parser.add_argument('--database', action='store_true', help='Also execute the queries (needs a database)')
+    parser.add_argument('--repeat', type=int, default=20, help='Executions per query for the prepared comparison')
+    args = parser.parse_args()
+
+    questions = workload(args.questions)
+    print(f"Questions: {len(questions)} from {len(FAMILIES)} shapes, {len(dict(questions))} distinct, "
+          f"simulated LLM latency: {args.llm_latency * 1000:.0f} ms")
+    print(f"{'templates':<11}{'LLM calls':>10}{'hit rate':>10}{'mean':>10}{'p50':>10}{'p95':>10}{'total':>10}")
+
+    for templates in (False, True):
+        latencies, calls, summary, errors, wrong = run(questions, args.llm_latency, templates, args.database)
+        ordered = sorted(latencies)
+        hit_rate = f"{summary['template_hit_rate']:.0%}" if summary else '-'
+        print(f"{'on' if templates else 'off':<11}{calls:>10}{hit_rate:>10}"
+              f"{statistics.mean(latencies) * 1000:>8.1f}ms{statistics.median(latencies) * 1000:>8.1f}ms"
+              f"{ordered[int(0.95 * (len(ordered) - 1))] * 1000:>8.1f}ms{sum(latencies):>9.1f}s"
+              f"{f'  errors={errors}' if errors else ''}{f'  wrong SQL={wrong}' if wrong else ''}")
+
+    if args.database:
+        timings = compare_execution(questions, args.repeat)
+        if timings is None:
+            print("\nNo template hits to execute")
+        else:
+            inline, prepared = timings
+            print(f"\nTemplate SQL execution: inline {inline * 1000:.2f} ms, prepared {prepared * 1000:.2f} ms "
+                  f"({(inline - prepared) / inline:+.0%} time saved)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Streaming Memory Benchmark
+Compares peak Python memory of the fetchall path with the server-side cursor
+streaming path for a large result set.
+
+Requires a reachable PostgreSQL configured through POSTGRES_* variables
+(e.g. the docker-compose test database).
+
+Usage: python -m benchmarks.bench_streaming [--rows 200000] [--itersize 2000]
+"""
+
+import argparse
+import os
+import time
+import tracemalloc
+
+from tabulate import tabulate
+
+from app.database.connection import DatabaseConnection
+from app.formatters.currency import CurrencyFormatter
+from app.formatters.stream import render_table_stream
+
+QUERY = """
+SELECT g AS id,
+       'order ' || g AS name,
+       (g % 1000) * 1.25 AS amount_total,
+       g % 7 AS product_qty,
+       now() - (g || ' minutes')::interval AS date_order
+FROM generate_series(1, %s) AS g
+"""
+
+
+def measure(label, fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<12} rows={rows:<9} time={elapsed:6.2f}s  peak={peak / 1024 / 1024:8.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark streaming vs fetchall memory')
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--itersize', type=int, default=2000)
+    args = parser.parse_args()
+
+    db = DatabaseConnection()
+    devnull = open(os.devnull, 'w')
+
+    def fetchall_path():
+        results = db.execute_query(QUERY, (args.rows,))
+        formatted = CurrencyFormatter.format_results(results)
+        text = tabulate(formatted, headers='keys', tablefmt='grid')
+        devnull.write(text)
+        return len(results)
+
+    def streaming_path():
+        rows = db.stream_query(QUERY, (args.rows,), itersize=args.itersize)
+        return render_table_stream(CurrencyFormatter.iter_format_results(rows), out=devnull)
+
+    # Warm the pool so connection setup is not measured
+    db.execute_query("SELECT 1")
+
+    measure('fetchall', fetchall_path)
+    measure('streaming', streaming_path)
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
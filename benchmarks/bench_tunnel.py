@@ -0,0 +1,182 @@
+"""
+SSH Tunnel Benchmark
+Compares the selector-based TunnelForwarder with the previous thread-per-direction
+forwarder against a loopback SSH stand-in (no SSH server or database needed).
+
+Usage: python -m benchmarks.bench_tunnel [--megabytes 64] [--queries 20]
+"""
+
+import argparse
+import socket
+import struct
+import threading
+import time
+
+from app.database.tunnel import TunnelForwarder
+
+
+class LoopbackTransport:
+    """Stand-in for a paramiko transport: channels are plain TCP sockets to a local server"""
+
+    def __init__(self, server_port: int):
+        self.server_port = server_port
+
+    def open_channel(self, kind, dest_addr, src_addr):
+        return socket.create_connection(('127.0.0.1', self.server_port))
+
+    def is_active(self):
+        return True
+
+
+def start_backend() -> int:
+    """Database stand-in: each request is an 8-byte size, answered with that many bytes"""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', 0))
+    server.listen(64)
+
+    payload = b'x' * (1024 * 1024)
+
+    def handle(conn):
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with conn:
+            while True:
+                header = recv_exact(conn, 8)
+                if not header:
+                    return
+                remaining = struct.unpack('!Q', header)[0]
+                while remaining:
+                    chunk = payload[:min(remaining, len(payload))]
+                    conn.sendall(chunk)
+                    remaining -= len(chunk)
+
+    def serve():
+        while True:
+            conn, _ = server.accept()
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return server.getsockname()[1]
+
+
+def recv_exact(sock, size: int) -> bytes:
+    chunks = []
+    while size:
+        data = sock.recv(min(size, 1024 * 1024))
+        if not data:
+            return b''
+        chunks.append(data)
+        size -= len(data)
+    return b''.join(chunks)
+
+
+def request(sock, size: int):
+    sock.sendall(struct.pack('!Q', size))
+    received = 0
+    while received < size:
+        data = sock.recv(1024 * 1024)
+        if not data:
+            raise ConnectionError("backend closed the connection")
+        received += len(data)
+
+
+class LegacyForwarder:
+    """The previous forwarder: two threads per connection copying 4 KB with recv/send"""
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.local_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.local_socket.bind(('127.0.0.1', 0))
+        self.local_socket.listen(1)
+        self.local_port = self.local_socket.getsockname()[1]
+        threading.Thread(target=self._forward_connection, daemon=True).start()
+
+    def _forward_connection(self):
+        while True:
+            try:
+                local_conn, _ = self.local_socket.accept()
+                channel = self.transport.open_channel('direct-tcpip', ('localhost', 5432),
+                                                      ('127.0.0.1', self.local_port))
+
+                def forward_data(src, dst):
+                    try:
+                        while True:
+                            data = src.recv(4096)
+                            if not data:
+                                break
+                            dst.send(data)
+                    except Exception:
+                        pass
+                    finally:
+                        src.close()
+                        dst.close()
+
+                threading.Thread(target=forward_data, args=(local_conn, channel), daemon=True).start()
+                threading.Thread(target=forward_data, args=(channel, local_conn), daemon=True).start()
+            except Exception:
+                break
+
+
+def bench_throughput(port: int, megabytes: int) -> float:
+    sock = socket.create_connection(('127.0.0.1', port))
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    size = megabytes * 1024 * 1024
+    start = time.perf_counter()
+    request(sock, size)
+    elapsed = time.perf_counter() - start
+    sock.close()
+    return megabytes / elapsed
+
+
+def bench_legacy_queries(port: int, queries: int, response_size: int) -> float:
+    """Previous path: sleep(0.5) + fresh connection for every query"""
+    start = time.perf_counter()
+    for _ in range(queries):
+        time.sleep(0.5)
+        sock = socket.create_connection(('127.0.0.1', port))
+        request(sock, response_size)
+        sock.close()
+    return (time.perf_counter() - start) / queries * 1000
+
+
+def bench_pooled_queries(forwarder: TunnelForwarder, queries: int, response_size: int) -> float:
+    """New path: wait for readiness once, then reuse a persistent connection"""
+    start = time.perf_counter()
+    forwarder.wait_ready()
+    sock = socket.create_connection(('127.0.0.1', forwarder.local_port))
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    for _ in range(queries):
+        request(sock, response_size)
+    sock.close()
+    return (time.perf_counter() - start) / queries * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the SSH tunnel forwarder')
+    parser.add_argument('--megabytes', type=int, default=64, help='Payload size for the throughput test')
+    parser.add_argument('--queries', type=int, default=20, help='Number of small queries for the overhead test')
+    parser.add_argument('--response-size', type=int, default=2048, help='Bytes returned per small query')
+    args = parser.parse_args()
+
+    backend_port = start_backend()
+    transport = LoopbackTransport(backend_port)
+
+    legacy = LegacyForwarder(transport)
+    forwarder = TunnelForwarder(transport)
+    forwarder.start()
+
+    print(f"Throughput ({args.megabytes} MB download):")
+    print(f"  direct:       {bench_throughput(backend_port, args.megabytes):8.1f} MB/s")
+    print(f"  legacy:       {bench_throughput(legacy.local_port, args.megabytes):8.1f} MB/s")
+    print(f"  forwarder:    {bench_throughput(forwarder.local_port, args.megabytes):8.1f} MB/s")
+
+    print(f"\nPer-query overhead ({args.queries} queries, {args.response_size} B each):")
+    print(f"  legacy:       {bench_legacy_queries(legacy.local_port, args.queries, args.response_size):8.2f} ms/query")
+    print(f"  forwarder:    {bench_pooled_queries(forwarder, args.queries, args.response_size):8.2f} ms/query")
+    print(f"\nForwarder stats: {forwarder.stats}")
+
+    forwarder.stop()
+
+
+if __name__ == '__main__':
+    main()
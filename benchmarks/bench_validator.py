@@ -0,0 +1,161 @@
+"""
+Query Validator Benchmark
+Fuzzes the tokenizing validator with generated queries (valid ones must pass, injected
+writes must be rejected, the outer LIMIT must be bounded) and compares its
+per-query cost and false rejections with the previous substring scan.
+
+Usage: python -m benchmarks.bench_validator [--queries 20000] [--seed 7]
+"""
+
+import argparse
+import random
+import time
+
+from app.security.sql_tokenizer import tokenize, split_statements
+from app.security.validator import QueryValidator
+
+# Column names that contain forbidden keywords as substrings
+COLUMNS = ['id', 'name', 'updated_at', 'created_date', 'create_uid', 'write_date', 'drop_reason',
+           'amount_total', 'state', 'insert_count', 'deleted', 'grant_amount', '"Order Ref"']
+TABLES = ['sale_order', 'res_partner', 'account_move', 'stock_move', 'product_template']
+LITERALS = ["'draft'", "'DROP TABLE users; --'", "'it''s'", "E'a\\'b'", "$$ DELETE FROM x $$",
+            "$tag$ ; UPDATE $tag$", "$$x$$", "$t$a$t$", '42', '3.14', "'2024-01-01'::date"]
+COMMENTS = ['', ' -- TRUNCATE everything\n', ' /* INSERT /* nested */ here */ ']
+INJECTIONS = ['; DROP TABLE sale_order', '; UPDATE res_partner SET name = 1',
+              ' FOR UPDATE', ' FOR NO KEY UPDATE', ' INTO TEMP copy_t', ' AND "pg_sleep"(60) IS NULL',
+              " AND pg_sleep_for('1 minute') IS NULL", ' AND pg_try_advisory_lock(1)',
+              # A second statement hidden behind a dollar quote closed inside a comment
+              ' AND name = $$a$$; SELECT pg_sleep(60); SELECT 1 -- $$']
+WRITE_CTES = ['DELETE FROM {t} RETURNING *', 'UPDATE {t} SET state = 1 RETURNING *',
+              'INSERT INTO {t} (id) VALUES (1) RETURNING *']
+
+
+def legacy_validate(sql):
+    sql_upper = sql.upper().strip()
+    for keyword in ['DROP', 'DELETE', 'TRUNCATE', 'UPDATE', 'INSERT',
+                    'ALTER', 'CREATE', 'GRANT', 'REVOKE', 'EXECUTE']:
+        if keyword in sql_upper:
+            raise ValueError(keyword)
+    if not (sql_upper.startswith('SELECT') or sql_upper.startswith('WITH')):
+        raise ValueError('not a select')
+    return True
+
+
+def random_select(rng, depth=0):
+    cols = ', '.join(rng.sample(COLUMNS, rng.randint(1, 4)))
+    table = rng.choice(TABLES)
+    sql = f"SELECT {cols}{rng.choice(COMMENTS)} FROM {table}"
+    if rng.random() < 0.6:
+        sql += f" WHERE {rng.choice(COLUMNS)} = {rng.choice(LITERALS)}"
+    if depth < 2 and rng.random() < 0.3:
+        sql += f" AND id IN ({random_select(rng, depth + 1)})"
+    if rng.random() < 0.3:
+        sql += f" ORDER BY {rng.choice(COLUMNS)}"
+    if rng.random() < 0.4:
+        sql += f" LIMIT {rng.choice([5, 50, 500, 5000, 'ALL'])}"
+    return sql
+
+
+def random_query(rng):
+    if rng.random() < 0.3:
+        return f"WITH recent AS ({random_select(rng, 1)}) {random_select(rng)}"
+    return random_select(rng)
+
+
+def outer_limit(sql):
+    """Value of the depth-0 LIMIT, None if missing"""
+    top = [t for t in split_statements(tokenize(sql))[0] if t.depth == 0]
+    for i, token in enumerate(top):
+        if token.upper == 'LIMIT':
+            return top[i + 1].value
+    return None
+
+
+def fuzz(rng, count, max_limit):
+    failures = []
+    legacy_false_rejections = 0
+    for _ in range(count):
+        sql = random_query(rng)
+        try:
+            QueryValidator.validate_query(sql)
+        except ValueError as e:
+            failures.append(('rejected valid query', sql, str(e)))
+            continue
+        try:
+            legacy_validate(sql)
+        except ValueError:
+            legacy_false_rejections += 1
+
+        limited = QueryValidator.add_limit_if_needed(sql, 100, max_limit)
+        limit = outer_limit(limited)
+        if limit is None or int(limit) > max_limit:
+            failures.append(('outer limit not bounded', limited, limit))
+
+        bad = sql + rng.choice(INJECTIONS)
+        if rng.random() < 0.3:
+            bad = f"WITH w AS ({rng.choice(WRITE_CTES).format(t=rng.choice(TABLES))}) {sql}"
+        try:
+            QueryValidator.validate_query(bad)
+            failures.append(('accepted write', bad, ''))
+        except ValueError:
+            pass
+    return failures, legacy_false_rejections
+
+
+def per_query_us(fn, queries):
+    start = time.perf_counter()
+    for sql in queries:
+        try:
+            fn(sql)
+        except ValueError:
+            pass
+    return (time.perf_counter() - start) / len(queries) * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fuzz and benchmark the query validator')
+    parser.add_argument('--queries', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    failures, legacy_false_rejections = fuzz(rng, args.queries, max_limit=1000)
+
+    print(f"Fuzzed queries: {args.queries}")
+    print(f"Failures: {len(failures)}")
+    for kind, sql, detail in failures[:5]:
+        print(f"  {kind}: {detail}\n    {sql}")
+    print(f"Valid queries the substring scan rejected (keyword-like column names): {legacy_false_rejections} "
+          f"({legacy_false_rejections / args.queries:.0%})")
+
+    queries = [random_query(rng) for _ in range(5000)]
+    # Bypass the memo so every call pays for tokenization
+    uncached = QueryValidator._statement.__wrapped__
+
+    def validate_uncached(sql):
+        QueryValidator._statement.cache_clear()
+        QueryValidator.validate_query(sql)
+        return QueryValidator.add_limit_if_needed(sql, 100, 1000)
+
+    def validate_cached(sql):
+        QueryValidator.validate_query(sql)
+        return QueryValidator.add_limit_if_needed(sql, 100, 1000)
+
+    tokens_only = per_query_us(uncached, queries)
+    legacy = per_query_us(legacy_validate, queries)
+    cold = per_query_us(validate_uncached, queries)
+
+    # Same SQL validated again (e.g. a retried question), within the memo size
+    repeated = queries[:1000]
+    per_query_us(validate_cached, repeated)
+    warm = per_query_us(validate_cached, repeated)
+
+    print(f"\nPer query (avg {sum(map(len, queries)) / len(queries):.0f} chars):")
+    print(f"  Substring scan (legacy):         {legacy:8.1f} us")
+    print(f"  Tokenize only:                   {tokens_only:8.1f} us")
+    print(f"  Validate + limit, cold:          {cold:8.1f} us")
+    print(f"  Validate + limit, memoized:      {warm:8.1f} us")
+
+
+if __name__ == '__main__':
+    main()
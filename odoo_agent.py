@@ -5,7 +5,9 @@ Entry point for connecting to Odoo.sh databases
 
 import sys
 import argparse
-from app.core.odoo_agent import OdooDatabaseAgent
+from app.cli import add_common_args, check_common_args, configure_agent, print_reports
+from app.config import load_env
+from app.core.warmup import WarmupCoordinator
 
 
 def main():
@@ -13,17 +15,7 @@ def main():
         description='Odoo.sh AI Agent - Query Odoo database with natural language'
     )
     
-    parser.add_argument(
-        'question',
-        nargs='?',
-        help='Natural language question to ask about the database'
-    )
-    
-    parser.add_argument(
-        '--interactive', '-i',
-        action='store_true',
-        help='Run in interactive mode'
-    )
+    add_common_args(parser)
     
     parser.add_argument(
         '--test-connection',
@@ -32,9 +24,24 @@ def main():
     )
     
     args = parser.parse_args()
+    check_common_args(parser, args)
+    
+    if not (args.question or args.interactive or args.batch or args.test_connection):
+        # No question provided
+        parser.print_help()
+        return
+    
+    # Imported only now, so --help, argument errors and a bare invocation do not
+    # load the database driver or build the agent
+    from app.core.odoo_agent import OdooDatabaseAgent
+    from app.core.batch import run_batch_file
     
     # Initialize agent
+    load_env()
     agent = OdooDatabaseAgent()
+
+    configure_agent(agent, args)
+    warmup = not args.no_warmup and WarmupCoordinator.enabled()
     
     try:
         if args.test_connection:
@@ -47,11 +54,19 @@ def main():
                 print("❌ Connection failed!")
                 sys.exit(1)
                 
+        elif args.batch:
+            # Batch mode
+            run_batch_file(agent, args.batch, args.batch_output, workers=args.workers)
+            
         elif args.interactive:
             # Interactive mode
             print("\n🤖 Odoo.sh AI Agent - Interactive Mode")
             print("Type 'exit' or 'quit' to exit\n")
             
+            # Tunnel, pool, schema and LLM handshake while the user types
+            if warmup:
+                agent.warm_up()
+            
             while True:
                 question = input("Ask a question: ").strip()
                 
@@ -62,21 +77,25 @@ def main():
                     continue
                 
                 try:
-                    agent.query(question)
+                    agent.query(question, stream=args.stream)
                 except Exception as e:
                     print(f"\n❌ Error: {e}\n")
                     
         elif args.question:
-            # Single question mode
-            agent.query(args.question)
-            
-        else:
-            # No question provided
-            parser.print_help()
+            # Single question mode (warm-up overlaps connecting and the LLM handshake with discovery)
+            if warmup:
+                agent.warm_up(on_ready=lambda _: None)
+            if args.output:
+                # Bulk path: no automatic LIMIT (unless --limit is given), formatting or table
+                agent.export(args.question, args.output, row_limit=args.limit or 0)
+            else:
+                agent.query(args.question, stream=args.stream)
             
     except Exception as e:
         print(f"\nERROR: Fatal error: {e}")
         sys.exit(1)
+    
+    print_reports(agent, args)
 
 
 if __name__ == '__main__':
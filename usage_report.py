@@ -0,0 +1,118 @@
+"""
+Token Usage Report - CLI Interface
+Summarizes the JSONL usage log (tokens and model latency) per day, question, model or source
+"""
+
+import argparse
+import os
+import statistics
+import sys
+from collections import defaultdict
+
+from tabulate import tabulate
+
+from app.ai.usage_log import read_usage_log
+from app.config import load_env
+
+GROUP_KEYS = {
+    'day': lambda r: r['timestamp'][:10],
+    'question': lambda r: r['question'],
+    'model': lambda r: r.get('model') or '-',
+    'source': lambda r: r.get('source') or '-',
+}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(records, group_by):
+    """One row per group: calls, token sums and latency of model calls
+
+    Token sums only count what the model reported; estimates for streams that
+    were cut short before the usage metadata arrived are summed separately.
+    """
+    groups = defaultdict(list)
+    for record in records:
+        key = tuple(GROUP_KEYS[name](record) for name in group_by)
+        groups[key].append(record)
+    
+    rows = []
+    for key, items in groups.items():
+        latencies = [r['latency_ms'] for r in items if r.get('latency_ms') is not None]
+        reported = [r for r in items if not r.get('estimated')]
+        row = dict(zip(group_by, key))
+        row.update({
+            'calls': len(items),
+            'cached': sum(1 for r in items if r.get('source') == 'cache'),
+            'templated': sum(1 for r in items if r.get('source') == 'template'),
+            'prompt_tokens': sum(r.get('prompt_tokens') or 0 for r in reported),
+            'response_tokens': sum(r.get('candidates_tokens') or 0 for r in reported),
+            'total_tokens': sum(r.get('total_tokens') or 0 for r in reported),
+            'estimated_tokens': sum(r.get('total_tokens') or 0 for r in items if r.get('estimated')),
+            'mean_ms': round(statistics.mean(latencies)) if latencies else None,
+            'p95_ms': round(percentile(latencies, 0.95)) if latencies else None,
+        })
+        rows.append(row)
+    return rows
+
+
+def main():
+    # USAGE_LOG_PATH may come from .env
+    load_env()
+    parser = argparse.ArgumentParser(description='Summarize token usage and model latency')
+    
+    parser.add_argument(
+        '--log',
+        default=os.getenv('USAGE_LOG_PATH', 'token_usage.jsonl'),
+        help='Usage log path; rotated backups (.1, .2, ...) are included (default: token_usage.jsonl)'
+    )
+    
+    parser.add_argument(
+        '--by',
+        default='day',
+        help='Comma-separated grouping: day, question, model, source (default: day)'
+    )
+    
+    parser.add_argument(
+        '--since',
+        metavar='YYYY-MM-DD',
+        help='Only include records from this day on'
+    )
+    
+    parser.add_argument(
+        '--top',
+        type=int,
+        help='Show only the N groups with the most tokens'
+    )
+    
+    args = parser.parse_args()
+    
+    group_by = [name.strip() for name in args.by.split(',') if name.strip()]
+    unknown = [name for name in group_by if name not in GROUP_KEYS]
+    if unknown:
+        parser.error(f"unknown grouping: {', '.join(unknown)}")
+    
+    records = read_usage_log(args.log)
+    if args.since:
+        records = [r for r in records if r['timestamp'][:10] >= args.since]
+    if not records:
+        print(f"No usage records in {args.log}")
+        sys.exit(0)
+    
+    rows = summarize(records, group_by)
+    if args.top:
+        rows = sorted(rows, key=lambda r: r['total_tokens'], reverse=True)[:args.top]
+    else:
+        rows.sort(key=lambda r: tuple(str(r[name]) for name in group_by))
+    
+    print(tabulate(rows, headers='keys', tablefmt='grid'))
+    total_tokens = sum(r.get('total_tokens') or 0 for r in records if not r.get('estimated'))
+    estimated_tokens = sum(r.get('total_tokens') or 0 for r in records if r.get('estimated'))
+    estimated = f" (plus ~{estimated_tokens:,} estimated for streams cut short)" if estimated_tokens else ""
+    print(f"\nRecords: {len(records)}, total tokens: {total_tokens:,}{estimated}")
+
+
+if __name__ == '__main__':
+    main()